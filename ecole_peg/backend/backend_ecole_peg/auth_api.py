@@ -1,5 +1,9 @@
 import datetime
+import hashlib
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from ninja import Router, Schema
 from django.conf import settings
 from django.http import HttpResponse
@@ -28,6 +32,48 @@ def generer_token():
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm="HS256")
 
 
+class CacheTokens:
+    """
+    Cache LRU borné des tokens déjà vérifiés, indexé par l'empreinte SHA-256
+    du token et associé à son `exp` : un succès évite le HMAC et le décodage.
+    """
+
+    def __init__(self, taille_max):
+        self.taille_max = taille_max
+        self.hits = 0
+        self.misses = 0
+        self._tokens = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def verifier(self, token):
+        empreinte = hashlib.sha256(token.encode()).digest()
+        maintenant = time.time()
+
+        with self._verrou:
+            exp = self._tokens.get(empreinte)
+            if exp is not None:
+                if exp > maintenant:
+                    self._tokens.move_to_end(empreinte)
+                    self.hits += 1
+                    return
+                del self._tokens[empreinte]
+            self.misses += 1
+
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
+
+        with self._verrou:
+            self._tokens[empreinte] = payload.get("exp", maintenant)
+            self._tokens.move_to_end(empreinte)
+            while len(self._tokens) > self.taille_max:
+                self._tokens.popitem(last=False)
+
+    def statistiques(self):
+        return {"hits": self.hits, "misses": self.misses, "taille": len(self._tokens)}
+
+
+cache_tokens = CacheTokens(settings.JWT_CACHE_TAILLE)
+
+
 def jwt_auth(request):
     auth_header = request.headers.get("Authorization", "")
     token = None
@@ -41,7 +87,7 @@ def jwt_auth(request):
         raise PermissionDenied("Les informations d'authentification n'ont pas été fournies.")
 
     try:
-        jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
+        cache_tokens.verifier(token)
     except jwt.ExpiredSignatureError:
         raise PermissionDenied("Le token a expiré.")
     except jwt.InvalidTokenError:
@@ -50,7 +96,14 @@ def jwt_auth(request):
     return True
 
 
-@router.post("/login/")
+class JWTAuth:
+    """Authentification JWT (header Bearer ou cookie), appliquée au niveau de NinjaAPI."""
+
+    def __call__(self, request):
+        return jwt_auth(request)
+
+
+@router.post("/login/", auth=None)
 def login(request, data: LoginIn):
     if data.mot_de_passe != settings.MASTER_PASSWORD:
         return HttpResponse("Non autorisé", status=401)
@@ -63,12 +116,12 @@ def login(request, data: LoginIn):
     return response
 
 
-@router.get("/est_authentifie/", auth=jwt_auth)
+@router.get("/est_authentifie/")
 def est_authentifie(request) -> AuthOut:
     return AuthOut()
 
 
-@router.post("/logout/")
+@router.post("/logout/", auth=None)
 def logout(request):
     reponse = HttpResponse(status=200)
     reponse.delete_cookie("access_token")
@@ -76,7 +129,7 @@ def logout(request):
     return reponse
 
 
-@router.post("/refresh/")
+@router.post("/refresh/", auth=None)
 def refresh_token(request):
     try:
         jwt_auth(request)
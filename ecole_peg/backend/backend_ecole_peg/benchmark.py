@@ -0,0 +1,139 @@
+"""
+Mesure de latence et de nombre de requêtes SQL de chaque endpoint GET de
+l'API, via le client de test Django sur la base configurée (commande
+benchmark_api). Les résultats peuvent être sauvés comme référence puis comparés.
+"""
+import re
+import time
+from contextlib import ExitStack
+from django.core.cache import caches
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from cours.models import Cours, Enseignant, FichePresences, Session
+from eleves.models import Eleve
+from factures.models import Facture, Paiement
+from .api import api
+from .auth_api import generer_token
+from .cache_reponses import ALIAS_CACHE
+
+MOTIF_PARAMETRE = re.compile(r"\{(\w+)\}")
+
+# Paramètres de requête ajoutés à certains endpoints pour exercer leurs filtres.
+PARAMETRES_SUPPLEMENTAIRES = {
+    "/api/eleves/eleves/": ["", "?recherche=mar", "?statut=A", "?curseur=debut"],
+    "/api/cours/enseignants/{enseignant_id}/disponibilites/": [
+        "?date_debut=2024-01-01&date_fin=2024-03-31"
+    ],
+}
+
+
+def _ids_exemple():
+    """Un id existant pour chaque nom de paramètre de chemin de l'API."""
+    premier = lambda modele: modele.objects.order_by("id").values_list("id", flat=True).first()
+    eleve = premier(Eleve)
+    session = premier(Session)
+    facture = premier(Facture)
+    return {
+        "eleve_id": eleve,
+        "id_eleve": eleve,
+        "cours_id": premier(Cours),
+        "enseignant_id": premier(Enseignant),
+        "id_session": session,
+        "facture_id": facture,
+        "id_facture": facture,
+        "paiement_id": premier(Paiement),
+        "id_fiche_presences": premier(FichePresences),
+    }
+
+
+def endpoints_get():
+    """Chemins de toutes les opérations GET des routeurs de l'API."""
+    chemins = []
+    for prefixe, routeur in api._routers:
+        for chemin, vue in routeur.path_operations.items():
+            if any("GET" in operation.methods for operation in vue.operations):
+                url = f"/api/{prefixe.strip('/')}/{chemin.lstrip('/')}".replace("//", "/")
+                chemins.append(url)
+    return chemins
+
+
+def _percentile(valeurs, p):
+    valeurs = sorted(valeurs)
+    rang = max(0, min(len(valeurs) - 1, round(p / 100 * len(valeurs)) - 1))
+    return valeurs[rang]
+
+
+def _requete(client, cible):
+    """
+    GET mesuré de bout en bout : requêtes SQL de toutes les bases (les GET
+    vont au réplica s'il est configuré) et corps lu en entier, y compris pour
+    les réponses diffusées en flux.
+    """
+    with ExitStack() as pile:
+        captures = [
+            pile.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in connections
+        ]
+        debut = time.perf_counter()
+        reponse = client.get(cible)
+        if reponse.streaming:
+            for _ in reponse.streaming_content:
+                pass
+        duree = (time.perf_counter() - debut) * 1000
+        reponse.close()
+    return reponse, duree, sum(len(capture) for capture in captures)
+
+
+def executer(repetitions=20, filtre=None):
+    """Retourne {url: {"p50_ms", "p95_ms", "requetes", "statut"}}."""
+    ids = _ids_exemple()
+    client = Client()
+    client.cookies["access_token"] = generer_token()
+    resultats = {}
+
+    with override_settings(ALLOWED_HOSTS=["*"]):
+        for modele_url in endpoints_get():
+            if filtre and filtre not in modele_url:
+                continue
+            noms = MOTIF_PARAMETRE.findall(modele_url)
+            if any(ids.get(nom) is None for nom in noms):
+                continue
+            url = MOTIF_PARAMETRE.sub(lambda m: str(ids[m.group(1)]), modele_url)
+
+            for suffixe in PARAMETRES_SUPPLEMENTAIRES.get(modele_url, [""]):
+                cible = url + suffixe
+                client.get(cible).close()  # échauffement (connexions, imports)
+                durees = []
+                for _ in range(repetitions):
+                    # Chemin non mis en cache : le cache des réponses est vidé
+                    # avant chaque mesure.
+                    caches[ALIAS_CACHE].clear()
+                    reponse, duree, requetes = _requete(client, cible)
+                    durees.append(duree)
+                resultats[cible] = {
+                    "p50_ms": round(_percentile(durees, 50), 2),
+                    "p95_ms": round(_percentile(durees, 95), 2),
+                    "requetes": requetes,
+                    "statut": reponse.status_code,
+                }
+    return resultats
+
+
+def comparer(resultats, reference):
+    """Variation relative du p50 et du nombre de requêtes par rapport à la référence."""
+    comparaison = {}
+    for url, mesure in resultats.items():
+        base = reference.get(url)
+        if not base:
+            continue
+        comparaison[url] = {
+            "p50_variation_pct": round(
+                (mesure["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100, 1
+            )
+            if base["p50_ms"]
+            else None,
+            "requetes_variation": mesure["requetes"] - base["requetes"],
+        }
+    return comparaison
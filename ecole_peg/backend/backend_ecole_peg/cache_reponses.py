@@ -0,0 +1,178 @@
+"""
+Cache des réponses JSON des endpoints de référence (cours, enseignants,
+sessions, pays), sur le cache Django `reponses` (mémoire locale ou fichiers).
+
+La clé d'une réponse combine le chemin, les paramètres de requête et le
+compteur de version de chaque modèle dont elle dépend. Les signaux
+post_save/post_delete incrémentent ce compteur : les anciennes entrées ne
+sont plus jamais lues et expirent d'elles-mêmes.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from ninja.responses import NinjaJSONEncoder
+
+ALIAS_CACHE = "reponses"
+
+# Modèles versionnés ; les signaux sont connectés dans eleves.signals.
+MODELES_VERSIONNES = ("cours.Cours", "cours.Enseignant", "cours.Session", "eleves.Pays")
+
+CACHE_CONTROL_DEFAUT = "private, no-cache"
+
+
+class StatistiquesCache:
+    """Succès et échecs du cache des réponses, par route, pour ce processus."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def noter(self, route, trouve):
+        with self._verrou:
+            (self.hits if trouve else self.misses)[route] += 1
+
+    def statistiques(self):
+        with self._verrou:
+            routes = sorted(set(self.hits) | set(self.misses))
+            par_route = {
+                route: {"hits": self.hits[route], "misses": self.misses[route]}
+                for route in routes
+            }
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "taux_hits": round(hits / total, 3) if total else None,
+            "routes": par_route,
+        }
+
+
+statistiques_cache = StatistiquesCache()
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _cle_version(label):
+    return f"version:{label}"
+
+
+def _versions(labels):
+    cache = _cache()
+    cles = [_cle_version(label) for label in labels]
+    versions = cache.get_many(cles)
+    for cle in cles:
+        if cle not in versions:
+            # Compteur absent (premier accès ou éviction) : repartir d'une valeur
+            # jamais utilisée, pour ne pas relire d'anciennes entrées.
+            cache.add(cle, time.time_ns(), timeout=None)
+            versions[cle] = cache.get(cle)
+    return [versions[cle] for cle in cles]
+
+
+def incrementer_version(label):
+    cache = _cache()
+    cle = _cle_version(label)
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.set(cle, time.time_ns(), timeout=None)
+
+
+def invalider_reponses(sender, **kwargs):
+    """Récepteur post_save/post_delete : nouvelle version une fois la transaction validée."""
+    label = sender._meta.label
+    transaction.on_commit(lambda: incrementer_version(label))
+
+
+def _route(request):
+    correspondance = getattr(request, "resolver_match", None)
+    return correspondance.route if correspondance else request.path
+
+
+def _base(request):
+    parametres = urlencode(
+        sorted((cle, sorted(valeurs)) for cle, valeurs in request.GET.lists()),
+        doseq=True,
+    )
+    return f"{request.path}?{parametres}"
+
+
+def _chercher(base, modeles, empreinte=None):
+    versions = ",".join(str(v) for v in _versions(modeles))
+    brut = f"{base}|{versions}|{empreinte}"
+    cle = "reponse:" + hashlib.sha256(brut.encode()).hexdigest()
+    return cle, _cache().get(cle)
+
+
+def _stocker(cle, contenu):
+    entree = (contenu, '"%s"' % hashlib.sha256(contenu).hexdigest()[:32])
+    _cache().set(cle, entree)
+    return entree
+
+
+def _reponse(request, entree, cache_control):
+    contenu, etag = entree
+    etags_client = [e.strip() for e in request.headers.get("If-None-Match", "").split(",")]
+    if etag in etags_client or "*" in etags_client:
+        reponse = HttpResponseNotModified()
+    else:
+        reponse = HttpResponse(contenu, content_type="application/json")
+    reponse["ETag"] = etag
+    reponse["Cache-Control"] = cache_control or CACHE_CONTROL_DEFAUT
+    return reponse
+
+
+def _serialiser(donnees):
+    return json.dumps(donnees, cls=NinjaJSONEncoder).encode("utf-8")
+
+
+def entree_en_cache(nom, modeles, calculer, empreinte=None):
+    """
+    Entrée (contenu JSON, ETag) de `calculer()` enregistrée sous `nom`, avec
+    les mêmes versions que les réponses : permet à un autre lecteur que
+    l'endpoint de s'appuyer sur la même entrée.
+    """
+    cle, entree = _chercher(nom, modeles, empreinte)
+    if entree is None:
+        entree = _stocker(cle, _serialiser(calculer()))
+    return entree
+
+
+def reponse_en_cache(
+    request, modeles, calculer, cache_control=None, empreinte=None, nom=None
+):
+    """
+    Réponse JSON de `calculer()` servie depuis le cache si aucun des `modeles`
+    (labels "app.Modele") n'a changé, avec ETag : un If-None-Match
+    correspondant reçoit un 304. `empreinte` complète la clé pour une source
+    que les signaux ne voient pas (date de modification d'une fixture, etc.).
+    `nom` remplace le chemin et les paramètres dans la clé, pour une réponse
+    partagée avec entree_en_cache.
+    """
+    cle, entree = _chercher(nom or _base(request), modeles, empreinte)
+    statistiques_cache.noter(_route(request), entree is not None)
+    if entree is None:
+        entree = _stocker(cle, _serialiser(calculer()))
+    return _reponse(request, entree, cache_control)
+
+
+async def areponse_en_cache(
+    request, modeles, calculer, cache_control=None, empreinte=None
+):
+    """Équivalent de reponse_en_cache pour les endpoints async (`calculer` est une coroutine)."""
+    cle, entree = await sync_to_async(_chercher)(_base(request), modeles, empreinte)
+    statistiques_cache.noter(_route(request), entree is not None)
+    if entree is None:
+        entree = await sync_to_async(_stocker)(cle, _serialiser(await calculer()))
+    return _reponse(request, entree, cache_control)
@@ -0,0 +1,296 @@
+"""
+Génération de volumes de données réalistes pour les mesures de performance
+(commande generer_donnees_bench). Tout est inséré par bulk_create.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+
+from cours.fiches import dates_cours
+from cours.models import (
+    Cours,
+    Enseignant,
+    FichePresences,
+    Inscription,
+    LieuCoursPriveChoices,
+    CoursPrive,
+    NiveauChoices,
+    PeriodeJourneeChoices,
+    Presence,
+    Session,
+    StatutInscriptionChoices,
+    StatutPresenceChoices,
+    StatutSessionChoices,
+    TypeCoursChoices,
+)
+from eleves.models import Eleve, JetonRecherche, Pays, SexeChoices, TypePermisChoices
+from eleves.recherche import cle_tri
+from eleves.tableau_bord import (
+    CALCULS_SECTIONS,
+    invalider_sections,
+    recompter_compteurs,
+)
+from .cache_reponses import MODELES_VERSIONNES, incrementer_version
+from factures.models import (
+    DetailFacture,
+    Facture,
+    ModePaiementChoices,
+    MethodePaiementChoices,
+    Paiement,
+)
+
+TAILLE_LOT = 2000
+
+NOMS = [
+    "Müller", "Dupont", "Favre", "Rochat", "Bernasconi", "Nguyen", "Da Silva",
+    "Ferreira", "Hoxha", "Ibrahim", "Kovačević", "Lefèvre", "Mercier", "Özdemir",
+    "Pereira", "Rossi", "Schneider", "Tanaka", "Yilmaz", "Zürcher",
+]
+PRENOMS = [
+    "Anaïs", "Benoît", "Chloé", "David", "Élodie", "Fatima", "Gaël", "Hélène",
+    "Ismaël", "Joël", "Karim", "Léa", "Mohamed", "Noémie", "Océane", "Pedro",
+    "Quentin", "Raphaël", "Sofia", "Zoé",
+]
+
+
+def _inserer(modele, objets):
+    """bulk_create par lots ; retourne les ids, relus si le SGBD ne les renvoie pas."""
+    dernier = modele.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    modele.objects.bulk_create(objets, batch_size=TAILLE_LOT)
+    if objets and objets[0].pk is None:
+        return list(
+            modele.objects.filter(id__gt=dernier)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+    return [o.pk for o in objets]
+
+
+def generer(
+    nb_eleves=10000,
+    nb_sessions=500,
+    nb_presences=200000,
+    nb_factures=50000,
+    graine=42,
+    sortie=print,
+):
+    alea = random.Random(graine)
+    aujourd_hui = date.today()
+
+    with transaction.atomic():
+        ids_pays = list(Pays.objects.values_list("id", flat=True))
+        if not ids_pays:
+            ids_pays = _inserer(
+                Pays, [Pays(nom=f"Pays {i}", indicatif=f"+{i}") for i in range(1, 51)]
+            )
+
+        cours = [
+            Cours(
+                nom=f"Français {niveau} {type_cours.label}",
+                type_cours=type_cours,
+                niveau=niveau,
+                heures_par_semaine=20 if type_cours == TypeCoursChoices.INTENSIF else 10,
+                duree_semaines=12,
+                tarif=Decimal(alea.choice([450, 600, 900, 1200])),
+            )
+            for type_cours in TypeCoursChoices
+            for niveau in NiveauChoices.values
+        ]
+        ids_cours = _inserer(Cours, cours)
+
+        ids_enseignants = _inserer(
+            Enseignant,
+            [
+                Enseignant(nom=alea.choice(NOMS)[:20], prenom=alea.choice(PRENOMS))
+                for _ in range(30)
+            ],
+        )
+        sortie(f"{len(ids_cours)} cours, {len(ids_enseignants)} enseignants")
+
+        sessions = []
+        for _ in range(nb_sessions):
+            debut = aujourd_hui - timedelta(days=alea.randint(-60, 730))
+            fin = debut + timedelta(days=alea.randint(30, 180))
+            sessions.append(
+                Session(
+                    date_debut=debut,
+                    date_fin=fin,
+                    periode_journee=alea.choice(PeriodeJourneeChoices.values),
+                    capacite_max=alea.randint(12, 20),
+                    statut=(
+                        StatutSessionChoices.FERMÉE
+                        if fin < aujourd_hui
+                        else StatutSessionChoices.OUVERTE
+                    ),
+                    cours_id=alea.choice(ids_cours),
+                    enseignant_id=alea.choice(ids_enseignants),
+                    seances_mois=alea.randint(8, 20),
+                )
+            )
+        for session, id_session in zip(sessions, _inserer(Session, sessions)):
+            session.pk = id_session
+        sortie(f"{len(sessions)} sessions")
+
+        eleves = []
+        for i in range(nb_eleves):
+            nom, prenom = alea.choice(NOMS), alea.choice(PRENOMS)
+            eleves.append(
+                Eleve(
+                    nom=nom,
+                    prenom=prenom,
+                    cle_tri=cle_tri(nom, prenom),
+                    telephone=f"+41 7{alea.randint(5, 9)} {alea.randint(100, 999)} "
+                    f"{alea.randint(10, 99)} {alea.randint(10, 99)}",
+                    email=f"eleve{i}.{alea.randint(0, 10**6)}@exemple.ch",
+                    date_naissance=date(alea.randint(1960, 2006), alea.randint(1, 12), alea.randint(1, 28)),
+                    lieu_naissance="Genève",
+                    sexe=alea.choice(SexeChoices.values),
+                    type_permis=TypePermisChoices.PAS_DE_PERMIS,
+                    niveau=alea.choice(NiveauChoices.values),
+                    pays_id=alea.choice(ids_pays),
+                )
+            )
+        for eleve, id_eleve in zip(eleves, _inserer(Eleve, eleves)):
+            eleve.pk = id_eleve
+        for debut in range(0, len(eleves), TAILLE_LOT):
+            JetonRecherche.indexer(eleves[debut : debut + TAILLE_LOT])
+        sortie(f"{len(eleves)} élèves")
+
+        inscriptions = []
+        paires = set()
+        for eleve in eleves:
+            for session in alea.sample(sessions, k=min(len(sessions), alea.randint(1, 2))):
+                if (eleve.pk, session.pk) in paires:
+                    continue
+                paires.add((eleve.pk, session.pk))
+                inscriptions.append(
+                    Inscription(
+                        eleve_id=eleve.pk,
+                        session_id=session.pk,
+                        statut=(
+                            StatutInscriptionChoices.ACTIF
+                            if session.statut == StatutSessionChoices.OUVERTE
+                            else StatutInscriptionChoices.INACTIF
+                        ),
+                        preinscription=alea.random() < 0.05,
+                        frais_inscription=Decimal(alea.choice([0, 50, 100])),
+                    )
+                )
+        for inscription, id_inscription in zip(
+            inscriptions, _inserer(Inscription, inscriptions)
+        ):
+            inscription.pk = id_inscription
+        sortie(f"{len(inscriptions)} inscriptions")
+
+        eleves_par_session = {}
+        for inscription in inscriptions:
+            eleves_par_session.setdefault(inscription.session_id, []).append(
+                inscription.eleve_id
+            )
+
+        fiches = []
+        presences_par_fiche = []
+        nb_generees = 0
+        dates_prises = set()
+        for session in sessions:
+            if nb_generees >= nb_presences:
+                break
+            mois = date(session.date_debut.year, session.date_debut.month, 1)
+            while mois <= session.date_fin and nb_generees < nb_presences:
+                fiches.append(
+                    FichePresences(
+                        session_id=session.pk, mois=f"{mois.month:02d}", annee=mois.year
+                    )
+                )
+                presences_fiche = []
+                for jour in dates_cours(session, mois.year, mois.month):
+                    for eleve_id in eleves_par_session.get(session.pk, []):
+                        if (eleve_id, jour) in dates_prises:
+                            continue
+                        dates_prises.add((eleve_id, jour))
+                        presences_fiche.append(
+                            Presence(
+                                eleve_id=eleve_id,
+                                date_presence=jour,
+                                statut=(
+                                    StatutPresenceChoices.PRESENT
+                                    if alea.random() < 0.85
+                                    else StatutPresenceChoices.ABSENT
+                                ),
+                            )
+                        )
+                presences_par_fiche.append(presences_fiche)
+                nb_generees += len(presences_fiche)
+                mois = (mois + timedelta(days=32)).replace(day=1)
+
+        presences = []
+        for id_fiche, presences_fiche in zip(
+            _inserer(FichePresences, fiches), presences_par_fiche
+        ):
+            for presence in presences_fiche:
+                presence.fiche_presences_id = id_fiche
+                presences.append(presence)
+        Presence.objects.bulk_create(presences[:nb_presences], batch_size=TAILLE_LOT)
+        sortie(f"{min(len(presences), nb_presences)} présences")
+
+        cours_prives = [
+            CoursPrive(
+                date_cours_prive=aujourd_hui + timedelta(days=alea.randint(-90, 90)),
+                heure_debut=f"{h:02d}:00",
+                heure_fin=f"{h + 1:02d}:00",
+                tarif=Decimal(90),
+                lieu=alea.choice(LieuCoursPriveChoices.values),
+                enseignant_id=alea.choice(ids_enseignants),
+            )
+            for h in (alea.randint(8, 19) for _ in range(500))
+        ]
+        _inserer(CoursPrive, cours_prives)
+
+        factures = [
+            Facture(inscription_id=alea.choice(inscriptions).pk)
+            for _ in range(nb_factures)
+        ]
+        ids_factures = _inserer(Facture, factures)
+
+        details = []
+        paiements = []
+        for id_facture in ids_factures:
+            montants = [Decimal(alea.choice([50, 450, 600, 900]))]
+            if alea.random() < 0.5:
+                montants.append(Decimal(alea.choice([0.5, 50, 100])))
+            for montant in montants:
+                details.append(
+                    DetailFacture(
+                        facture_id=id_facture, description="Frais de cours", montant=montant
+                    )
+                )
+            total = sum(montants)
+            tirage = alea.random()
+            if tirage < 0.6:
+                paye = [total]
+            elif tirage < 0.8:
+                paye = [(total / 2).quantize(Decimal("0.01"))]
+            else:
+                paye = []
+            for montant in paye:
+                paiements.append(
+                    Paiement(
+                        facture_id=id_facture,
+                        montant=montant,
+                        mode_paiement=alea.choice(ModePaiementChoices.values),
+                        methode_paiement=alea.choice(MethodePaiementChoices.values),
+                    )
+                )
+        DetailFacture.objects.bulk_create(details, batch_size=TAILLE_LOT)
+        Paiement.objects.bulk_create(paiements, batch_size=TAILLE_LOT)
+        if ids_factures:
+            Facture.objects.filter(id__gte=ids_factures[0]).recalculer_montants()
+        transaction.on_commit(recompter_compteurs)
+        invalider_sections(list(CALCULS_SECTIONS))
+        for label in MODELES_VERSIONNES:
+            transaction.on_commit(lambda label=label: incrementer_version(label))
+        sortie(
+            f"{len(ids_factures)} factures, {len(details)} détails, "
+            f"{len(paiements)} paiements"
+        )
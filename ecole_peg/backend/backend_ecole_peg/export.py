@@ -0,0 +1,148 @@
+import asyncio
+import csv
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from ninja.errors import HttpError
+
+TAILLE_LOT_EXPORT = 2000
+TAILLE_MORCEAU = 64 * 1024
+
+FORMATS_EXPORT = ("csv", "xlsx")
+
+
+def iterer_par_lots(qs, champs, taille_lot=TAILLE_LOT_EXPORT):
+    """
+    Parcourt `qs.values(*champs)` par lots successifs sur la clé primaire.
+    Le pilote MySQL charge tout le résultat d'une requête en mémoire, même avec
+    iterator() : des lots bornés par id gardent la mémoire constante.
+    """
+    dernier_id = 0
+    qs = qs.order_by("pk")
+    while True:
+        lot = list(qs.filter(pk__gt=dernier_id).values("pk", *champs)[:taille_lot])
+        if not lot:
+            return
+        for ligne in lot:
+            yield [ligne[champ] for champ in champs]
+        dernier_id = lot[-1]["pk"]
+
+
+class _Tampon:
+    """Pseudo-fichier pour csv.writer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def _flux_csv(entetes, lignes):
+    writer = csv.writer(_Tampon(), delimiter=";")
+    # BOM pour qu'Excel reconnaisse l'UTF-8 (accents).
+    yield "\ufeff" + writer.writerow(entetes)
+    for ligne in lignes:
+        yield writer.writerow(ligne)
+
+
+def _regrouper(morceaux, taille=TAILLE_MORCEAU):
+    """Concatène de petits morceaux (lignes CSV) en blocs d'environ `taille` caractères."""
+    bloc, longueur = [], 0
+    for morceau in morceaux:
+        bloc.append(morceau)
+        longueur += len(morceau)
+        if longueur >= taille:
+            yield "".join(bloc)
+            bloc, longueur = [], 0
+    if bloc:
+        yield "".join(bloc)
+
+
+def _morceaux_fichier(fichier):
+    try:
+        while morceau := fichier.read(TAILLE_MORCEAU):
+            yield morceau
+    finally:
+        fichier.close()
+
+
+def _terminer(iterateur):
+    try:
+        fermer = getattr(iterateur, "close", None)
+        if fermer is not None:
+            fermer()
+    finally:
+        # Connexion propre au thread de l'export, fermée une seule fois, à la fin.
+        connections.close_all()
+
+
+async def aiterer(iterateur):
+    """
+    Itérateur async sur un itérateur synchrone (qui peut lire la base), pour
+    StreamingHttpResponse sous ASGI : Django y lit un itérateur synchrone en
+    entier avant d'envoyer la réponse. Tous les next() s'exécutent dans un
+    même thread dédié, hors du thread partagé des vues synchrones : la
+    connexion ouverte au premier lot sert jusqu'au dernier.
+    """
+    boucle = asyncio.get_running_loop()
+    executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+    try:
+        while (
+            element := await boucle.run_in_executor(executeur, next, iterateur, None)
+        ) is not None:
+            yield element
+    finally:
+        await boucle.run_in_executor(executeur, _terminer, iterateur)
+        executeur.shutdown(wait=False)
+
+
+def _fichier_xlsx(entetes, lignes):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise HttpError(501, "Export XLSX indisponible : openpyxl n'est pas installé.")
+
+    # Mode write_only : les lignes sont écrites au fil de l'eau, pas gardées en mémoire.
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet()
+    feuille.append(entetes)
+    for ligne in lignes:
+        feuille.append(ligne)
+
+    fichier = tempfile.TemporaryFile()
+    classeur.save(fichier)
+    fichier.seek(0)
+    return fichier
+
+
+def reponse_export(format, nom_fichier, entetes, lignes, asynchrone=False):
+    """
+    Réponse CSV diffusée en flux, ou XLSX construit sur disque puis diffusé.
+    `asynchrone` (requête ASGI) : le corps est un itérateur async.
+    """
+    if format == "csv":
+        morceaux = _flux_csv(entetes, lignes)
+        if asynchrone:
+            morceaux = aiterer(_regrouper(morceaux))
+        reponse = StreamingHttpResponse(morceaux, content_type="text/csv; charset=utf-8")
+        reponse["Content-Disposition"] = f'attachment; filename="{nom_fichier}.csv"'
+        return reponse
+
+    if format == "xlsx":
+        fichier = _fichier_xlsx(entetes, lignes)
+        content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if not asynchrone:
+            return FileResponse(
+                fichier,
+                as_attachment=True,
+                filename=f"{nom_fichier}.xlsx",
+                content_type=content_type,
+            )
+        reponse = StreamingHttpResponse(
+            aiterer(_morceaux_fichier(fichier)), content_type=content_type
+        )
+        reponse["Content-Length"] = str(os.fstat(fichier.fileno()).st_size)
+        reponse["Content-Disposition"] = f'attachment; filename="{nom_fichier}.xlsx"'
+        return reponse
+
+    raise HttpError(400, f"Format inconnu, formats acceptés : {', '.join(FORMATS_EXPORT)}.")
@@ -0,0 +1,74 @@
+"""
+Données de test partagées par les suites des applications (élèves, cours,
+factures) : un seul jeu de fabriques plutôt qu'une copie par application.
+"""
+from datetime import date
+from cours.models import Cours, Inscription, Session
+from eleves.models import Eleve, Pays, SexeChoices, TypePermisChoices
+
+
+def creer_pays(nom="Suisse", indicatif="+41"):
+    return Pays.objects.create(nom=nom, indicatif=indicatif)
+
+
+def creer_eleve(
+    pays, nom="Dupont", prenom="Hélène", email="helene@exemple.ch", **valeurs
+):
+    valeurs = {
+        "date_naissance": date(1990, 5, 1),
+        "lieu_naissance": "Genève",
+        "sexe": SexeChoices.FEMME,
+        "telephone": "+41 79 123 45 67",
+        "type_permis": TypePermisChoices.PAS_DE_PERMIS,
+        **valeurs,
+    }
+    return Eleve.objects.create(nom=nom, prenom=prenom, email=email, pays=pays, **valeurs)
+
+
+def creer_cours(nom="Français B1", type_cours="I", niveau="B1", tarif=600):
+    return Cours.objects.create(
+        nom=nom, type_cours=type_cours, niveau=niveau, tarif=tarif
+    )
+
+
+def creer_session(cours, date_debut, date_fin, **valeurs):
+    valeurs = {
+        "periode_journee": "M",
+        "capacite_max": 12,
+        "seances_mois": 12,
+        **valeurs,
+    }
+    return Session.objects.create(
+        cours=cours, date_debut=date_debut, date_fin=date_fin, **valeurs
+    )
+
+
+class DonneesSessionMixin:
+    """
+    Un pays, un cours à 600.–, une session du 5 janvier au 27 mars 2026 et
+    deux élèves inscrits (frais d'inscription de 50.–), créés une fois par
+    classe de test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pays = creer_pays()
+        cls.cours = creer_cours()
+        cls.session = cls.creer_session(date(2026, 1, 5), date(2026, 3, 27))
+        cls.eleves = [
+            creer_eleve(cls.pays, nom, prenom, email)
+            for nom, prenom, email in (
+                ("Dupont", "Hélène", "helene@exemple.ch"),
+                ("Rossi", "Marco", "marco@exemple.ch"),
+            )
+        ]
+        cls.inscriptions = [
+            Inscription.objects.create(
+                eleve=eleve, session=cls.session, frais_inscription=50
+            )
+            for eleve in cls.eleves
+        ]
+
+    @classmethod
+    def creer_session(cls, date_debut, date_fin, **valeurs):
+        return creer_session(cls.cours, date_debut, date_fin, **valeurs)
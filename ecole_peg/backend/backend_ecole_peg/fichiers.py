@@ -0,0 +1,150 @@
+"""
+Envoi de fichiers du stockage local après contrôle d'accès par la vue.
+
+Avec MEDIA_ACCEL_PREFIXE, le transfert est confié au serveur web frontal
+(en-tête X-Accel-Redirect de nginx) : le worker Python est libéré aussitôt.
+Sinon la réponse gère elle-même ETag, If-Modified-Since et les requêtes
+Range à plage unique.
+"""
+import os
+import re
+from urllib.parse import quote
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+TAILLE_MORCEAU = 64 * 1024
+MOTIF_PLAGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _plage(entete, taille):
+    """
+    (début, fin) inclus demandés par l'en-tête Range, ou None pour envoyer le
+    fichier entier (en-tête absent, multi-plages, syntaxe inconnue).
+    ValueError si la plage est hors du fichier.
+    """
+    correspondance = MOTIF_PLAGE.match(entete.strip())
+    if not correspondance:
+        return None
+    debut, fin = correspondance.groups()
+    if not debut and not fin:
+        return None
+    if not debut:
+        # bytes=-N : les N derniers octets.
+        longueur = int(fin)
+        if longueur == 0 or taille == 0:
+            raise ValueError
+        return max(0, taille - longueur), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        raise ValueError
+    return debut, fin
+
+
+def _morceaux(chemin, debut, longueur):
+    with open(chemin, "rb") as f:
+        f.seek(debut)
+        while longueur > 0:
+            morceau = f.read(min(TAILLE_MORCEAU, longueur))
+            if not morceau:
+                break
+            longueur -= len(morceau)
+            yield morceau
+
+
+async def _amorceaux(chemin, debut, longueur):
+    # Sous ASGI, un itérateur synchrone serait lu entièrement en mémoire.
+    f = await sync_to_async(open)(chemin, "rb")
+    try:
+        await sync_to_async(f.seek)(debut)
+        while longueur > 0:
+            morceau = await sync_to_async(f.read)(min(TAILLE_MORCEAU, longueur))
+            if not morceau:
+                break
+            longueur -= len(morceau)
+            yield morceau
+    finally:
+        await sync_to_async(f.close)()
+
+
+def _flux(request, chemin, debut, longueur, **kwargs):
+    if isinstance(request, ASGIRequest):
+        morceaux = _amorceaux(chemin, debut, longueur)
+    else:
+        morceaux = _morceaux(chemin, debut, longueur)
+    reponse = StreamingHttpResponse(morceaux, **kwargs)
+    reponse["Content-Length"] = str(longueur)
+    return reponse
+
+
+def _if_range_valide(request, etag, derniere_modification):
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == derniere_modification
+
+
+def servir_fichier(request, stockage, nom, content_type, nom_telechargement, etag=None):
+    """
+    Réponse d'envoi du fichier `nom` du `stockage` (FileSystemStorage).
+    `etag` (fort) vaut par défaut la date de modification et la taille.
+    """
+    if settings.MEDIA_ACCEL_PREFIXE:
+        reponse = HttpResponse(content_type=content_type)
+        prefixe = settings.MEDIA_ACCEL_PREFIXE.rstrip("/")
+        reponse["X-Accel-Redirect"] = f"{prefixe}/{quote(nom)}"
+        reponse["Content-Disposition"] = content_disposition_header(False, nom_telechargement)
+        return reponse
+
+    chemin = stockage.path(nom)
+    try:
+        infos = os.stat(chemin)
+    except FileNotFoundError:
+        raise Http404("Fichier introuvable.")
+
+    taille = infos.st_size
+    derniere_modification = int(infos.st_mtime)
+    etag = etag or '"%x-%x"' % (infos.st_mtime_ns, taille)
+
+    reponse = get_conditional_response(
+        request, etag=etag, last_modified=derniere_modification
+    )
+    if reponse is None:
+        plage = None
+        if "Range" in request.headers and _if_range_valide(
+            request, etag, derniere_modification
+        ):
+            try:
+                plage = _plage(request.headers["Range"], taille)
+            except ValueError:
+                reponse = HttpResponse(status=416)
+                reponse["Content-Range"] = f"bytes */{taille}"
+                return reponse
+
+        if plage is not None:
+            debut, fin = plage
+            reponse = _flux(
+                request, chemin, debut, fin - debut + 1,
+                status=206, content_type=content_type,
+            )
+            reponse["Content-Range"] = f"bytes {debut}-{fin}/{taille}"
+        elif isinstance(request, ASGIRequest):
+            reponse = _flux(request, chemin, 0, taille, content_type=content_type)
+        else:
+            # Sous WSGI, FileResponse profite de wsgi.file_wrapper (sendfile).
+            reponse = FileResponse(open(chemin, "rb"), content_type=content_type)
+        reponse["Content-Disposition"] = content_disposition_header(
+            False, nom_telechargement
+        )
+
+    reponse["ETag"] = etag
+    reponse["Last-Modified"] = http_date(derniere_modification)
+    reponse["Accept-Ranges"] = "bytes"
+    reponse["Cache-Control"] = "private, no-cache"
+    return reponse
@@ -0,0 +1,127 @@
+import base64
+import json
+from django.db.models import Q
+from ninja.errors import HttpError
+
+# Valeur de `curseur` demandant la première page en mode curseur.
+CURSEUR_DEBUT = "debut"
+
+SUIVANT = "s"
+PRECEDENT = "p"
+
+
+def _encoder_curseur(valeurs, sens):
+    brut = json.dumps({"v": valeurs, "s": sens}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip("=")
+
+
+def _decoder_curseur(curseur, nombre_cles):
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4))
+        donnees = json.loads(brut)
+        valeurs, sens = donnees["v"], donnees["s"]
+    except (ValueError, KeyError, TypeError):
+        raise HttpError(400, "Curseur invalide.")
+
+    if sens not in (SUIVANT, PRECEDENT) or len(valeurs) != nombre_cles:
+        raise HttpError(400, "Curseur invalide.")
+
+    return valeurs, sens
+
+
+def verifier_taille(taille):
+    """Refuse (400) une taille de page nulle ou négative, quel que soit le mode."""
+    if taille < 1:
+        raise HttpError(400, "La taille de page doit être d'au moins 1.")
+
+
+def _inverser(cle):
+    return cle[1:] if cle.startswith("-") else f"-{cle}"
+
+
+def _filtre_keyset(cles, valeurs, inverse):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... selon le sens de chaque clé."""
+    condition = Q()
+    egalites = {}
+    for cle, valeur in zip(cles, valeurs):
+        champ = cle.lstrip("-")
+        descendant = cle.startswith("-") != inverse
+        operateur = "lt" if descendant else "gt"
+        condition |= Q(**egalites, **{f"{champ}__{operateur}": valeur})
+        egalites[champ] = valeur
+    return condition
+
+
+def _requete_curseur(qs, cles, curseur, taille):
+    """Requête bornée de la page demandée, avec son sens de parcours."""
+    verifier_taille(taille)
+    premiere_page = not curseur or curseur == CURSEUR_DEBUT
+    sens = SUIVANT
+
+    if not premiere_page:
+        valeurs, sens = _decoder_curseur(curseur, len(cles))
+        qs = qs.filter(_filtre_keyset(cles, valeurs, inverse=sens == PRECEDENT))
+
+    ordre = cles if sens == SUIVANT else [_inverser(cle) for cle in cles]
+    return qs.order_by(*ordre)[: taille + 1], sens, premiere_page
+
+
+def _page_curseur(objets, cles, taille, sens, premiere_page):
+    champs = [cle.lstrip("-") for cle in cles]
+    encore = len(objets) > taille
+    objets = objets[:taille]
+
+    if sens == PRECEDENT:
+        objets.reverse()
+
+    if not objets:
+        return objets, None, None
+
+    def valeurs_de(obj):
+        return [getattr(obj, champ) for champ in champs]
+
+    if sens == SUIVANT:
+        a_suivant, a_precedent = encore, not premiere_page
+    else:
+        a_suivant, a_precedent = True, encore
+
+    curseur_suivant = (
+        _encoder_curseur(valeurs_de(objets[-1]), SUIVANT) if a_suivant else None
+    )
+    curseur_precedent = (
+        _encoder_curseur(valeurs_de(objets[0]), PRECEDENT) if a_precedent else None
+    )
+
+    return objets, curseur_suivant, curseur_precedent
+
+
+def paginer_par_curseur(qs, cles, curseur, taille):
+    """
+    Pagination keyset sur `cles` (la dernière doit être unique, typiquement "id").
+    Ni COUNT ni OFFSET : chaque page coûte une requête bornée par `taille`.
+    Retourne (objets, curseur_suivant, curseur_precedent).
+    """
+    requete, sens, premiere_page = _requete_curseur(qs, cles, curseur, taille)
+    return _page_curseur(list(requete), cles, taille, sens, premiere_page)
+
+
+async def apaginer_par_curseur(qs, cles, curseur, taille):
+    """Équivalent de paginer_par_curseur pour les endpoints async."""
+    requete, sens, premiere_page = _requete_curseur(qs, cles, curseur, taille)
+    objets = [obj async for obj in requete]
+    return _page_curseur(objets, cles, taille, sens, premiere_page)
+
+
+async def apaginer_par_page(qs, page, taille):
+    """
+    Équivalent async de Paginator.get_page (une page hors limites renvoie la
+    dernière page). Retourne (objets, nombre_total).
+    """
+    verifier_taille(taille)
+    total = await qs.acount()
+    nombre_pages = max(1, -(-total // taille))
+    if page < 1 or page > nombre_pages:
+        page = nombre_pages
+    debut = (page - 1) * taille
+    objets = [obj async for obj in qs[debut : debut + taille]]
+    return objets, total
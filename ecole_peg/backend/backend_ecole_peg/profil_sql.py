@@ -0,0 +1,125 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Listes IN (%s, %s, ...) ramenées à une seule forme, quelle que soit leur taille.
+MOTIF_LISTE_PARAMETRES = re.compile(r"\((?:%s,\s*)+%s\)")
+
+
+def empreinte(sql):
+    """Forme de la requête : les paramètres sont déjà séparés par le pilote."""
+    return MOTIF_LISTE_PARAMETRES.sub("(%s...)", sql)
+
+
+class _Compteur:
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+        self.formes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - debut
+            self.nombre += 1
+            self.formes[empreinte(sql)] += 1
+
+
+class ProfilSQLMiddleware:
+    """
+    Compte les requêtes SQL et leur durée pour chaque opération de l'API,
+    les expose dans l'en-tête Server-Timing et journalise les requêtes HTTP
+    au-delà des seuils configurés, ainsi que les N+1 probables (même forme
+    de requête répétée au moins SQL_SEUIL_N_PLUS_1 fois).
+
+    Sous ASGI, les requêtes de l'ORM async s'exécutent dans le thread
+    synchrone de la requête : les compteurs y sont installés. Les calculs
+    lancés dans d'autres threads (sections du tableau de bord) n'y figurent pas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_PROFIL_ACTIF:
+            return self.get_response(request)
+
+        compteur = _Compteur()
+        debut = time.perf_counter()
+        with self._installer(compteur):
+            response = self.get_response(request)
+        self._rapporter(request, response, compteur, time.perf_counter() - debut)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.SQL_PROFIL_ACTIF:
+            return await self.get_response(request)
+
+        compteur = _Compteur()
+        debut = time.perf_counter()
+        pile = await sync_to_async(self._installer)(compteur)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pile.close)()
+        self._rapporter(request, response, compteur, time.perf_counter() - debut)
+        return response
+
+    def _installer(self, compteur):
+        pile = ExitStack()
+        for connexion in connections.all():
+            pile.enter_context(connexion.execute_wrapper(compteur))
+        return pile
+
+    def _rapporter(self, request, response, compteur, duree_totale):
+        duree_db_ms = compteur.duree * 1000
+        response["Server-Timing"] = (
+            f'db;dur={duree_db_ms:.1f};desc="{compteur.nombre} requetes", '
+            f"app;dur={duree_totale * 1000:.1f}"
+        )
+
+        operation = (
+            request.resolver_match.url_name
+            if getattr(request, "resolver_match", None)
+            else None
+        ) or request.path
+        suspects = [
+            (forme, nombre)
+            for forme, nombre in compteur.formes.most_common()
+            if nombre >= settings.SQL_SEUIL_N_PLUS_1
+        ]
+
+        if suspects:
+            logger.warning(
+                "N+1 probable sur %s %s : %s",
+                request.method,
+                operation,
+                "; ".join(f"{nombre}x {forme[:200]}" for forme, nombre in suspects),
+            )
+        if (
+            compteur.nombre > settings.SQL_SEUIL_REQUETES
+            or duree_db_ms > settings.SQL_SEUIL_DUREE_MS
+        ):
+            logger.warning(
+                "%s %s : %d requêtes SQL, %.1f ms en base",
+                request.method,
+                operation,
+                compteur.nombre,
+                duree_db_ms,
+            )
@@ -0,0 +1,92 @@
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS_REPLICA = "replica"
+COOKIE_ECRITURE_RECENTE = "ecriture_recente"
+METHODES_LECTURE = ("GET", "HEAD")
+
+# Vrai pendant une opération GET de l'API dont les lectures peuvent aller au réplica.
+_lecture_replica = ContextVar("lecture_replica", default=False)
+
+
+class RouteurLectureReplica:
+    """
+    Envoie les lectures des opérations GET de l'API vers le réplica, sauf dans
+    un bloc transaction.atomic() ou après une écriture dans la même requête.
+    Toutes les écritures vont au primaire.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _lecture_replica.get()
+            and ALIAS_REPLICA in settings.DATABASES
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return ALIAS_REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Lire ses propres écritures : la suite de la requête reste sur le primaire.
+        _lecture_replica.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class RoutageLectureMiddleware:
+    """
+    Autorise le réplica pour les GET de l'API. Après une requête d'écriture,
+    un cookie garde le client sur le primaire pendant DB_REPLICA_DELAI_COHERENCE
+    secondes, le temps que la réplication rattrape ses écritures.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        jeton = _lecture_replica.set(self._lecture(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _lecture_replica.reset(jeton)
+        return self._marquer_ecriture(request, response)
+
+    async def __acall__(self, request):
+        # Le contexte est copié vers les threads de l'ORM async.
+        jeton = _lecture_replica.set(self._lecture(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _lecture_replica.reset(jeton)
+        return self._marquer_ecriture(request, response)
+
+    def _lecture(self, request):
+        return (
+            request.method in METHODES_LECTURE
+            and request.path.startswith("/api/")
+            and COOKIE_ECRITURE_RECENTE not in request.COOKIES
+        )
+
+    def _marquer_ecriture(self, request, response):
+        if request.method not in METHODES_LECTURE + ("OPTIONS",):
+            response.set_cookie(
+                COOKIE_ECRITURE_RECENTE,
+                "1",
+                max_age=settings.DB_REPLICA_DELAI_COHERENCE,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
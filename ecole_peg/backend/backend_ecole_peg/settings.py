@@ -13,6 +13,7 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me")
 JWT_ACCESS_TOKEN_EXPIRES = timedelta(
     minutes=int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES_MINUTES", "15"))
 )
+JWT_CACHE_TAILLE = int(os.getenv("JWT_CACHE_TAILLE", "1024"))
 
 # --- Django core ---
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-key")
@@ -36,6 +37,8 @@ INSTALLED_APPS = [
 
 # --- Middleware (WhiteNoise juste après Security) ---
 MIDDLEWARE = [
+    "backend_ecole_peg.profil_sql.ProfilSQLMiddleware",
+    "backend_ecole_peg.routage_bd.RoutageLectureMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -84,9 +87,31 @@ DATABASES = {
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "3306"),
         "OPTIONS": {"init_command": "SET sql_mode='STRICT_TRANS_TABLES'"},
+        # 0 par défaut : sous ASGI (uvicorn_worker, voir procfile et dockerfile),
+        # le code synchrone s'exécute dans des threads sans lien avec la requête,
+        # et une connexion persistante n'y est ni réutilisée ni fermée. Pour
+        # réutiliser les connexions, placer un pooler (ProxySQL, MaxScale)
+        # devant MySQL ; une valeur > 0 ne convient qu'à un déploiement WSGI.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "0")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Réplica en lecture seule, utilisé par les GET de l'API (voir routage_bd).
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "USER": os.getenv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.getenv("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["backend_ecole_peg.routage_bd.RouteurLectureReplica"]
+# Durée (secondes) pendant laquelle un client reste sur le primaire après une écriture.
+DB_REPLICA_DELAI_COHERENCE = int(os.getenv("DB_REPLICA_DELAI_COHERENCE", "5"))
+
 # --- Password validation ---
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -108,6 +133,10 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Préfixe d'une location nginx `internal` servant MEDIA_ROOT, par exemple :
+#   location /media-protegee/ { internal; alias /app/media/; }
+# Les documents sont alors envoyés par nginx après contrôle d'accès.
+MEDIA_ACCEL_PREFIXE = os.getenv("MEDIA_ACCEL_PREFIXE", "")
 
 # --- Security (mets à True en prod HTTPS) ---
 SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "True").lower() == "true"
@@ -118,3 +147,50 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Uploads
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+
+# --- Miniatures et aperçus des documents (eleves.miniatures) ---
+MINIATURES_WORKERS = int(os.getenv("MINIATURES_WORKERS", "2"))
+MINIATURE_DIMENSION = int(os.getenv("MINIATURE_DIMENSION", "256"))
+# Les images au-delà de ces limites reçoivent un aperçu recompressé.
+APERCU_DIMENSION_MAX = int(os.getenv("APERCU_DIMENSION_MAX", "1600"))
+APERCU_POIDS_MAX = int(os.getenv("APERCU_POIDS_MAX", str(1536 * 1024)))
+
+# --- Factures PDF (factures.pdf) ---
+# Lignes séparées par « | », par exemple « École PEG|Rue du Lac 1|1200 Genève ».
+FACTURES_PDF_EMETTEUR = os.getenv("FACTURES_PDF_EMETTEUR", "École PEG").split("|")
+# Pied de page (coordonnées bancaires, etc.), même format.
+FACTURES_PDF_PIED = [l for l in os.getenv("FACTURES_PDF_PIED", "").split("|") if l]
+FACTURES_PDF_PROCESSUS = int(os.getenv("FACTURES_PDF_PROCESSUS", "2"))
+
+# --- Profil SQL par requête (en-tête Server-Timing, journalisation) ---
+# Actif par défaut seulement en DEBUG : en production, l'activer explicitement.
+SQL_PROFIL_ACTIF = os.getenv("SQL_PROFIL_ACTIF", str(DEBUG)).lower() == "true"
+SQL_SEUIL_REQUETES = int(os.getenv("SQL_SEUIL_REQUETES", "30"))
+SQL_SEUIL_DUREE_MS = float(os.getenv("SQL_SEUIL_DUREE_MS", "200"))
+SQL_SEUIL_N_PLUS_1 = int(os.getenv("SQL_SEUIL_N_PLUS_1", "5"))
+
+# --- Caches ---
+# `reponses` : cache des réponses des endpoints de référence (cache_reponses).
+# En mémoire locale par défaut (propre à chaque processus : les modifications
+# faites ailleurs sont visibles après CACHE_REPONSES_DUREE) ; avec
+# django.core.cache.backends.filebased.FileBasedCache et un dossier partagé
+# comme emplacement, l'invalidation par version vaut pour tous les workers.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "reponses": {
+        "BACKEND": os.getenv(
+            "CACHE_REPONSES_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_REPONSES_EMPLACEMENT", "reponses-api"),
+        "TIMEOUT": int(os.getenv("CACHE_REPONSES_DUREE", "300")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_REPONSES_MAX_ENTREES", "1000"))},
+    },
+}
+
+# --- Cache HTTP de la liste des pays ---
+PAYS_CACHE_CONTROL = os.getenv("PAYS_CACHE_CONTROL", "public, max-age=3600")
+
+# --- Tableau de bord (durée maximale de validité de l'instantané) ---
+TABLEAU_BORD_VALIDITE = timedelta(
+    seconds=int(os.getenv("TABLEAU_BORD_VALIDITE_SECONDES", "300"))
+)
@@ -0,0 +1,19 @@
+"""
+Réglages des tests : base SQLite en mémoire, sans réplica.
+
+    python manage.py test --settings=backend_ecole_peg.settings_test
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+SQL_PROFIL_ACTIF = False
+MINIATURES_WORKERS = 1
+FACTURES_PDF_PROCESSUS = 1
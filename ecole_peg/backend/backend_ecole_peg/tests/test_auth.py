@@ -0,0 +1,52 @@
+import time
+import jwt
+from django.conf import settings
+from django.test import SimpleTestCase
+from ..auth_api import CacheTokens, generer_token
+
+
+class CacheTokensTests(SimpleTestCase):
+    def test_succes_apres_premiere_verification(self):
+        cache = CacheTokens(taille_max=4)
+        token = generer_token()
+        cache.verifier(token)
+        cache.verifier(token)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_eviction_du_moins_recemment_utilise(self):
+        cache = CacheTokens(taille_max=2)
+        maintenant = int(time.time())
+        tokens = [
+            jwt.encode(
+                {"sub": "user", "iat": maintenant, "exp": maintenant + 60 + i},
+                settings.JWT_SECRET_KEY,
+                algorithm="HS256",
+            )
+            for i in range(3)
+        ]
+        cache.verifier(tokens[0])
+        cache.verifier(tokens[1])
+        cache.verifier(tokens[0])  # tokens[1] devient le moins récent
+        cache.verifier(tokens[2])
+
+        self.assertEqual(cache.statistiques()["taille"], 2)
+        misses = cache.misses
+        cache.verifier(tokens[0])
+        self.assertEqual(cache.misses, misses)
+        cache.verifier(tokens[1])
+        self.assertEqual(cache.misses, misses + 1)
+
+    def test_token_expire_refuse(self):
+        cache = CacheTokens(taille_max=2)
+        expire = jwt.encode(
+            {"sub": "user", "exp": int(time.time()) - 10},
+            settings.JWT_SECRET_KEY,
+            algorithm="HS256",
+        )
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            cache.verifier(expire)
+
+    def test_token_falsifie_refuse(self):
+        cache = CacheTokens(taille_max=2)
+        with self.assertRaises(jwt.InvalidTokenError):
+            cache.verifier(generer_token() + "x")
@@ -0,0 +1,77 @@
+from django.core.cache import caches
+from django.test import TestCase
+from cours.models import Cours, Enseignant
+from ..auth_api import generer_token
+from ..cache_reponses import ALIAS_CACHE, statistiques_cache
+from ..fabriques_test import creer_cours
+
+
+class CacheReponsesTests(TestCase):
+    def setUp(self):
+        caches[ALIAS_CACHE].clear()
+        self.client.cookies["access_token"] = generer_token()
+        self.cours = creer_cours()
+
+    def _noms(self, url="/api/cours/cours/", **parametres):
+        reponse = self.client.get(url, parametres)
+        self.assertEqual(reponse.status_code, 200)
+        return [c["nom"] for c in reponse.json()]
+
+    def test_reponse_servie_depuis_le_cache(self):
+        self.assertEqual(self._noms(), ["Français B1"])
+        # update() n'émet aucun signal : la réponse en cache reste servie.
+        Cours.objects.update(nom="Modifié")
+        with self.assertNumQueries(0):
+            self.assertEqual(self._noms(), ["Français B1"])
+
+    def test_invalidee_apres_validation_d_une_modification(self):
+        self.assertEqual(self._noms(), ["Français B1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cours.nom = "Anglais A2"
+            self.cours.save()
+        self.assertEqual(self._noms(), ["Anglais A2"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cours.delete()
+        self.assertEqual(self._noms(), [])
+
+    def test_modification_d_un_autre_modele_sans_effet(self):
+        self._noms()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enseignant.objects.create(nom="Favre", prenom="Anne")
+        with self.assertNumQueries(0):
+            self._noms()
+
+    def test_cle_selon_les_parametres(self):
+        Enseignant.objects.create(nom="Favre", prenom="Anne")
+        Enseignant.objects.create(nom="Rossi", prenom="Luca")
+        url = "/api/cours/enseignants/"
+        self.assertEqual(self._noms(url, search="fav"), ["Favre"])
+        self.assertEqual(self._noms(url, search="ros"), ["Rossi"])
+
+    def test_etag_et_304(self):
+        reponse = self.client.get("/api/cours/cours/")
+        etag = reponse["ETag"]
+        self.assertEqual(reponse["Cache-Control"], "private, no-cache")
+
+        reponse = self.client.get("/api/cours/cours/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 304)
+        self.assertEqual(reponse.content, b"")
+        self.assertEqual(reponse["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            creer_cours(nom="Anglais A2")
+        reponse = self.client.get("/api/cours/cours/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse["ETag"], etag)
+
+    def test_statistiques_par_route(self):
+        avant = statistiques_cache.statistiques()["routes"].get(
+            "api/cours/cours/", {"hits": 0, "misses": 0}
+        )
+        self._noms()
+        self._noms()
+        apres = statistiques_cache.statistiques()["routes"]["api/cours/cours/"]
+        self.assertEqual(
+            (apres["hits"] - avant["hits"], apres["misses"] - avant["misses"]), (1, 1)
+        )
@@ -0,0 +1,68 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from ninja.errors import HttpError
+from ..export import TAILLE_MORCEAU, aiterer, reponse_export
+
+
+class ExportTests(SimpleTestCase):
+    def test_csv_diffuse_ligne_par_ligne(self):
+        lues = []
+
+        def lignes():
+            for i in range(3):
+                lues.append(i)
+                yield [i, f"nom {i}"]
+
+        reponse = reponse_export("csv", "essai", ["ID", "Nom"], lignes())
+        morceaux = iter(reponse.streaming_content)
+        self.assertEqual(next(morceaux).decode(), "\ufeffID;Nom\r\n")
+        self.assertEqual(lues, [])
+        self.assertEqual(next(morceaux).decode(), "0;nom 0\r\n")
+        self.assertEqual(lues, [0])
+        self.assertEqual(len(list(morceaux)), 2)
+
+    async def test_csv_asynchrone_diffuse_par_blocs(self):
+        lues = []
+
+        def lignes():
+            for i in range(3):
+                lues.append(i)
+                yield [i, "x" * TAILLE_MORCEAU]
+
+        reponse = reponse_export("csv", "essai", ["ID", "Nom"], lignes(), asynchrone=True)
+        self.assertTrue(reponse.is_async)
+        morceaux = aiter(reponse.streaming_content)
+        premier = await anext(morceaux)
+        self.assertTrue(premier.startswith("\ufeffID;Nom\r\n0;".encode()))
+        self.assertEqual(lues, [0])
+        self.assertEqual(len([m async for m in morceaux]), 2)
+        self.assertEqual(lues, [0, 1, 2])
+
+    async def test_asynchrone_dans_un_seul_thread(self):
+        threads = []
+
+        def lignes():
+            for i in range(3):
+                threads.append(threading.get_ident())
+                yield "x" * TAILLE_MORCEAU
+
+        with mock.patch("backend_ecole_peg.export.connections") as connexions:
+            self.assertEqual(len([m async for m in aiterer(lignes())]), 3)
+        self.assertEqual(len(set(threads)), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        # Connexion fermée une fois, après le dernier bloc.
+        connexions.close_all.assert_called_once_with()
+
+    async def test_xlsx_asynchrone(self):
+        reponse = reponse_export(
+            "xlsx", "essai", ["ID"], iter([[1], [2]]), asynchrone=True
+        )
+        self.assertTrue(reponse.is_async)
+        contenu = b"".join([m async for m in reponse.streaming_content])
+        self.assertTrue(contenu.startswith(b"PK"))
+        self.assertEqual(int(reponse["Content-Length"]), len(contenu))
+
+    def test_format_inconnu(self):
+        with self.assertRaises(HttpError):
+            reponse_export("ods", "essai", ["ID"], iter([]))
@@ -0,0 +1,83 @@
+from django.test import TestCase
+from ninja.errors import HttpError
+from eleves.models import Pays
+from ..auth_api import generer_token
+from ..fabriques_test import creer_eleve, creer_pays
+from ..pagination import CURSEUR_DEBUT, paginer_par_curseur
+
+
+class PaginationCurseurTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            Pays.objects.create(nom=f"Pays {i // 2}-{i}", indicatif=f"+{i}")
+        cls.cles = ["nom", "id"]
+        cls.ordre = list(Pays.objects.order_by(*cls.cles).values_list("id", flat=True))
+
+    def _ids(self, objets):
+        return [p.id for p in objets]
+
+    def test_parcours_avant_puis_arriere(self):
+        qs = Pays.objects.all()
+        pages = []
+        curseur = CURSEUR_DEBUT
+        while curseur:
+            objets, curseur, precedent = paginer_par_curseur(qs, self.cles, curseur, 3)
+            pages.append((self._ids(objets), precedent))
+
+        self.assertEqual(
+            [ids for ids, _ in pages],
+            [self.ordre[0:3], self.ordre[3:6], self.ordre[6:]],
+        )
+        self.assertIsNone(pages[0][1])
+
+        objets, suivant, precedent = paginer_par_curseur(qs, self.cles, pages[-1][1], 3)
+        self.assertEqual(self._ids(objets), self.ordre[3:6])
+        self.assertIsNotNone(suivant)
+        self.assertIsNotNone(precedent)
+
+    def test_ordre_descendant(self):
+        objets, suivant, _ = paginer_par_curseur(Pays.objects.all(), ["-id"], None, 4)
+        self.assertEqual(self._ids(objets), sorted(self.ordre, reverse=True)[:4])
+        objets, suivant, _ = paginer_par_curseur(Pays.objects.all(), ["-id"], suivant, 4)
+        self.assertEqual(self._ids(objets), sorted(self.ordre, reverse=True)[4:])
+        self.assertIsNone(suivant)
+
+    def test_curseur_invalide(self):
+        with self.assertRaises(HttpError) as contexte:
+            paginer_par_curseur(Pays.objects.all(), self.cles, "n'importe quoi", 3)
+        self.assertEqual(contexte.exception.status_code, 400)
+
+    def test_taille_nulle_refusee(self):
+        for taille in (0, -1):
+            with self.subTest(taille=taille):
+                with self.assertRaises(HttpError) as contexte:
+                    paginer_par_curseur(
+                        Pays.objects.all(), self.cles, CURSEUR_DEBUT, taille
+                    )
+                self.assertEqual(contexte.exception.status_code, 400)
+
+
+class TaillePageEndpointsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = creer_eleve(creer_pays())
+
+    def setUp(self):
+        self.client.cookies["access_token"] = generer_token()
+
+    def test_taille_nulle_refusee_par_page_et_par_curseur(self):
+        urls = [
+            f"/api/factures/factures/eleve/{self.eleve.id}/",
+            f"/api/factures/factures/eleve/{self.eleve.id}/payees/",
+            f"/api/factures/factures/eleve/{self.eleve.id}/impayees/",
+            f"/api/factures/paiements/eleve/{self.eleve.id}/",
+            "/api/factures/factures/",
+            "/api/eleves/eleves/",
+        ]
+        for url in urls:
+            for parametres in ({"taille": 0}, {"taille": -5, "curseur": CURSEUR_DEBUT}):
+                if "curseur" in parametres and url.endswith(("payees/", "impayees/")):
+                    continue
+                with self.subTest(url=url, **parametres):
+                    self.assertEqual(self.client.get(url, parametres).status_code, 400)
@@ -23,7 +23,10 @@ from django.conf.urls.static import static
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", api.urls), 
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
+]
 
+# En production, les documents ne sont servis que par l'endpoint authentifié
+# /api/eleves/eleves/{id}/documents/{id}/fichier/.
 if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import calendar
-from datetime import date, timedelta
+from datetime import date, time, timedelta
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
@@ -34,18 +34,31 @@ from .schemas import (
     InscriptionIn,
     InscriptionUpdateIn,
     FichePresencesIn,
+    TauxPresenceOut,
+    FichePresencesMatriceOut,
+    CreneauIn,
+    CreneauOut,
+    VerificationCreneauOut,
 )
+from .presences import taux_presence
+from .fiches import generer_fiches, sessions_ouvertes_du_mois
+from .disponibilites import IndexDisponibilites
 from django.db import transaction
-from django.core.paginator import Paginator
+from backend_ecole_peg.pagination import apaginer_par_curseur, apaginer_par_page
+from backend_ecole_peg.cache_reponses import areponse_en_cache, reponse_en_cache
+from eleves.tableau_bord import SECTIONS_PAR_MODELE, invalider_sections
 
 router = Router()
 
 # ------------------- COURS -------------------
 
-@router.get("/cours/")
+@router.get("/cours/", response=List[CoursOut])
 def get_cours(request):
-    cours = Cours.objects.all()
-    return [CoursOut.from_orm(c) for c in cours]
+    return reponse_en_cache(
+        request,
+        ("cours.Cours",),
+        lambda: [CoursOut.from_orm(c) for c in Cours.objects.all()],
+    )
 
 @router.get("/cours/{cours_id}/")
 def get_cours_specifique(request, cours_id: int):
@@ -83,14 +96,18 @@ def delete_cours(request, cours_id: int):
         cours.delete()
 
 # ------------------- ENSEIGNANT -------------------
-@router.get("/enseignants/")
+@router.get("/enseignants/", response=List[EnseignantOut])
 def list_enseignants(request, search: Optional[str] = None):  # Correction ici
     enseignants = Enseignant.objects.all()
     if search:
         enseignants = enseignants.filter(
             Q(nom__icontains=search) | Q(prenom__icontains=search)
         )
-    return [EnseignantOut.from_orm(e) for e in enseignants]
+    return reponse_en_cache(
+        request,
+        ("cours.Enseignant",),
+        lambda: [EnseignantOut.from_orm(e) for e in enseignants],
+    )
 
 @router.post("/enseignant/")
 def create_enseignant(request, enseignant: EnseignantIn):
@@ -122,15 +139,81 @@ def delete_enseignant(request, enseignant_id: int):
         enseignant = get_object_or_404(Enseignant, id=enseignant_id)
         enseignant.delete()
 
+DUREE_MAX_DISPONIBILITES = timedelta(days=366)
+
+@router.get(
+    "/enseignants/{enseignant_id}/disponibilites/", response={200: List[CreneauOut], 400: dict}
+)
+def disponibilites_enseignant(
+    request,
+    enseignant_id: int,
+    date_debut: date,
+    date_fin: date,
+    duree_minutes: int = 60,
+    heure_min: time = time(8, 0),
+    heure_max: time = time(21, 0),
+    inclure_weekends: bool = False,
+):
+    """Créneaux libres d'au moins `duree_minutes` d'un enseignant sur une période."""
+    get_object_or_404(Enseignant, id=enseignant_id)
+    if date_fin < date_debut or date_fin - date_debut > DUREE_MAX_DISPONIBILITES:
+        return 400, {"message": "Période invalide (un an maximum)."}
+    if duree_minutes <= 0:
+        return 400, {"message": "La durée doit être d'au moins une minute."}
+    if heure_min >= heure_max:
+        return 400, {"message": "L'heure minimale doit précéder l'heure maximale."}
+
+    index = IndexDisponibilites(enseignant_id, date_debut, date_fin)
+    return 200, [
+        {"date": jour, "heure_debut": debut, "heure_fin": fin}
+        for jour, debut, fin in index.creneaux_libres(
+            duree_minutes, heure_min, heure_max, inclure_weekends
+        )
+    ]
+
+@router.post(
+    "/enseignants/{enseignant_id}/disponibilites/verifier/",
+    response={200: List[VerificationCreneauOut], 400: dict},
+)
+def verifier_disponibilites_enseignant(
+    request, enseignant_id: int, creneaux: List[CreneauIn]
+):
+    """Vérifie en une passe si chaque créneau proposé est libre pour l'enseignant."""
+    get_object_or_404(Enseignant, id=enseignant_id)
+    erreurs = {
+        str(i): ["L'heure de fin doit suivre l'heure de début."]
+        for i, c in enumerate(creneaux)
+        if c.heure_fin <= c.heure_debut
+    }
+    if erreurs:
+        return 400, {"message": "Créneaux invalides.", "erreurs": erreurs}
+    if not creneaux:
+        return 200, []
+
+    index = IndexDisponibilites(
+        enseignant_id, min(c.date for c in creneaux), max(c.date for c in creneaux)
+    )
+    libres = index.verifier([(c.date, c.heure_debut, c.heure_fin) for c in creneaux])
+    return 200, [
+        {
+            "date": c.date,
+            "heure_debut": c.heure_debut,
+            "heure_fin": c.heure_fin,
+            "libre": libre,
+        }
+        for c, libre in zip(creneaux, libres)
+    ]
+
 # ------------------- SESSION -------------------
 @router.get("/sessions/")
-def sessions(
+async def sessions(
     request,
     page: int = 1,
     taille: int = 10,
     type: Optional[str] = None,     # Correction ici
     niveau: Optional[str] = None,   # Correction ici
     statut: Optional[str] = None,   # Correction ici
+    curseur: Optional[str] = None,
 ):
     sessions_qs = (
         Session.objects.select_related("cours", "enseignant")
@@ -143,7 +226,7 @@ def sessions(
             cours__type_cours=models.F("cours__type_cours"),
             cours__niveau=models.F("cours__niveau"),
         )
-        .order_by("date_debut")
+        .order_by("date_debut", "id")
     )
 
     if type and type != "tous":
@@ -153,30 +236,59 @@ def sessions(
     if statut and statut != "tous":
         sessions_qs = sessions_qs.filter(statut=statut)
 
-    paginator = Paginator(sessions_qs, taille)
-    page_obj = paginator.get_page(page)
+    async def calculer():
+        if curseur is not None:
+            objets, suivant, precedent = await apaginer_par_curseur(
+                sessions_qs, ["date_debut", "id"], curseur, taille
+            )
+            return {
+                "sessions": [SessionOut.from_orm(s) for s in objets],
+                "curseur_suivant": suivant,
+                "curseur_precedent": precedent,
+            }
 
-    return {
-        "sessions": [SessionOut.from_orm(s) for s in page_obj.object_list],
-        "nombre_total": paginator.count,
-    }
+        objets, total = await apaginer_par_page(sessions_qs, page, taille)
 
-@router.get("/sessions/{id_session}/", response=SessionOut)
-def rechercher_session(request, id_session: int):
-    session = get_object_or_404(
-        Session.objects.select_related("cours", "enseignant").annotate(
-            cours__nom=models.F("cours__nom"),
-            cours__type_cours=models.F("cours__type_cours"),
-            cours__niveau=models.F("cours__niveau"),
-            id_cours=models.F("cours__id"),
-            id_enseignant=models.F("enseignant__id"),
-            enseignant__nom=models.F("enseignant__nom"),
-            enseignant__prenom=models.F("enseignant__prenom"),
-        ),
-        id=id_session,
+        return {
+            "sessions": [SessionOut.from_orm(s) for s in objets],
+            "nombre_total": total,
+        }
+
+    return await areponse_en_cache(
+        request, ("cours.Session", "cours.Cours", "cours.Enseignant"), calculer
     )
+
+@router.get("/sessions/{id_session}/", response=SessionOut)
+async def rechercher_session(request, id_session: int):
+    try:
+        session = await (
+            Session.objects.select_related("cours", "enseignant")
+            .annotate(
+                cours__nom=models.F("cours__nom"),
+                cours__type_cours=models.F("cours__type_cours"),
+                cours__niveau=models.F("cours__niveau"),
+                id_cours=models.F("cours__id"),
+                id_enseignant=models.F("enseignant__id"),
+                enseignant__nom=models.F("enseignant__nom"),
+                enseignant__prenom=models.F("enseignant__prenom"),
+            )
+            .aget(id=id_session)
+        )
+    except Session.DoesNotExist:
+        raise Http404
     return SessionOut.from_orm(session)
 
+@router.get("/sessions/{id_session}/taux_presence/", response=List[TauxPresenceOut])
+def taux_presence_session(request, id_session: int, seuil: Optional[float] = None):
+    """Taux de présence des élèves actifs d'une session."""
+    session = get_object_or_404(Session, id=id_session)
+    return taux_presence(session.inscriptions.all(), seuil=seuil)
+
+@router.get("/taux_presence/", response=List[TauxPresenceOut])
+def taux_presence_ecole(request, seuil: Optional[float] = None):
+    """Taux de présence de toutes les inscriptions actives, filtrés sous `seuil`."""
+    return taux_presence(seuil=seuil)
+
 # (Le reste du fichier ne contient pas de syntaxe incompatible 3.9)
 
 # Pour les fonctions où il y a des `list[...]`, sur Python 3.9, mieux vaut utiliser List[...] :
@@ -184,7 +296,9 @@ def rechercher_session(request, id_session: int):
 @router.get("/eleves/{eleve_id}/cours_prives/", response=List[CoursPriveOut])  # Correction ici
 def get_cours_prives_by_eleve(request, eleve_id: int):
     eleve = get_object_or_404(Eleve, id=eleve_id)
-    cours_prives = eleve.cours_prives.select_related("enseignant").all()
+    cours_prives = eleve.cours_prives.select_related("enseignant").prefetch_related(
+        "eleves"
+    )
     return [
         CoursPriveOut(
             id=cours_prive.id,
@@ -204,6 +318,82 @@ def get_cours_prives_by_eleve(request, eleve_id: int):
         for cours_prive in cours_prives
     ]
 
+@router.post("/session/{id_session}/fiche_presences/")
+def creer_fiche_presences(request, id_session: int, fiche: FichePresencesIn):
+    """Crée la fiche du mois et ses présences (idempotent sur session, mois et année)."""
+    session = get_object_or_404(Session, id=id_session)
+    try:
+        resultat = generer_fiches([session], fiche.annee, int(fiche.mois))
+    except (ValueError, ValidationError) as e:
+        erreurs = getattr(e, "message_dict", {"mois": [str(e)]})
+        return {"message": "Erreurs de validation.", "erreurs": erreurs}
+    fiche_obj, nombre = resultat[session.id]
+    return {"id": fiche_obj.id, "presences_generees": nombre}
+
+@router.post("/fiches_presences/generer/")
+def generer_fiches_sessions_ouvertes(request, fiche: FichePresencesIn):
+    """Génère en un appel les fiches du mois de toutes les sessions ouvertes."""
+    try:
+        mois = int(fiche.mois)
+        resultat = generer_fiches(
+            sessions_ouvertes_du_mois(fiche.annee, mois), fiche.annee, mois
+        )
+    except (ValueError, ValidationError) as e:
+        erreurs = getattr(e, "message_dict", {"mois": [str(e)]})
+        return {"message": "Erreurs de validation.", "erreurs": erreurs}
+    return {
+        "fiches": [
+            {"id_session": id_session, "id": fiche_obj.id, "presences_generees": nombre}
+            for id_session, (fiche_obj, nombre) in resultat.items()
+        ]
+    }
+
+@router.get(
+    "/fiche_presences/{id_fiche_presences}/matrice/",
+    response=FichePresencesMatriceOut,
+)
+def fiche_presences_matrice(request, id_fiche_presences: int):
+    """
+    Fiche de présences sous forme de matrice élèves × dates, construite à partir
+    d'une seule requête sur Presence jointe à Eleve.
+    """
+    fiche = get_object_or_404(
+        FichePresences.objects.only("id", "mois", "annee"), id=id_fiche_presences
+    )
+    lignes = (
+        Presence.objects.filter(fiche_presences_id=fiche.id)
+        .order_by("eleve__nom", "eleve__prenom", "eleve_id", "date_presence")
+        .values_list(
+            "id", "eleve_id", "eleve__nom", "eleve__prenom", "date_presence", "statut"
+        )
+    )
+
+    eleves = {}
+    cellules = {}
+    dates = set()
+    for id_presence, eleve_id, nom, prenom, date_presence, statut in lignes:
+        eleves.setdefault(eleve_id, {"id": eleve_id, "nom": nom, "prenom": prenom})
+        cellules[eleve_id, date_presence] = (id_presence, statut)
+        dates.add(date_presence)
+
+    dates = sorted(dates)
+    statuts = []
+    ids_presences = []
+    for eleve_id in eleves:
+        ligne = [cellules.get((eleve_id, d)) for d in dates]
+        statuts.append("".join(c[1] if c else "-" for c in ligne))
+        ids_presences.append([c[0] if c else None for c in ligne])
+
+    return {
+        "id": fiche.id,
+        "mois": fiche.mois,
+        "annee": fiche.annee,
+        "eleves": list(eleves.values()),
+        "dates": dates,
+        "statuts": statuts,
+        "ids_presences": ids_presences,
+    }
+
 @router.put("/fiche_presences/{id_fiche_presences}/")
 def modifier_fiche_presences(
     request, id_fiche_presences: int, payload: List[PresenceIn]   # Correction ici
@@ -232,5 +422,7 @@ def modifier_fiche_presences(
     with transaction.atomic():
         if a_modifier:
             Presence.objects.bulk_update(a_modifier, ["statut"])
+            # bulk_update n'émet pas post_save.
+            invalider_sections(SECTIONS_PAR_MODELE["cours.Presence"])
 
     return {"success": True}
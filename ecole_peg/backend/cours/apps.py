@@ -4,6 +4,3 @@ from django.apps import AppConfig
 class CoursConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cours'
-
-    def ready(self):
-        import cours.signals
@@ -0,0 +1,59 @@
+import time
+from django.db import transaction
+from django.utils import timezone
+from backend_ecole_peg.cache_reponses import incrementer_version
+from eleves.tableau_bord import SECTIONS_PAR_MODELE, invalider_sections
+from .models import (
+    Inscription,
+    Session,
+    StatutInscriptionChoices,
+    StatutSessionChoices,
+)
+
+
+def appliquer_cycle_sessions(aujourd_hui=None):
+    """
+    Ferme les sessions échues et désactive leurs inscriptions, rouvre les
+    sessions dont la date de fin a été repoussée : un UPDATE ensembliste par
+    opération, dans une transaction. Retourne lignes affectées et durées.
+    """
+    aujourd_hui = aujourd_hui or timezone.now().date()
+    rapport = {}
+
+    def mesurer(nom, qs, **valeurs):
+        debut = time.perf_counter()
+        lignes = qs.update(**valeurs)
+        rapport[nom] = {"lignes": lignes, "duree": time.perf_counter() - debut}
+
+    with transaction.atomic():
+        mesurer(
+            "sessions_fermees",
+            Session.objects.filter(
+                date_fin__lt=aujourd_hui, statut=StatutSessionChoices.OUVERTE
+            ),
+            statut=StatutSessionChoices.FERMÉE,
+        )
+        mesurer(
+            "inscriptions_desactivees",
+            Inscription.objects.filter(
+                session__date_fin__lt=aujourd_hui, statut=StatutInscriptionChoices.ACTIF
+            ),
+            statut=StatutInscriptionChoices.INACTIF,
+        )
+        mesurer(
+            "sessions_rouvertes",
+            Session.objects.filter(
+                date_fin__gte=aujourd_hui, statut=StatutSessionChoices.FERMÉE
+            ),
+            statut=StatutSessionChoices.OUVERTE,
+        )
+
+        if any(r["lignes"] for r in rapport.values()):
+            # update() n'émet pas post_save.
+            invalider_sections(
+                set(SECTIONS_PAR_MODELE["cours.Session"])
+                | set(SECTIONS_PAR_MODELE["cours.Inscription"])
+            )
+            transaction.on_commit(lambda: incrementer_version("cours.Session"))
+
+    return rapport
@@ -0,0 +1,100 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import time, timedelta
+from .fiches import jours_ouvrables
+from .models import CoursPrive, PeriodeJourneeChoices, Session
+
+# Plage horaire occupée par une session selon sa période de la journée.
+PLAGES_PERIODE = {
+    PeriodeJourneeChoices.MATIN: (time(8, 0), time(12, 0)),
+    PeriodeJourneeChoices.APRES_MIDI: (time(13, 30), time(17, 0)),
+    PeriodeJourneeChoices.SOIR: (time(18, 0), time(21, 0)),
+}
+
+
+def _minutes(heure):
+    return heure.hour * 60 + heure.minute
+
+
+def _heure(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+class IndexDisponibilites:
+    """
+    Occupations d'un enseignant sur une période, chargées en deux requêtes
+    (cours privés, sessions) et rangées par jour en intervalles triés et
+    fusionnés : chaque test de conflit est une recherche dichotomique.
+    """
+
+    def __init__(self, enseignant_id, date_debut, date_fin):
+        self.date_debut = date_debut
+        self.date_fin = date_fin
+        occupations = defaultdict(list)
+
+        for jour, debut, fin in CoursPrive.objects.filter(
+            enseignant_id=enseignant_id,
+            date_cours_prive__range=(date_debut, date_fin),
+        ).values_list("date_cours_prive", "heure_debut", "heure_fin"):
+            occupations[jour].append((_minutes(debut), _minutes(fin)))
+
+        for debut_session, fin_session, periode in Session.objects.filter(
+            enseignant_id=enseignant_id,
+            date_debut__lte=date_fin,
+            date_fin__gte=date_debut,
+        ).values_list("date_debut", "date_fin", "periode_journee"):
+            plage = PLAGES_PERIODE.get(periode)
+            if not plage:
+                continue
+            intervalle = (_minutes(plage[0]), _minutes(plage[1]))
+            for jour in jours_ouvrables(
+                max(debut_session, date_debut), min(fin_session, date_fin)
+            ):
+                occupations[jour].append(intervalle)
+
+        self._debuts = {}
+        self._fins = {}
+        for jour, intervalles in occupations.items():
+            fusion = []
+            for debut, fin in sorted(intervalles):
+                if fusion and debut <= fusion[-1][1]:
+                    fusion[-1][1] = max(fusion[-1][1], fin)
+                else:
+                    fusion.append([debut, fin])
+            self._debuts[jour] = [d for d, _ in fusion]
+            self._fins[jour] = [f for _, f in fusion]
+
+    def est_libre(self, jour, heure_debut, heure_fin):
+        debuts = self._debuts.get(jour)
+        if not debuts:
+            return True
+        debut, fin = _minutes(heure_debut), _minutes(heure_fin)
+        # Dernier intervalle commençant avant la fin du créneau.
+        i = bisect_right(debuts, fin - 1) - 1
+        return i < 0 or self._fins[jour][i] <= debut
+
+    def verifier(self, creneaux):
+        """Teste une liste de (jour, heure_debut, heure_fin) en une passe."""
+        return [self.est_libre(*creneau) for creneau in creneaux]
+
+    def creneaux_libres(self, duree_minutes, heure_min, heure_max, inclure_weekends=False):
+        """Créneaux libres d'au moins `duree_minutes` entre heure_min et heure_max."""
+        borne_min, borne_max = _minutes(heure_min), _minutes(heure_max)
+        if duree_minutes <= 0 or borne_min >= borne_max:
+            # Sinon chaque occupation produirait des créneaux de durée nulle.
+            raise ValueError("Durée ou plage horaire invalide.")
+        resultat = []
+        jour = self.date_debut
+        while jour <= self.date_fin:
+            if inclure_weekends or jour.weekday() < 5:
+                curseur = borne_min
+                for debut, fin in zip(
+                    self._debuts.get(jour, []), self._fins.get(jour, [])
+                ):
+                    if min(debut, borne_max) - curseur >= duree_minutes:
+                        resultat.append((jour, _heure(curseur), _heure(min(debut, borne_max))))
+                    curseur = max(curseur, fin)
+                if borne_max - curseur >= duree_minutes:
+                    resultat.append((jour, _heure(curseur), _heure(borne_max)))
+            jour += timedelta(days=1)
+        return resultat
@@ -0,0 +1,131 @@
+import calendar
+from datetime import date, timedelta
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from eleves.tableau_bord import SECTIONS_PAR_MODELE, invalider_sections
+from .models import (
+    FichePresences,
+    Inscription,
+    MoisChoices,
+    Presence,
+    Session,
+    StatutInscriptionChoices,
+    StatutPresenceChoices,
+    StatutSessionChoices,
+)
+
+TAILLE_LOT_PRESENCES = 1000
+
+
+def jours_ouvrables(debut, fin):
+    """Jours du lundi au vendredi entre `debut` et `fin` inclus."""
+    jours = []
+    jour = debut
+    while jour <= fin:
+        if jour.weekday() < 5:
+            jours.append(jour)
+        jour += timedelta(days=1)
+    return jours
+
+
+def dates_cours(session, annee, mois):
+    """Jours ouvrables du mois compris dans la période de la session."""
+    premier = date(annee, mois, 1)
+    dernier = date(annee, mois, calendar.monthrange(annee, mois)[1])
+    return jours_ouvrables(max(premier, session.date_debut), min(dernier, session.date_fin))
+
+
+def generer_fiches(sessions, annee, mois, statut=StatutPresenceChoices.ABSENT):
+    """
+    Crée, pour chaque session, la fiche du mois et une présence par inscription
+    active et par date de cours, au statut `statut` (absent par défaut : le
+    personnel saisit ensuite les présences réelles). Quelques requêtes et un
+    seul bulk_create des présences, dans une transaction. Idempotent sur
+    (session, mois, annee) : une fiche existante est réutilisée et seules les
+    présences manquantes sont ajoutées ; un élève ayant déjà une présence à
+    une date (dans une autre session) n'en reçoit pas de seconde.
+    Retourne {id_session: (fiche, nombre de présences créées)}.
+    """
+    code_mois = f"{mois:02d}"
+    if code_mois not in MoisChoices.values:
+        raise ValidationError({"mois": ["Mois invalide."]})
+
+    sessions = list(sessions)
+    if not sessions:
+        return {}
+    ids_sessions = [s.id for s in sessions]
+    premier = date(annee, mois, 1)
+    dernier = date(annee, mois, calendar.monthrange(annee, mois)[1])
+
+    with transaction.atomic():
+        # Verrou sur les sessions : deux générations simultanées du même mois
+        # ne peuvent pas créer deux fois les mêmes présences.
+        list(Session.objects.select_for_update().filter(id__in=ids_sessions))
+
+        fiches_du_mois = FichePresences.objects.filter(
+            session_id__in=ids_sessions, mois=code_mois, annee=annee
+        )
+        fiches = {f.session_id: f for f in fiches_du_mois}
+        nouvelles = [
+            FichePresences(session=s, mois=code_mois, annee=annee)
+            for s in sessions
+            if s.id not in fiches
+        ]
+        if nouvelles:
+            FichePresences.objects.bulk_create(nouvelles)
+            # MySQL ne renvoie pas les ids d'un INSERT multiple.
+            fiches = {f.session_id: f for f in fiches_du_mois.all()}
+
+        eleves_par_session = {}
+        for session_id, eleve_id in Inscription.objects.filter(
+            session_id__in=ids_sessions,
+            statut=StatutInscriptionChoices.ACTIF,
+            preinscription=False,
+        ).values_list("session_id", "eleve_id"):
+            eleves_par_session.setdefault(session_id, []).append(eleve_id)
+
+        # Unicité (eleve, date_presence) : les dates déjà prises, toutes
+        # sessions confondues, sont exclues plutôt qu'ignorées à l'insertion.
+        dates_prises = set(
+            Presence.objects.filter(
+                eleve_id__in={e for ids in eleves_par_session.values() for e in ids},
+                date_presence__range=(premier, dernier),
+            ).values_list("eleve_id", "date_presence")
+        )
+
+        presences = []
+        compte = {}
+        for session in sessions:
+            fiche = fiches[session.id]
+            compte[session.id] = 0
+            for jour in dates_cours(session, annee, mois):
+                for eleve_id in eleves_par_session.get(session.id, []):
+                    if (eleve_id, jour) in dates_prises:
+                        continue
+                    dates_prises.add((eleve_id, jour))
+                    presences.append(
+                        Presence(
+                            fiche_presences=fiche,
+                            eleve_id=eleve_id,
+                            date_presence=jour,
+                            statut=statut,
+                        )
+                    )
+                    compte[session.id] += 1
+
+        Presence.objects.bulk_create(presences, batch_size=TAILLE_LOT_PRESENCES)
+        if presences:
+            # bulk_create n'émet pas post_save.
+            invalider_sections(SECTIONS_PAR_MODELE["cours.Presence"])
+
+    return {s.id: (fiches[s.id], compte[s.id]) for s in sessions}
+
+
+def sessions_ouvertes_du_mois(annee, mois):
+    premier = date(annee, mois, 1)
+    dernier = date(annee, mois, calendar.monthrange(annee, mois)[1])
+    return Session.objects.filter(
+        statut=StatutSessionChoices.OUVERTE,
+        date_debut__lte=dernier,
+        date_fin__gte=premier,
+    )
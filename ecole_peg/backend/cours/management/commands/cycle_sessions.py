@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from cours.cycle_sessions import appliquer_cycle_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Fermer les sessions échues (et désactiver leurs inscriptions) et rouvrir "
+        "les sessions prolongées. À planifier chaque nuit (cron)."
+    )
+
+    def handle(self, *args, **options):
+        rapport = appliquer_cycle_sessions()
+        for operation, resultat in rapport.items():
+            self.stdout.write(
+                f"{operation} : {resultat['lignes']} ligne(s) en "
+                f"{resultat['duree'] * 1000:.1f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS("Cycle des sessions appliqué."))
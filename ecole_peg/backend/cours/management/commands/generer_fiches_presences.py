@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cours.fiches import generer_fiches, sessions_ouvertes_du_mois
+
+
+class Command(BaseCommand):
+    help = "Générer les fiches de présences du mois pour toutes les sessions ouvertes"
+
+    def add_arguments(self, parser):
+        aujourd_hui = timezone.now().date()
+        parser.add_argument("--mois", type=int, default=aujourd_hui.month)
+        parser.add_argument("--annee", type=int, default=aujourd_hui.year)
+
+    def handle(self, *args, **options):
+        mois, annee = options["mois"], options["annee"]
+        if not 1 <= mois <= 12:
+            raise CommandError("Le mois doit être compris entre 1 et 12.")
+
+        debut = time.perf_counter()
+        resultat = generer_fiches(sessions_ouvertes_du_mois(annee, mois), annee, mois)
+        duree = time.perf_counter() - debut
+
+        presences = sum(nombre for _, nombre in resultat.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(resultat)} fiche(s) et {presences} présence(s) générées "
+                f"pour {mois:02d}/{annee} en {duree:.2f}s."
+            )
+        )
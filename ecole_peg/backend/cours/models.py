@@ -134,6 +134,7 @@ class Session(models.Model):
         ordering = ["date_debut"]
         indexes = [
             models.Index(fields=["statut"]),
+            models.Index(fields=["date_debut", "id"]),
         ]
 
 
@@ -186,7 +187,7 @@ class FichePresences(models.Model):
     )
 
     class Meta:
-        unique_together = (("session", "mois"),)
+        unique_together = (("session", "mois", "annee"),)
 
 
 class Presence(models.Model):
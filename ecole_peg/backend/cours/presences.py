@@ -0,0 +1,57 @@
+from django.db.models import Count, F, Q
+from .models import Inscription, StatutInscriptionChoices, StatutPresenceChoices
+
+
+def taux_presence(inscriptions=None, seuil=None):
+    """
+    Taux de présence de chaque couple (élève, session) des inscriptions actives,
+    calculé en une seule requête groupée. Le dénominateur est `Session.seances_mois`.
+    `inscriptions` restreint le calcul (ex. une session), `seuil` ne garde que
+    les taux strictement inférieurs.
+    """
+    if inscriptions is None:
+        inscriptions = Inscription.objects.all()
+
+    lignes = (
+        inscriptions.filter(
+            statut=StatutInscriptionChoices.ACTIF,
+            session__seances_mois__gt=0,
+        )
+        .values(
+            "eleve_id",
+            "session_id",
+            nom=F("eleve__nom"),
+            prenom=F("eleve__prenom"),
+            date_naissance=F("eleve__date_naissance"),
+            total=F("session__seances_mois"),
+        )
+        .annotate(
+            presents=Count(
+                "eleve__presences",
+                filter=Q(
+                    eleve__presences__fiche_presences__session=F("session"),
+                    eleve__presences__statut=StatutPresenceChoices.PRESENT,
+                ),
+            )
+        )
+        .order_by("eleve_id", "date_inscription")
+    )
+
+    resultat = []
+    for ligne in lignes:
+        taux = (ligne["presents"] / ligne["total"]) * 100
+        if seuil is not None and taux >= seuil:
+            continue
+        resultat.append(
+            {
+                "id_eleve": ligne["eleve_id"],
+                "id_session": ligne["session_id"],
+                "nom": ligne["nom"],
+                "prenom": ligne["prenom"],
+                "date_naissance": ligne["date_naissance"],
+                "presents": ligne["presents"],
+                "total": ligne["total"],
+                "taux_presence": round(taux, 2),
+            }
+        )
+    return resultat
@@ -30,6 +30,22 @@ class EnseignantIn(Schema):
     nom: str
     prenom: str
 
+class CreneauIn(Schema):
+    date: date
+    heure_debut: time
+    heure_fin: time
+
+class CreneauOut(Schema):
+    date: date
+    heure_debut: time
+    heure_fin: time
+
+class VerificationCreneauOut(Schema):
+    date: date
+    heure_debut: time
+    heure_fin: time
+    libre: bool
+
 # ------------------- SESSION -------------------
 class SessionIn(Schema):
     id_cours: int
@@ -130,3 +146,29 @@ class FichePresencesOut(Schema):
     mois: str
     annee: int
     presences: List[PresenceOut]
+
+class EleveFicheOut(Schema):
+    id: int
+    nom: str
+    prenom: str
+
+class FichePresencesMatriceOut(Schema):
+    id: int
+    mois: str
+    annee: int
+    eleves: List[EleveFicheOut]
+    dates: List[date]
+    # Une chaîne par élève, un caractère par date : statut ou "-" sans présence.
+    statuts: List[str]
+    # Même grille avec l'id de chaque présence (None sans présence).
+    ids_presences: List[List[Optional[int]]]
+
+class TauxPresenceOut(Schema):
+    id_eleve: int
+    id_session: int
+    nom: str
+    prenom: str
+    date_naissance: date
+    presents: int
+    total: int
+    taux_presence: float
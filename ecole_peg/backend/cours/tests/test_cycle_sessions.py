@@ -0,0 +1,48 @@
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..cycle_sessions import appliquer_cycle_sessions
+from ..models import Session, StatutInscriptionChoices, StatutSessionChoices
+
+
+class CycleSessionsTests(DonneesSessionMixin, TestCase):
+    def _statut(self, session):
+        session.refresh_from_db()
+        return session.statut
+
+    def test_session_echue_fermee_avec_ses_inscriptions(self):
+        en_cours = self.creer_session(date(2026, 3, 2), date(2026, 6, 26))
+        rapport = appliquer_cycle_sessions(aujourd_hui=date(2026, 4, 1))
+
+        self.assertEqual(rapport["sessions_fermees"]["lignes"], 1)
+        self.assertEqual(rapport["inscriptions_desactivees"]["lignes"], 2)
+        self.assertEqual(self._statut(self.session), StatutSessionChoices.FERMÉE)
+        self.assertEqual(self._statut(en_cours), StatutSessionChoices.OUVERTE)
+        self.assertFalse(
+            self.session.inscriptions.filter(
+                statut=StatutInscriptionChoices.ACTIF
+            ).exists()
+        )
+
+    def test_date_de_fin_repoussee_rouvre_la_session(self):
+        appliquer_cycle_sessions(aujourd_hui=date(2026, 4, 1))
+        Session.objects.filter(id=self.session.id).update(date_fin=date(2026, 4, 24))
+
+        rapport = appliquer_cycle_sessions(aujourd_hui=date(2026, 4, 2))
+        self.assertEqual(rapport["sessions_rouvertes"]["lignes"], 1)
+        self.assertEqual(self._statut(self.session), StatutSessionChoices.OUVERTE)
+
+    def test_statut_enregistre_conserve_jusqu_au_cycle(self):
+        session = self.creer_session(
+            date(2026, 3, 2), date(2026, 6, 26), statut=StatutSessionChoices.FERMÉE
+        )
+        session.save()
+        self.assertEqual(self._statut(session), StatutSessionChoices.FERMÉE)
+
+    def test_commande(self):
+        sortie = StringIO()
+        call_command("cycle_sessions", stdout=sortie)
+        self.assertIn("sessions_fermees : 1 ligne(s)", sortie.getvalue())
+        self.assertIn("sessions_rouvertes", sortie.getvalue())
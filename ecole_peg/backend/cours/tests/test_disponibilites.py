@@ -0,0 +1,44 @@
+from django.test import TestCase
+from backend_ecole_peg.auth_api import generer_token
+from ..models import Enseignant
+
+
+class DisponibilitesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.enseignant = Enseignant.objects.create(nom="Favre", prenom="Anne")
+
+    def setUp(self):
+        self.client.cookies["access_token"] = generer_token()
+        self.url = f"/api/cours/enseignants/{self.enseignant.id}/disponibilites/"
+
+    def _get(self, **parametres):
+        parametres = {"date_debut": "2026-03-02", "date_fin": "2026-03-06", **parametres}
+        return self.client.get(self.url, parametres)
+
+    def test_creneaux_libres(self):
+        reponse = self._get(heure_min="09:00", heure_max="12:00")
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(reponse.json()), 5)
+
+    def test_parametres_invalides_refuses(self):
+        for parametres in (
+            {"duree_minutes": 0},
+            {"duree_minutes": -30},
+            {"heure_min": "12:00", "heure_max": "12:00"},
+            {"heure_min": "14:00", "heure_max": "09:00"},
+        ):
+            with self.subTest(**parametres):
+                self.assertEqual(self._get(**parametres).status_code, 400)
+
+    def test_creneau_a_verifier_invalide(self):
+        reponse = self.client.post(
+            self.url + "verifier/",
+            [
+                {"date": "2026-03-02", "heure_debut": "09:00", "heure_fin": "10:00"},
+                {"date": "2026-03-02", "heure_debut": "10:00", "heure_fin": "10:00"},
+            ],
+            content_type="application/json",
+        )
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual(list(reponse.json()["erreurs"]), ["1"])
@@ -0,0 +1,46 @@
+from datetime import date
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..fiches import dates_cours, generer_fiches
+from ..models import FichePresences, Inscription, Presence, StatutPresenceChoices
+from ..presences import taux_presence
+
+
+class GenerationFichesTests(DonneesSessionMixin, TestCase):
+    def test_presences_creees_absentes_par_defaut(self):
+        fiche, nombre = generer_fiches([self.session], 2026, 1)[self.session.id]
+        jours = dates_cours(self.session, 2026, 1)
+        self.assertEqual(nombre, len(jours) * 2)
+        self.assertEqual(fiche.presences.count(), nombre)
+        self.assertFalse(
+            fiche.presences.exclude(statut=StatutPresenceChoices.ABSENT).exists()
+        )
+        self.assertTrue(all(t["presents"] == 0 for t in taux_presence()))
+
+    def test_idempotente_et_compte_exact(self):
+        generer_fiches([self.session], 2026, 1)
+        fiche, nombre = generer_fiches([self.session], 2026, 1)[self.session.id]
+        self.assertEqual(nombre, 0)
+        self.assertEqual(FichePresences.objects.count(), 1)
+
+    def test_fiche_distincte_par_annee(self):
+        session = self.creer_session(date(2025, 1, 6), date(2026, 1, 30))
+        fiche_2025 = generer_fiches([session], 2025, 1)[session.id][0]
+        fiche_2026 = generer_fiches([session], 2026, 1)[session.id][0]
+        self.assertNotEqual(fiche_2025.id, fiche_2026.id)
+        self.assertEqual((fiche_2025.annee, fiche_2026.annee), (2025, 2026))
+
+    def test_dates_deja_prises_dans_une_autre_session_non_comptees(self):
+        autre = self.creer_session(date(2026, 1, 5), date(2026, 1, 30))
+        Inscription.objects.create(
+            eleve=self.eleves[0], session=autre, frais_inscription=0
+        )
+        generer_fiches([autre], 2026, 1)
+
+        _, nombre = generer_fiches([self.session], 2026, 1)[self.session.id]
+        jours = dates_cours(self.session, 2026, 1)
+        deja_prises = len(dates_cours(autre, 2026, 1))
+        self.assertEqual(nombre, len(jours) * 2 - deja_prises)
+        self.assertEqual(
+            Presence.objects.filter(fiche_presences__session=self.session).count(), nombre
+        )
@@ -0,0 +1,63 @@
+from django.test import TestCase
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..fiches import dates_cours, generer_fiches
+from ..models import Presence, StatutPresenceChoices
+
+
+class MatricePresencesTests(DonneesSessionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fiche = generer_fiches([cls.session], 2026, 1)[cls.session.id][0]
+        cls.jours = dates_cours(cls.session, 2026, 1)
+
+    def setUp(self):
+        self.client.cookies["access_token"] = generer_token()
+
+    def _matrice(self, id_fiche=None):
+        return self.client.get(
+            f"/api/cours/fiche_presences/{id_fiche or self.fiche.id}/matrice/"
+        )
+
+    def test_grille_eleves_par_dates(self):
+        presence = Presence.objects.get(
+            fiche_presences=self.fiche, eleve=self.eleves[1], date_presence=self.jours[1]
+        )
+        presence.statut = StatutPresenceChoices.PRESENT
+        presence.save()
+        Presence.objects.filter(
+            fiche_presences=self.fiche, eleve=self.eleves[0], date_presence=self.jours[0]
+        ).delete()
+
+        reponse = self._matrice()
+        self.assertEqual(reponse.status_code, 200)
+        matrice = reponse.json()
+        self.assertEqual((matrice["mois"], matrice["annee"]), (self.fiche.mois, 2026))
+        self.assertEqual(
+            [(e["nom"], e["prenom"]) for e in matrice["eleves"]],
+            [("Dupont", "Hélène"), ("Rossi", "Marco")],
+        )
+        self.assertEqual(matrice["dates"], [d.isoformat() for d in self.jours])
+
+        n = len(self.jours)
+        self.assertEqual(matrice["statuts"], ["-" + "A" * (n - 1), "AP" + "A" * (n - 2)])
+        self.assertIsNone(matrice["ids_presences"][0][0])
+        self.assertEqual(matrice["ids_presences"][1][1], presence.id)
+        self.assertEqual(
+            {i for ligne in matrice["ids_presences"] for i in ligne if i is not None},
+            set(
+                Presence.objects.filter(fiche_presences=self.fiche).values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    def test_une_seule_requete_sur_les_presences(self):
+        self._matrice()
+        # Fiche, puis présences jointes aux élèves (l'authentification ne lit pas la base).
+        with self.assertNumQueries(2):
+            self._matrice()
+
+    def test_fiche_inconnue(self):
+        self.assertEqual(self._matrice(id_fiche=999999).status_code, 404)
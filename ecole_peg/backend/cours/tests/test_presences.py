@@ -0,0 +1,49 @@
+from datetime import date
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..fiches import generer_fiches
+from ..models import (
+    Inscription,
+    Presence,
+    StatutInscriptionChoices,
+    StatutPresenceChoices,
+)
+from ..presences import taux_presence
+
+
+class TauxPresenceTests(DonneesSessionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        fiche, _ = generer_fiches([cls.session], 2026, 1)[cls.session.id]
+        for eleve, presents in zip(cls.eleves, (10, 6)):
+            ids = fiche.presences.filter(eleve=eleve).order_by("date_presence")
+            Presence.objects.filter(
+                id__in=list(ids.values_list("id", flat=True)[:presents])
+            ).update(statut=StatutPresenceChoices.PRESENT)
+
+    def _taux(self, **kwargs):
+        return {t["nom"]: t["taux_presence"] for t in taux_presence(**kwargs)}
+
+    def test_taux_par_eleve_sur_les_seances_du_mois(self):
+        # seances_mois = 12
+        self.assertEqual(self._taux(), {"Dupont": 83.33, "Rossi": 50.0})
+
+    def test_seuil_strict(self):
+        self.assertEqual(self._taux(seuil=80), {"Rossi": 50.0})
+        self.assertEqual(self._taux(seuil=50), {})
+
+    def test_presences_d_une_autre_session_non_comptees(self):
+        autre = self.creer_session(date(2026, 2, 2), date(2026, 2, 27))
+        Inscription.objects.create(
+            eleve=self.eleves[1], session=autre, frais_inscription=0
+        )
+        self.assertEqual(
+            self._taux(inscriptions=Inscription.objects.filter(session=autre)),
+            {"Rossi": 0.0},
+        )
+
+    def test_inscriptions_inactives_exclues(self):
+        self.inscriptions[0].statut = StatutInscriptionChoices.INACTIF
+        self.inscriptions[0].save()
+        self.assertEqual(self._taux(), {"Rossi": 50.0})
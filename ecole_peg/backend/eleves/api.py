@@ -1,33 +1,23 @@
-from datetime import timedelta
+import mimetypes
+import os
 from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
 from django.utils import timezone
 from django.db import transaction, models
-from django.db.models import (
-    OuterRef,
-    Subquery,
-    Sum,
-    F,
-    Value,
-    DecimalField,
-    ExpressionWrapper,
-    Count,
-    Q,
-)
-from django.db.models.functions import Coalesce, Lower
+from django.db.models import F, Count, Q
 from ninja import Router, File, Form
+from ninja.errors import HttpError
 from ninja.files import UploadedFile
 from typing import Optional, List   # Ajout ici
 
 from .models import (
     Eleve,
-    Pays,
     Garant,
     Test,
     Document,
 )
-from factures.models import Facture, Paiement, DetailFacture
 from .schemas import (
     Anniversaire,
     GarantIn,
@@ -40,25 +30,23 @@ from .schemas import (
     EleveOut,
     ElevesOut,
 )
-from cours.models import Cours, CoursPrive, Session, Enseignant
+from backend_ecole_peg.pagination import apaginer_par_curseur, apaginer_par_page
+from backend_ecole_peg.export import iterer_par_lots, reponse_export
+from backend_ecole_peg.cache_reponses import statistiques_cache
+from backend_ecole_peg.auth_api import cache_tokens
+from backend_ecole_peg.fichiers import servir_fichier
+from .tableau_bord import aobtenir_tableau_bord
+from .cache_pays import pays_existe, reponse_pays
+from .importation import importer_eleves, lire_fichier
+from .documents import stocker, valider_televersement
 
 
 router = Router()
 
 
 # ------------------- ÉLÈVES -------------------
-@router.get("/eleves/", response=dict)
-def eleves(
-    request,
-    page: int = 1,
-    taille: int = 10,
-    recherche: Optional[str] = None,        # Corrigé ici
-    date_naissance: Optional[str] = None,   # Corrigé ici
-    statut: Optional[str] = None,           # Corrigé ici
-):
+def _filtrer_eleves(recherche, date_naissance, statut):
     qs = Eleve.objects.select_related("pays").annotate(
-        lower_nom=Lower("nom"),
-        lower_prenom=Lower("prenom"),
         pays__nom=F("pays__nom"),
         active_count=Count(
             "inscriptions",
@@ -73,7 +61,7 @@ def eleves(
     )
 
     if recherche:
-        qs = qs.filter(Q(nom__icontains=recherche) | Q(prenom__icontains=recherche))
+        qs = qs.rechercher(recherche)
 
     if date_naissance:
         qs = qs.filter(date_naissance=date_naissance)
@@ -86,27 +74,95 @@ def eleves(
         elif statut == "P":
             qs = qs.filter(preinsc_count__gt=0)
 
-    qs = qs.order_by("lower_nom", "lower_prenom")
+    return qs
 
-    paginator = Paginator(qs, taille)
-    page_obj = paginator.get_page(page)
+
+@router.get("/eleves/", response=dict)
+async def eleves(
+    request,
+    page: int = 1,
+    taille: int = 10,
+    recherche: Optional[str] = None,        # Corrigé ici
+    date_naissance: Optional[str] = None,   # Corrigé ici
+    statut: Optional[str] = None,           # Corrigé ici
+    curseur: Optional[str] = None,
+):
+    """
+    Liste des élèves, paginée par numéro de page ou, si `curseur` est fourni
+    ("debut" pour la première page), par curseur sans comptage total.
+    """
+    qs = _filtrer_eleves(recherche, date_naissance, statut)
+
+    if curseur is not None:
+        objets, suivant, precedent = await apaginer_par_curseur(
+            qs, ["cle_tri", "id"], curseur, taille
+        )
+        return {
+            "eleves": [
+                ElevesOut.model_validate(e, from_attributes=True) for e in objets
+            ],
+            "curseur_suivant": suivant,
+            "curseur_precedent": precedent,
+        }
+
+    objets, total = await apaginer_par_page(qs.order_by("cle_tri", "id"), page, taille)
 
     return {
         "eleves": [
-            ElevesOut.model_validate(e, from_attributes=True)
-            for e in page_obj.object_list
+            ElevesOut.model_validate(e, from_attributes=True) for e in objets
         ],
-        "nombre_total": paginator.count,
+        "nombre_total": total,
     }
 
 
+@router.get("/eleves/export/")
+def exporter_eleves(
+    request,
+    format: str = "csv",
+    recherche: Optional[str] = None,
+    date_naissance: Optional[str] = None,
+    statut: Optional[str] = None,
+):
+    """Export CSV/XLSX en flux des élèves, avec les mêmes filtres que la liste."""
+    qs = _filtrer_eleves(recherche, date_naissance, statut)
+    champs = [
+        "id", "nom", "prenom", "date_naissance", "sexe", "telephone", "email",
+        "rue", "numero", "npa", "localite", "pays__nom", "niveau",
+    ]
+    entetes = [
+        "ID", "Nom", "Prénom", "Date de naissance", "Sexe", "Téléphone", "Email",
+        "Rue", "Numéro", "NPA", "Localité", "Pays", "Niveau",
+    ]
+    return reponse_export(
+        format,
+        "eleves",
+        entetes,
+        iterer_par_lots(qs, champs),
+        asynchrone=isinstance(request, ASGIRequest),
+    )
+
+
+@router.post("/eleves/import/")
+def importer_eleves_fichier(request, fichier: UploadedFile = File(...)):
+    """
+    Import en masse d'élèves depuis un fichier CSV ou JSON (champs de EleveIn,
+    `pays` accepté à la place de `pays_id`). Retourne le nombre d'élèves créés
+    et les erreurs par ligne.
+    """
+    try:
+        lignes = lire_fichier(fichier.read(), fichier.name)
+    except (ValueError, UnicodeDecodeError) as e:
+        return {"message": "Fichier illisible.", "erreurs": {"fichier": [str(e)]}}
+    return importer_eleves(lignes)
+
+
 @router.get("/eleve/{id_eleve}/")
-def rechercher_eleve(request, id_eleve: int):
+async def rechercher_eleve(request, id_eleve: int):
     try:
-        eleve = (
+        eleve = await (
             Eleve.objects.select_related("pays")
             .annotate(pays__nom=models.F("pays__nom"))
-            .get(id=id_eleve)
+            .aget(id=id_eleve)
         )
     except Eleve.DoesNotExist:
         return {"Erreur": "Cet élève n'existe pas"}
@@ -118,9 +174,11 @@ def rechercher_eleve(request, id_eleve: int):
 def creer_eleve(request, eleve: EleveIn):
     try:
         with transaction.atomic():
-            pays = get_object_or_404(Pays, id=eleve.pays_id)
-            eleve_obj = Eleve(pays=pays, **eleve.dict(exclude={"pays_id"}))
-            eleve_obj.full_clean()
+            if not pays_existe(eleve.pays_id):
+                raise Http404("Ce pays n'existe pas.")
+            eleve_obj = Eleve(pays_id=eleve.pays_id, **eleve.dict(exclude={"pays_id"}))
+            # Existence du pays déjà vérifiée via le cache.
+            eleve_obj.full_clean(exclude=["pays"])
             eleve_obj.save()
             return {"id": eleve_obj.id}
     except ValidationError as e:
@@ -131,14 +189,14 @@ def creer_eleve(request, eleve: EleveIn):
 def modifier_eleve(request, eleve_id: int, eleve: EleveIn):
     try:
         with transaction.atomic():
-            eleve_obj = get_object_or_404(
-                Eleve.objects.select_related("pays"), id=eleve_id
-            )
-            pays = get_object_or_404(Pays, id=eleve.pays_id)
+            eleve_obj = get_object_or_404(Eleve, id=eleve_id)
+            if not pays_existe(eleve.pays_id):
+                raise Http404("Ce pays n'existe pas.")
             for field, value in eleve.dict(exclude={"pays_id"}).items():
                 setattr(eleve_obj, field, value)
-            eleve_obj.pays = pays
-            eleve_obj.full_clean()
+            eleve_obj.pays_id = eleve.pays_id
+            # Existence du pays déjà vérifiée via le cache.
+            eleve_obj.full_clean(exclude=["pays"])
             eleve_obj.save()
             return {"id": eleve_obj.id}
     except ValidationError as e:
@@ -249,6 +307,7 @@ def supprimer_test_eleve(request, eleve_id: int, test_id: int):
 # ------------------- DOCUMENTS -------------------
 @router.get("/eleves/{eleve_id}/documents/", response=List[DocumentOut])  # Corrigé ici
 def get_documents_eleve(request, eleve_id: int):
+    """Liste légère : miniature_url et apercu_url plutôt que l'original à afficher."""
     eleve = get_object_or_404(Eleve.objects.prefetch_related("documents"), id=eleve_id)
     documents = eleve.documents.all()
     return [DocumentOut.from_model(doc, request) for doc in documents]
@@ -258,219 +317,102 @@ def get_documents_eleve(request, eleve_id: int):
 def creer_document_eleve(
     request, eleve_id: int, nom: str = Form(...), fichier: UploadedFile = File(...)
 ):
+    """
+    Le fichier est entièrement validé (extension, taille, octets magiques)
+    avant toute écriture, puis stocké par contenu à la validation de la
+    transaction : un fichier identique déjà présent est réutilisé.
+    """
     try:
         with transaction.atomic():
             eleve = get_object_or_404(Eleve, id=eleve_id)
-            document = Document(eleve=eleve, nom=nom)
-            document.fichier.save(fichier.name, fichier)
-            document.full_clean()
+            empreinte, extension = valider_televersement(fichier)
+            document = Document(eleve=eleve, nom=nom, empreinte=empreinte)
+            document.full_clean(exclude=["fichier"])
+            document.fichier.name = stocker(fichier, empreinte, extension)
             document.save()
             return DocumentOut.from_model(document, request)
     except ValidationError as e:
         return {"message": "Erreurs de validation.", "erreurs": e.message_dict}
 
 
+@router.get(
+    "/eleves/{eleve_id}/documents/{document_id}/fichier/", url_name="fichier_document"
+)
+def fichier_document(
+    request, eleve_id: int, document_id: int, variante: str = "original"
+):
+    """
+    Téléchargement authentifié d'un document (`variante` : original,
+    miniature ou apercu), confié au serveur frontal si MEDIA_ACCEL_PREFIXE
+    est défini ; sinon envoyé avec prise en charge de Range, ETag et
+    If-Modified-Since.
+    """
+    document = get_object_or_404(Document, id=document_id, eleve_id=eleve_id)
+    fichiers = {
+        "original": document.fichier,
+        "miniature": document.miniature,
+        "apercu": document.apercu,
+    }
+    if variante not in fichiers:
+        raise HttpError(400, "Variante inconnue : original, miniature ou apercu.")
+    fichier = fichiers[variante]
+    if not fichier:
+        raise Http404("Ce fichier n'existe pas.")
+
+    extension = os.path.splitext(fichier.name)[1]
+    nom = document.nom if variante == "original" else f"{document.nom}-{variante}"
+    return servir_fichier(
+        request,
+        fichier.storage,
+        fichier.name,
+        mimetypes.guess_type(fichier.name)[0] or "application/octet-stream",
+        f"{nom}{extension}",
+        # Le contenu d'un document ne change jamais : son empreinte suffit.
+        etag=f'"{document.empreinte}-{variante}"' if document.empreinte else None,
+    )
+
+
 @router.delete("/eleves/{eleve_id}/documents/{document_id}/")
 def supprimer_document_eleve(request, eleve_id: int, document_id: int):
     with transaction.atomic():
         document = get_object_or_404(
             Document.objects.select_related("eleve"), id=document_id, eleve_id=eleve_id
         )
-        if document.fichier and document.fichier.storage.exists(document.fichier.name):
-            document.fichier.delete(save=False)
+        # Fichier partagé par contenu : libéré par le signal post_delete.
         document.delete()
         return {"success": True}
 
 
 # ------------------- PAYS -------------------
-@router.get("/pays/")
+@router.get("/pays/", response=List[PaysOut])
 def pays(request):
-    pays_list = Pays.objects.all().order_by("nom")
-    return [PaysOut.model_validate(p, from_attributes=True) for p in pays_list]
+    """
+    Liste des pays servie depuis le cache des réponses, avec ETag fort :
+    un If-None-Match correspondant reçoit un 304 sans corps. La date de la
+    fixture entre dans la clé : un rechargement fait depuis un autre processus
+    n'atteint pas les signaux de celui-ci.
+    """
+    return reponse_pays(request)
 
 
 # ------------------- STATISTIQUES -------------------
 
 
 @router.get("/statistiques/dashboard/")
-def statistiques_dashboard(request):
-    today = timezone.now().date()
-    first_day_month = today.replace(day=1)
-    five_days_ago = today - timedelta(days=5)
-
-    # Sous‐requêtes pour total et payé
-    total_sq = (
-        DetailFacture.objects.filter(facture=OuterRef("pk"))
-        .values("facture")
-        .annotate(t=Sum("montant"))
-        .values("t")
-    )
-    paye_sq = (
-        Paiement.objects.filter(facture=OuterRef("pk"))
-        .values("facture")
-        .annotate(p=Sum("montant"))
-        .values("p")
-    )
+async def statistiques_dashboard(request, rafraichir: bool = False):
+    """
+    Statistiques du tableau de bord, servies depuis l'instantané précalculé
+    (voir eleves.tableau_bord). `rafraichir` force le recalcul complet.
+    """
+    return await aobtenir_tableau_bord(rafraichir=rafraichir)
 
-    # --- Montant total de toutes les factures impayées du mois ---
-    montant_total_factures_impayees_mois = (
-        Facture.objects.filter(date_emission__gte=first_day_month)
-        .annotate(
-            total=Coalesce(Subquery(total_sq), Value(0), output_field=DecimalField()),
-            paye=Coalesce(Subquery(paye_sq), Value(0), output_field=DecimalField()),
-        )
-        .annotate(restant=F("total") - F("paye"))
-        .filter(restant__gt=0)
-        .aggregate(
-            total_restant=Coalesce(
-                Sum("restant"), Value(0), output_field=DecimalField()
-            )
-        )["total_restant"]
-    )
-
-    # --- Montant total des paiements du mois ---
-    montant_total_paiements_mois = Paiement.objects.filter(
-        date_paiement__gte=first_day_month
-    ).aggregate(total=Coalesce(Sum("montant"), Value(0), output_field=DecimalField()))[
-        "total"
-    ]
-
-    # --- Détail des factures impayées depuis ≥5 jours ---
-    factures_5j = (
-        Facture.objects.filter(date_emission__lte=five_days_ago)
-        .annotate(
-            total=Coalesce(Subquery(total_sq), Value(0), output_field=DecimalField()),
-            paye=Coalesce(Subquery(paye_sq), Value(0), output_field=DecimalField()),
-        )
-        .annotate(restant=F("total") - F("paye"))
-        .filter(restant__gt=0)
-        .select_related("eleve", "inscription__eleve")
-        .annotate(
-            eleve_nom=F("eleve__nom"),
-            eleve_prenom=F("eleve__prenom"),
-        )
-        .values(
-            "id",
-            "date_emission",
-            "total",
-            "restant",
-            "eleve_nom",
-            "eleve_prenom",
-        )
-    )
-
-    factures_impayees_plus_5j = [
-        {
-            "id": f["id"],
-            "date_emission": f["date_emission"],
-            "montant_total": float(f["total"]),
-            "montant_restant": float(f["restant"]),
-            "eleve_nom": f["eleve_nom"],
-            "eleve_prenom": f["eleve_prenom"],
-        }
-        for f in factures_5j
-    ]
-
-    # --- Répartition par cours-type-niveau des élèves actifs ---
-    repartition_cours = list(
-        Eleve.objects.filter(inscriptions__statut="A")
-        .values(
-            "inscriptions__session__cours__nom",
-            "inscriptions__session__cours__type_cours",
-            "inscriptions__session__cours__niveau",
-        )
-        .annotate(total=Count("id"))
-        .order_by("inscriptions__session__cours__nom")
-    )
-
-    # --- Présence < 80% lors des 7 derniers jours de session ---
-    eleves_presence_inferieur_80 = []
-    for eleve in Eleve.objects.filter(inscriptions__statut="A").distinct():
-        for ins in eleve.inscriptions.filter(statut="A"):
-            sess = ins.session
-            if sess.date_fin - timedelta(days=7) <= today <= sess.date_fin:
-                total_seances = sess.seances_mois
-                if total_seances:
-                    nb_present = eleve.presences.filter(
-                        fiche_presences__session=sess, statut="P"
-                    ).count()
-                    taux = (nb_present / total_seances) * 100
-                    if taux < 80:
-                        eleves_presence_inferieur_80.append(
-                            {
-                                "nom": eleve.nom,
-                                "prenom": eleve.prenom,
-                                "date_naissance": eleve.date_naissance,
-                                "taux_presence": round(taux, 2),
-                            }
-                        )
-
-    # --- Élèves en préinscription depuis >3 jours ---
-    date_limite = today - timedelta(days=3)
-    eleves_preinscrits = list(
-        Eleve.objects.filter(
-            inscriptions__preinscription=True,
-            inscriptions__date_inscription__lte=date_limite,
-        )
-        .values("nom", "prenom", "date_naissance")
-        .distinct()
-    )
-
-    # --- Statistiques générales supplémentaires ---
-    total_cours = Cours.objects.count()
-    sessions_actives = Session.objects.filter(statut="O").count()
-    cours_prives_programmes = CoursPrive.objects.filter(
-        date_cours_prive__gte=first_day_month
-    ).count()
-    sessions_ouvertes = list(
-        Session.objects.filter(statut="O")
-        .annotate(
-            eleves_restants=ExpressionWrapper(
-                F("capacite_max")
-                - Count("inscriptions", filter=Q(inscriptions__statut="A")),
-                output_field=DecimalField(),
-            )
-        )
-        .values("date_debut", "eleves_restants")
-        .order_by("date_debut")
-    )
-    nombre_enseignants = Enseignant.objects.count()
-    total_eleves = Eleve.objects.count()
-    eleves_actifs = Eleve.objects.filter(inscriptions__statut="A").distinct().count()
-    # Annoter le nombre d'élèves par pays
-    pays_counts = (
-        Eleve.objects.values("pays__nom")
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
-    # Trouver le maximum
-    max_total = pays_counts.first()["total"] if pays_counts else None
-    # Retourner tous les pays ayant ce maximum
-    pays_plus_eleves = [
-        p["pays__nom"] for p in pays_counts if p["total"] == max_total
-    ] if max_total else []
 
+@router.get("/statistiques/cache/")
+def statistiques_caches(request):
+    """Succès et échecs des caches de ce processus (réponses, tokens JWT)."""
     return {
-        "factures": {
-            "montant_total_paiements_mois": float(montant_total_paiements_mois),
-            "montant_total_factures_impayees": float(montant_total_factures_impayees_mois),
-            "factures_impayees_plus_5j": factures_impayees_plus_5j,
-        },
-        "cours": {
-            "total_cours": total_cours,
-            "sessions_actives": sessions_actives,
-            "cours_prives_programmes_mois": cours_prives_programmes,
-            "sessions_ouvertes": sessions_ouvertes,
-            "nombre_enseignants": nombre_enseignants,
-            "repartition_eleves_actifs": repartition_cours,
-        },
-        "eleves": {
-            "total_eleves": total_eleves,
-            "eleves_actifs": eleves_actifs,
-            "pays_plus_eleves": pays_plus_eleves,
-            "eleves_presence_inferieur_80": eleves_presence_inferieur_80,
-            "eleves_preinscription_plus_3j": eleves_preinscrits,
-        },
+        "reponses": statistiques_cache.statistiques(),
+        "tokens": cache_tokens.statistiques(),
     }
 
 
@@ -0,0 +1,55 @@
+import json
+import os
+from django.conf import settings
+from backend_ecole_peg.cache_reponses import entree_en_cache, reponse_en_cache
+from .models import Pays
+
+FIXTURE_PAYS = settings.BASE_DIR / "eleves" / "fixtures" / "pays.json"
+
+# Nom de l'entrée du cache des réponses partagée par /pays/ et pays_existe.
+NOM_ENTREE_PAYS = "pays"
+MODELES_PAYS = ("eleves.Pays",)
+
+# (ETag, ids) de la dernière entrée décodée par ce processus.
+_ids_decodes = (None, frozenset())
+
+
+def mtime_fixture():
+    """Date de modification de la fixture des pays (None si absente)."""
+    try:
+        return os.stat(FIXTURE_PAYS).st_mtime
+    except OSError:
+        return None
+
+
+def _lister_pays():
+    return list(Pays.objects.order_by("nom").values("id", "nom", "indicatif"))
+
+
+def reponse_pays(request):
+    """Réponse de /pays/, lue dans la même entrée versionnée que pays_existe."""
+    return reponse_en_cache(
+        request,
+        MODELES_PAYS,
+        _lister_pays,
+        cache_control=settings.PAYS_CACHE_CONTROL,
+        empreinte=mtime_fixture(),
+        nom=NOM_ENTREE_PAYS,
+    )
+
+
+def pays_existe(pays_id):
+    """
+    Vérifie `pays_id` contre l'entrée qui sert /pays/ : mêmes versions, même
+    empreinte de fixture, donc même invalidation. Les ids ne sont décodés
+    qu'une fois par ETag.
+    """
+    global _ids_decodes
+    contenu, etag = entree_en_cache(
+        NOM_ENTREE_PAYS, MODELES_PAYS, _lister_pays, empreinte=mtime_fixture()
+    )
+    etag_decode, ids = _ids_decodes
+    if etag_decode != etag:
+        ids = frozenset(pays["id"] for pays in json.loads(contenu))
+        _ids_decodes = (etag, ids)
+    return pays_id in ids
@@ -0,0 +1,159 @@
+import hashlib
+import os
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from .models import ContenuDocument, Document
+
+DOSSIER_DOCUMENTS = "eleves/documents"
+
+# Octets magiques attendus en tête de fichier, par extension autorisée.
+SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+}
+LONGUEUR_SIGNATURE = max(len(s) for signatures in SIGNATURES.values() for s in signatures)
+
+
+def _stockage():
+    return Document._meta.get_field("fichier").storage
+
+
+def _erreur(message):
+    return ValidationError({"fichier": [message]})
+
+
+def valider_televersement(fichier):
+    """
+    Vérifie extension, taille et signature du fichier téléversé en un seul
+    parcours de ses morceaux, en calculant son SHA-256 au passage ; rien
+    n'est écrit dans le stockage. Retourne (empreinte, extension).
+    """
+    extension = os.path.splitext(fichier.name or "")[1].lower().lstrip(".")
+    if extension not in SIGNATURES:
+        raise _erreur(
+            f"Extension non autorisée. Extensions acceptées : {', '.join(SIGNATURES)}."
+        )
+
+    limite = settings.MAX_UPLOAD_SIZE
+    message_taille = f"Taille maximale autorisée : {limite // 1024 // 1024}MB"
+    if fichier.size and fichier.size > limite:
+        raise _erreur(message_taille)
+
+    hachage = hashlib.sha256()
+    taille = 0
+    entete = b""
+    for morceau in fichier.chunks():
+        taille += len(morceau)
+        if taille > limite:
+            raise _erreur(message_taille)
+        if len(entete) < LONGUEUR_SIGNATURE:
+            entete += morceau[: LONGUEUR_SIGNATURE - len(entete)]
+            if len(entete) == LONGUEUR_SIGNATURE:
+                _verifier_signature(entete, extension)
+        hachage.update(morceau)
+
+    if len(entete) < LONGUEUR_SIGNATURE:
+        _verifier_signature(entete, extension)
+
+    # Même contenu, même fichier : .jpeg et .jpg partagent leur chemin.
+    return hachage.hexdigest(), "jpg" if extension == "jpeg" else extension
+
+
+def _verifier_signature(entete, extension):
+    if not any(entete.startswith(s) for s in SIGNATURES[extension]):
+        raise _erreur(f"Le contenu du fichier ne correspond pas à l'extension .{extension}.")
+
+
+def chemin_contenu(empreinte, extension):
+    return f"{DOSSIER_DOCUMENTS}/{empreinte[:2]}/{empreinte}.{extension}"
+
+
+def _verrouiller(chemin):
+    """Compteur du chemin, créé au besoin, verrouillé jusqu'à la fin de la transaction."""
+    contenu, _ = ContenuDocument.objects.select_for_update().get_or_create(chemin=chemin)
+    return contenu
+
+
+def stocker(fichier, empreinte, extension):
+    """
+    Retourne le chemin de contenu du fichier et compte une référence de plus,
+    sous verrou de ligne. Le fichier y est écrit (s'il n'y est pas déjà) une
+    fois la transaction validée : une transaction annulée ne laisse aucun
+    fichier orphelin. Si l'écriture échoue, les documents qui référencent ce
+    chemin sont supprimés. À appeler dans une transaction, avant
+    l'enregistrement du document.
+    """
+    chemin = chemin_contenu(empreinte, extension)
+    ContenuDocument.objects.filter(pk=_verrouiller(chemin).pk).update(
+        references=F("references") + 1
+    )
+
+    def ecrire():
+        stockage = _stockage()
+        if stockage.exists(chemin):
+            return
+        try:
+            fichier.seek(0)
+            nom = stockage.save(chemin, fichier)
+        except Exception:
+            Document.objects.filter(fichier=chemin).delete()
+            raise
+        if nom != chemin:
+            # Même contenu écrit entre-temps par un autre téléversement.
+            stockage.delete(nom)
+
+    transaction.on_commit(ecrire)
+    return chemin
+
+
+def liberer(fichier, miniature="", apercu=""):
+    """
+    Compte une référence de moins sur le fichier, sous verrou de ligne. Quand
+    il n'en reste aucune, le fichier et ses dérivés (miniature, aperçu) sont
+    supprimés après validation de la transaction, toujours sous le verrou :
+    un téléversement du même contenu attend la fin de la suppression, puis
+    réécrit le fichier. À appeler dans une transaction.
+    """
+    contenu = ContenuDocument.objects.select_for_update().filter(chemin=fichier).first()
+    if contenu is not None:
+        ContenuDocument.objects.filter(pk=contenu.pk, references__gt=0).update(
+            references=F("references") - 1
+        )
+        contenu.refresh_from_db(fields=["references"])
+        if contenu.references > 0:
+            return
+
+    def supprimer():
+        stockage = _stockage()
+        with transaction.atomic():
+            contenu = (
+                ContenuDocument.objects.select_for_update().filter(chemin=fichier).first()
+            )
+            if contenu is not None:
+                if contenu.references > 0:
+                    return  # Réutilisé entre-temps par un téléversement.
+                contenu.delete()
+            # Les fichiers antérieurs au stockage par contenu n'ont pas de
+            # compteur : seuls des documents qui ne les référencent plus les libèrent.
+            for champ, nom in (
+                ("fichier", fichier),
+                ("miniature", miniature),
+                ("apercu", apercu),
+            ):
+                if (
+                    nom
+                    and not Document.objects.filter(**{champ: nom}).exists()
+                    and stockage.exists(nom)
+                ):
+                    stockage.delete(nom)
+
+    transaction.on_commit(supprimer)
+
+
+def liberer_document(sender, instance, **kwargs):
+    """Récepteur post_delete de Document, y compris pour une suppression en cascade."""
+    liberer(instance.fichier.name, instance.miniature.name, instance.apercu.name)
@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from pydantic import ValidationError as PydanticValidationError
+
+from .cache_pays import pays_existe
+from .models import Eleve, JetonRecherche, Pays
+from .recherche import cle_tri
+from .schemas import EleveIn
+from .tableau_bord import SECTIONS_PAR_MODELE, ajuster_compteur, invalider_sections
+
+TAILLE_LOT_IMPORT = 500
+
+
+def lire_fichier(contenu, nom_fichier):
+    """Lit un fichier CSV (séparateur , ou ;) ou JSON (liste d'objets) en liste de dicts."""
+    texte = contenu.decode("utf-8-sig")
+
+    if nom_fichier.lower().endswith(".json"):
+        lignes = json.loads(texte)
+        if not isinstance(lignes, list):
+            raise ValueError("Le fichier JSON doit contenir une liste d'élèves.")
+        return lignes
+
+    try:
+        dialecte = csv.Sniffer().sniff(texte[:4096], delimiters=",;")
+    except csv.Error:
+        dialecte = csv.excel
+    return list(csv.DictReader(io.StringIO(texte), dialect=dialecte))
+
+
+def _normaliser_ligne(ligne):
+    """Clés et valeurs nettoyées ; None si la ligne n'est pas un objet (JSON)."""
+    if not isinstance(ligne, dict):
+        return None
+    return {
+        (cle or "").strip(): (valeur.strip() or None) if isinstance(valeur, str) else valeur
+        for cle, valeur in ligne.items()
+    }
+
+
+def _erreurs_pydantic(exc):
+    return {
+        ".".join(str(p) for p in erreur["loc"]) or "__all__": [erreur["msg"]]
+        for erreur in exc.errors()
+    }
+
+
+def importer_eleves(lignes, taille_lot=TAILLE_LOT_IMPORT):
+    """
+    Importe des élèves en masse : validation en mémoire, une requête pour les
+    pays nommés, une pour les emails existants, puis bulk_create par lots.
+    Les lignes invalides sont signalées sans bloquer les autres.
+    Chaque ligne porte `pays_id` ou `pays` (nom du pays).
+    """
+    lignes = [_normaliser_ligne(ligne) for ligne in lignes]
+
+    noms_pays = {
+        l["pays"] for l in lignes if l and l.get("pays") and not l.get("pays_id")
+    }
+    ids_par_nom = dict(Pays.objects.filter(nom__in=noms_pays).values_list("nom", "id"))
+
+    emails_pris = _emails_existants(
+        {l["email"] for l in lignes if l and isinstance(l.get("email"), str)}
+    )
+
+    erreurs = []
+    a_creer = []
+
+    for numero, ligne in enumerate(lignes, start=1):
+        if ligne is None:
+            erreurs.append(
+                {"ligne": numero, "erreurs": {"__all__": ["La ligne doit être un objet."]}}
+            )
+            continue
+        if not ligne.get("pays_id") and ligne.get("pays"):
+            ligne["pays_id"] = ids_par_nom.get(ligne["pays"])
+
+        try:
+            donnees = EleveIn.model_validate(ligne)
+        except PydanticValidationError as exc:
+            erreurs.append({"ligne": numero, "erreurs": _erreurs_pydantic(exc)})
+            continue
+
+        if not pays_existe(donnees.pays_id):
+            erreurs.append({"ligne": numero, "erreurs": {"pays": ["Pays inconnu."]}})
+            continue
+
+        email = donnees.email.lower()
+        if email in emails_pris:
+            erreurs.append(
+                {"ligne": numero, "erreurs": {"email": ["Cet email est déjà utilisé."]}}
+            )
+            continue
+
+        eleve = Eleve(pays_id=donnees.pays_id, **donnees.dict(exclude={"pays_id"}))
+        try:
+            # Pays et unicité de l'email déjà vérifiés en une requête chacun.
+            eleve.full_clean(
+                exclude=["pays"], validate_unique=False, validate_constraints=False
+            )
+        except ValidationError as exc:
+            erreurs.append({"ligne": numero, "erreurs": exc.message_dict})
+            continue
+
+        eleve.cle_tri = cle_tri(eleve.nom, eleve.prenom)
+        emails_pris.add(email)
+        a_creer.append((numero, eleve))
+
+    crees = 0
+    for debut in range(0, len(a_creer), taille_lot):
+        crees += _creer_lot(a_creer[debut : debut + taille_lot], erreurs)
+
+    if crees:
+        # bulk_create n'émet pas post_save.
+        ajuster_compteur("eleves.Eleve", crees)
+        invalider_sections(SECTIONS_PAR_MODELE["eleves.Eleve"])
+
+    erreurs.sort(key=lambda e: e["ligne"])
+    return {"crees": crees, "erreurs": erreurs}
+
+
+def _emails_existants(emails):
+    """Emails déjà utilisés parmi `emails`, en minuscules, sans tenir compte de la casse."""
+    return set(
+        Eleve.objects.annotate(email_min=Lower("email"))
+        .filter(email_min__in={email.lower() for email in emails})
+        .values_list("email_min", flat=True)
+    )
+
+
+def _creer_lot(lot, erreurs):
+    """
+    Crée un lot de (numéro, élève) en un INSERT. Si le lot échoue (email créé
+    entre-temps par une autre requête, etc.), il est repris ligne par ligne,
+    chacune dans son propre savepoint : seules les lignes fautives sont signalées.
+    """
+    eleves = [eleve for _, eleve in lot]
+    try:
+        with transaction.atomic():
+            Eleve.objects.bulk_create(eleves)
+            _indexer_lot(eleves)
+        return len(eleves)
+    except IntegrityError:
+        pass
+
+    crees = 0
+    for numero, eleve in lot:
+        eleve.pk = None
+        try:
+            with transaction.atomic():
+                Eleve.objects.bulk_create([eleve])
+                _indexer_lot([eleve])
+        except IntegrityError as exc:
+            erreurs.append({"ligne": numero, "erreurs": {"__all__": [str(exc)]}})
+            continue
+        crees += 1
+    return crees
+
+
+def _indexer_lot(eleves):
+    # MySQL ne renvoie pas les ids d'un INSERT multiple : relecture par email.
+    if any(eleve.pk is None for eleve in eleves):
+        ids = dict(
+            Eleve.objects.filter(email__in=[e.email for e in eleves]).values_list(
+                "email", "id"
+            )
+        )
+        for eleve in eleves:
+            eleve.pk = ids[eleve.email]
+    JetonRecherche.indexer(eleves)
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from backend_ecole_peg.benchmark import comparer, executer
+
+
+class Command(BaseCommand):
+    help = "Mesurer p50/p95 et le nombre de requêtes SQL de chaque endpoint GET de l'API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repetitions", type=int, default=20)
+        parser.add_argument("--filtre", help="Ne mesurer que les URL contenant ce texte")
+        parser.add_argument("--sauver", type=Path, help="Enregistrer les résultats comme référence")
+        parser.add_argument("--comparer", type=Path, help="Comparer à une référence enregistrée")
+
+    def handle(self, *args, **options):
+        resultats = executer(options["repetitions"], options["filtre"])
+        comparaison = (
+            comparer(resultats, json.loads(options["comparer"].read_text()))
+            if options["comparer"]
+            else {}
+        )
+
+        largeur = max((len(url) for url in resultats), default=10)
+        for url, mesure in resultats.items():
+            ligne = (
+                f"{url:<{largeur}}  {mesure['statut']}  p50 {mesure['p50_ms']:>8.2f} ms  "
+                f"p95 {mesure['p95_ms']:>8.2f} ms  {mesure['requetes']:>4} req."
+            )
+            if url in comparaison:
+                delta = comparaison[url]
+                if delta["p50_variation_pct"] is not None:
+                    ligne += f"  ({delta['p50_variation_pct']:+}% p50,"
+                else:
+                    ligne += "  ("
+                ligne += f" {delta['requetes_variation']:+} req.)"
+            self.stdout.write(ligne)
+
+        if options["sauver"]:
+            options["sauver"].write_text(json.dumps(resultats, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée : {options['sauver']}"))
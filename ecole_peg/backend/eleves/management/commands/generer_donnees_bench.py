@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from backend_ecole_peg.donnees_synthetiques import generer
+
+
+class Command(BaseCommand):
+    help = (
+        "Générer des données synthétiques volumineuses pour les benchmarks "
+        "(à n'utiliser que sur une base locale)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--eleves", type=int, default=10000)
+        parser.add_argument("--sessions", type=int, default=500)
+        parser.add_argument("--presences", type=int, default=200000)
+        parser.add_argument("--factures", type=int, default=50000)
+        parser.add_argument("--graine", type=int, default=42)
+
+    def handle(self, *args, **options):
+        generer(
+            nb_eleves=options["eleves"],
+            nb_sessions=options["sessions"],
+            nb_presences=options["presences"],
+            nb_factures=options["factures"],
+            graine=options["graine"],
+            sortie=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS("Données synthétiques générées."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from eleves.miniatures import generer_derives
+from eleves.models import Document
+
+
+class Command(BaseCommand):
+    help = "Générer les miniatures et aperçus manquants des documents élèves"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tous", action="store_true", help="Retraiter aussi les documents ayant déjà une miniature"
+        )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.order_by("id")
+        if not options["tous"]:
+            documents = documents.filter(miniature="")
+
+        total = 0
+        traitees = set()
+        for document_id, empreinte in documents.values_list("id", "empreinte"):
+            # Un contenu partagé n'est traité qu'une fois.
+            if empreinte and empreinte in traitees:
+                continue
+            generer_derives(document_id)
+            traitees.add(empreinte)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} document(s) traité(s)."))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from backend_ecole_peg.cache_reponses import incrementer_version
 from eleves.scripts.generer_donnees_pays import generer_donnees_pays
 
 
@@ -7,4 +8,6 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         generer_donnees_pays()
+        # Effectif pour tous les processus avec un cache des réponses partagé.
+        incrementer_version("eleves.Pays")
         self.stdout.write(self.style.SUCCESS("Les données des pays ont été générées avec succès."))
@@ -0,0 +1,29 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from eleves.importation import importer_eleves, lire_fichier
+
+
+class Command(BaseCommand):
+    help = "Importer des élèves en masse depuis un fichier CSV ou JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fichier", type=Path)
+        parser.add_argument("--taille-lot", type=int, default=500)
+
+    def handle(self, *args, **options):
+        chemin = options["fichier"]
+        try:
+            lignes = lire_fichier(chemin.read_bytes(), chemin.name)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Fichier illisible : {e}")
+
+        resultat = importer_eleves(lignes, taille_lot=options["taille_lot"])
+
+        for erreur in resultat["erreurs"]:
+            self.stderr.write(f"Ligne {erreur['ligne']} : {erreur['erreurs']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{resultat['crees']} élève(s) créé(s), "
+                f"{len(resultat['erreurs'])} ligne(s) en erreur."
+            )
+        )
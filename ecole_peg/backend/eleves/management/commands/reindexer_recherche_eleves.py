@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from eleves.models import Eleve, JetonRecherche
+from eleves.recherche import cle_tri
+
+
+class Command(BaseCommand):
+    help = "Recalculer la clé de tri et les jetons de recherche de tous les élèves"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--taille-lot", type=int, default=500)
+
+    def handle(self, *args, **options):
+        taille_lot = options["taille_lot"]
+        lot = []
+        total = 0
+
+        def traiter(lot):
+            with transaction.atomic():
+                for eleve in lot:
+                    eleve.cle_tri = cle_tri(eleve.nom, eleve.prenom)
+                Eleve.objects.bulk_update(lot, ["cle_tri"])
+                JetonRecherche.indexer(lot)
+
+        eleves = Eleve.objects.only("id", "nom", "prenom", "email", "telephone")
+        for eleve in eleves.iterator(chunk_size=taille_lot):
+            lot.append(eleve)
+            if len(lot) >= taille_lot:
+                traiter(lot)
+                total += len(lot)
+                lot = []
+        if lot:
+            traiter(lot)
+            total += len(lot)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} élève(s) réindexé(s)."))
@@ -0,0 +1,196 @@
+"""
+Miniatures et aperçus des documents élèves, générés en arrière-plan par un
+pool de threads après validation de la transaction qui crée le Document.
+
+Les fichiers dérivés sont rangés par empreinte du contenu : un même fichier
+partagé par plusieurs documents n'est traité qu'une fois. Pillow est requis
+pour les images ; les PDF sont rendus avec PyMuPDF ou, à défaut, pdftoppm
+(poppler) s'ils sont installés, sinon ils restent sans miniature.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from .models import Document
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # dépendance optionnelle
+    Image = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # dépendance optionnelle
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+DOSSIER_MINIATURES = "eleves/miniatures"
+DOSSIER_APERCUS = "eleves/apercus"
+EXTENSIONS_IMAGES = ("jpg", "jpeg", "png")
+
+_verrou = threading.Lock()
+_pool = None
+
+
+def _stockage():
+    return Document._meta.get_field("fichier").storage
+
+
+def _chemin(dossier, empreinte):
+    return f"{dossier}/{empreinte[:2]}/{empreinte}.jpg"
+
+
+def _en_jpeg(image, dimension_max, qualite):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((dimension_max, dimension_max))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    sortie = io.BytesIO()
+    image.save(sortie, "JPEG", quality=qualite, optimize=True)
+    return sortie.getvalue()
+
+
+def _ouvrir_image(contenu, dimension_max):
+    image = Image.open(io.BytesIO(contenu))
+    # Décodage JPEG directement à l'échelle réduite la plus proche.
+    image.draft("RGB", (dimension_max, dimension_max))
+    return image
+
+
+def _rendre_pdf(contenu, dimension_max):
+    """Première page du PDF en image PIL, ou None sans moteur de rendu."""
+    if fitz is not None:
+        with fitz.open(stream=contenu, filetype="pdf") as pdf:
+            page = pdf[0]
+            zoom = dimension_max / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            return Image.open(io.BytesIO(pixmap.tobytes("png")))
+
+    if shutil.which("pdftoppm"):
+        with tempfile.TemporaryDirectory() as dossier:
+            source = os.path.join(dossier, "source.pdf")
+            with open(source, "wb") as f:
+                f.write(contenu)
+            subprocess.run(
+                [
+                    "pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-png",
+                    "-scale-to", str(dimension_max), source,
+                    os.path.join(dossier, "page"),
+                ],
+                check=True,
+                timeout=30,
+                capture_output=True,
+            )
+            with open(os.path.join(dossier, "page.png"), "rb") as f:
+                image = Image.open(io.BytesIO(f.read()))
+                image.load()
+                return image
+
+    return None
+
+
+def _miniature(contenu, extension):
+    taille = settings.MINIATURE_DIMENSION
+    if extension in EXTENSIONS_IMAGES:
+        image = _ouvrir_image(contenu, taille)
+    else:
+        image = _rendre_pdf(contenu, taille)
+    return _en_jpeg(image, taille, 75) if image is not None else None
+
+
+def _apercu(contenu, extension):
+    """Version recompressée des images trop lourdes ou trop grandes, sinon None."""
+    if extension not in EXTENSIONS_IMAGES:
+        return None
+    dimension_max = settings.APERCU_DIMENSION_MAX
+    image = Image.open(io.BytesIO(contenu))
+    if len(contenu) <= settings.APERCU_POIDS_MAX and max(image.size) <= dimension_max:
+        return None
+    image.draft("RGB", (dimension_max, dimension_max))
+    return _en_jpeg(image, dimension_max, 82)
+
+
+def _deriver(stockage, chemin, contenu, fabriquer, extension):
+    """Chemin du fichier dérivé, créé au besoin ; "" s'il n'y a rien à produire."""
+    if stockage.exists(chemin):
+        return chemin
+    donnees = fabriquer(contenu, extension)
+    if donnees is None:
+        return ""
+    return stockage.save(chemin, ContentFile(donnees))
+
+
+def generer_derives(document_id):
+    """
+    Produit miniature et aperçu d'un document et les enregistre sur tous les
+    documents de même contenu. Calcule l'empreinte des documents antérieurs
+    au stockage par contenu.
+    """
+    if Image is None:
+        logger.warning("Pillow n'est pas installé : miniatures désactivées.")
+        return
+
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None or not document.fichier:
+        return
+
+    stockage = _stockage()
+    extension = os.path.splitext(document.fichier.name)[1].lower().lstrip(".")
+    with stockage.open(document.fichier.name, "rb") as f:
+        contenu = f.read()
+    empreinte = document.empreinte or hashlib.sha256(contenu).hexdigest()
+
+    try:
+        miniature = _deriver(
+            stockage, _chemin(DOSSIER_MINIATURES, empreinte), contenu, _miniature, extension
+        )
+        apercu = _deriver(
+            stockage, _chemin(DOSSIER_APERCUS, empreinte), contenu, _apercu, extension
+        )
+    except (OSError, ValueError, Image.DecompressionBombError, subprocess.SubprocessError):
+        logger.exception("Miniature impossible pour le document %s", document_id)
+        return
+
+    # update() : pas de post_save, donc pas de nouvelle planification.
+    if document.empreinte:
+        documents = Document.objects.filter(empreinte=empreinte)
+    else:
+        documents = Document.objects.filter(pk=document_id)
+    documents.update(empreinte=empreinte, miniature=miniature, apercu=apercu)
+
+
+def _executer(document_id):
+    try:
+        generer_derives(document_id)
+    except Exception:
+        logger.exception("Échec du traitement des miniatures du document %s", document_id)
+    finally:
+        # Les threads du pool ne doivent pas garder de connexion ouverte.
+        connections.close_all()
+
+
+def _obtenir_pool():
+    global _pool
+    with _verrou:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.MINIATURES_WORKERS,
+                thread_name_prefix="miniatures",
+            )
+        return _pool
+
+
+def planifier_miniatures(sender, instance, created, raw=False, **kwargs):
+    """Récepteur post_save de Document : traitement soumis au pool après commit."""
+    if created and not raw:
+        document_id = instance.pk
+        transaction.on_commit(lambda: _obtenir_pool().submit(_executer, document_id))
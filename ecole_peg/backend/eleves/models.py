@@ -7,8 +7,10 @@ from django.core.validators import (
 )
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from .validators import file_size_validator
+from .recherche import cle_tri, jetons, jetons_eleve
 
 
 class SexeChoices(models.TextChoices):
@@ -97,6 +99,26 @@ class Garant(Personne):
         ]
 
 
+class EleveQuerySet(models.QuerySet):
+    def rechercher(self, texte):
+        """
+        Chaque mot de `texte` doit être le préfixe d'un jeton de l'élève
+        (sans accents ni casse) ; chaque mot est un parcours d'index sur jeton.
+        Un texte sans aucun jeton ne trouve rien.
+        """
+        mots = jetons(texte)
+        if not mots:
+            return self.none()
+        qs = self
+        for jeton in mots:
+            qs = qs.filter(
+                id__in=JetonRecherche.objects.filter(
+                    jeton__startswith=jeton
+                ).values("eleve_id")
+            )
+        return qs
+
+
 class Eleve(Personne):
     date_naissance = models.DateField()
     lieu_naissance = models.CharField(max_length=100)
@@ -115,6 +137,18 @@ class Eleve(Personne):
     garant = models.ForeignKey(
         Garant, on_delete=models.SET_NULL, null=True, blank=True, related_name="eleves"
     )
+    # « nom prenom » normalisé, maintenu par save() ; sert au tri des listes.
+    cle_tri = models.CharField(max_length=201, default="", editable=False)
+
+    objects = EleveQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.cle_tri = cle_tri(self.nom, self.prenom)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"cle_tri"}
+        super().save(*args, **kwargs)
+        JetonRecherche.indexer([self])
 
     def clean(self):
         super().clean()
@@ -134,9 +168,36 @@ class Eleve(Personne):
             models.Index(fields=["nom"]),
             models.Index(fields=["prenom"]),
             models.Index(fields=["date_naissance"]),
+            models.Index(fields=["cle_tri"]),
         ]
 
 
+class JetonRecherche(models.Model):
+    """Index inversé des mots de recherche d'un élève (voir eleves.recherche)."""
+
+    eleve = models.ForeignKey(
+        Eleve, on_delete=models.CASCADE, related_name="jetons_recherche"
+    )
+    jeton = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [models.Index(fields=["jeton", "eleve"])]
+
+    @classmethod
+    def indexer(cls, eleves):
+        """Reconstruit les jetons des élèves donnés (élèves déjà enregistrés)."""
+        eleves = list(eleves)
+        cls.objects.filter(eleve__in=eleves).delete()
+        cls.objects.bulk_create(
+            [
+                cls(eleve=eleve, jeton=jeton[:255])
+                for eleve in eleves
+                for jeton in jetons_eleve(eleve)
+            ],
+            batch_size=1000,
+        )
+
+
 class Test(models.Model):
     date_test = models.DateField()
     niveau = models.CharField(max_length=2, choices=NiveauChoices.choices)
@@ -167,8 +228,41 @@ class Document(models.Model):
             file_size_validator,
         ],
     )
+    # SHA-256 du contenu : le fichier est stocké une seule fois par contenu
+    # et partagé entre documents (voir eleves.documents).
+    empreinte = models.CharField(max_length=64, blank=True, default="")
+    # Dérivés générés en arrière-plan (voir eleves.miniatures).
+    miniature = models.FileField(max_length=200, blank=True, default="")
+    apercu = models.FileField(max_length=200, blank=True, default="")
     date_ajout = models.DateField(auto_now_add=True)
     eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE, related_name="documents")
 
     class Meta:
         ordering = ["-date_ajout"]
+        indexes = [models.Index(fields=["fichier"]), models.Index(fields=["empreinte"])]
+
+
+class ContenuDocument(models.Model):
+    """Fichier stocké par contenu et nombre de documents qui le référencent."""
+
+    chemin = models.CharField(max_length=200, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+
+class InstantaneTableauBord(models.Model):
+    """Section précalculée du tableau de bord (voir eleves.tableau_bord)."""
+
+    section = models.CharField(max_length=20, unique=True)
+    donnees = models.JSONField(encoder=DjangoJSONEncoder)
+    date_calcul = models.DateTimeField()
+    perime = models.BooleanField(default=False)
+    # Incrémentée à chaque invalidation : un calcul ne lève `perime` que si
+    # aucune invalidation n'est survenue depuis sa lecture de l'instantané.
+    version = models.PositiveBigIntegerField(default=0)
+
+
+class CompteurTableauBord(models.Model):
+    """Effectif d'un modèle tenu à jour par les signaux (voir eleves.tableau_bord)."""
+
+    modele = models.CharField(max_length=50, unique=True)
+    valeur = models.BigIntegerField()
@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+MOTIF_JETON = re.compile(r"[a-z0-9]+")
+
+
+def normaliser(texte):
+    """Minuscules sans accents : « Hélène » -> « helene »."""
+    decompose = unicodedata.normalize("NFKD", texte or "")
+    return "".join(c for c in decompose if not unicodedata.combining(c)).lower()
+
+
+def jetons(texte):
+    return MOTIF_JETON.findall(normaliser(texte))
+
+
+def cle_tri(nom, prenom):
+    """Clé de tri et de recherche par préfixe : « nom prenom » normalisés."""
+    return f"{normaliser(nom)} {normaliser(prenom)}"
+
+
+def jetons_eleve(eleve):
+    """Jetons indexés pour un élève : nom, prénom, email et chiffres du téléphone."""
+    resultat = set(jetons(eleve.nom)) | set(jetons(eleve.prenom))
+    resultat |= set(jetons(eleve.email))
+    chiffres = re.sub(r"\D", "", eleve.telephone or "")
+    if chiffres:
+        resultat.add(chiffres)
+        resultat |= set(re.findall(r"\d+", eleve.telephone))
+    return resultat
@@ -1,4 +1,5 @@
 from datetime import date
+from django.urls import reverse
 from ninja import Schema, UploadedFile, File
 from typing import Optional
 
@@ -47,14 +48,25 @@ class DocumentOut(Schema):
     id: int
     nom: str
     fichier_url: str
+    miniature_url: Optional[str] = None
+    apercu_url: Optional[str] = None
     date_ajout: date
 
     @classmethod
     def from_model(cls, document, request) -> "DocumentOut":
+        # Les fichiers passent par l'endpoint authentifié, pas par MEDIA_URL.
+        url = request.build_absolute_uri(
+            reverse(
+                f"{request.resolver_match.namespace}:fichier_document",
+                kwargs={"eleve_id": document.eleve_id, "document_id": document.id},
+            )
+        )
         return cls(
             id=document.id,
             nom=document.nom,
-            fichier_url=request.build_absolute_uri(document.fichier.url),
+            fichier_url=url,
+            miniature_url=f"{url}?variante=miniature" if document.miniature else None,
+            apercu_url=f"{url}?variante=apercu" if document.apercu else None,
             date_ajout=document.date_ajout,
         )
 
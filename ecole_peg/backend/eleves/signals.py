@@ -0,0 +1,51 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+from backend_ecole_peg.cache_reponses import MODELES_VERSIONNES, invalider_reponses
+from .documents import liberer_document
+from .miniatures import planifier_miniatures
+from .models import Document
+from .tableau_bord import (
+    MODELES_COMPTES,
+    SECTIONS_PAR_MODELE,
+    ajuster_compteur,
+    invalider_sections,
+)
+
+
+def invalider_tableau_bord(sender, **kwargs):
+    """Périme les sections du tableau de bord dépendant du modèle modifié."""
+    if not kwargs.get("raw"):
+        invalider_sections(SECTIONS_PAR_MODELE[sender._meta.label])
+
+
+def compter_creation(sender, created, **kwargs):
+    if created:
+        ajuster_compteur(sender._meta.label, 1)
+
+
+def compter_suppression(sender, **kwargs):
+    ajuster_compteur(sender._meta.label, -1)
+
+
+# Connectés avant invalider_tableau_bord : les on_commit s'exécutant dans
+# l'ordre d'enregistrement, le compteur est ajusté avant que la section ne
+# soit périmée.
+for label in MODELES_COMPTES:
+    modele = apps.get_model(label)
+    post_save.connect(compter_creation, sender=modele)
+    post_delete.connect(compter_suppression, sender=modele)
+
+# Connexion limitée aux modèles suivis : un récepteur global empêcherait les
+# suppressions rapides (fast delete) des autres modèles.
+for label in SECTIONS_PAR_MODELE:
+    modele = apps.get_model(label)
+    post_save.connect(invalider_tableau_bord, sender=modele)
+    post_delete.connect(invalider_tableau_bord, sender=modele)
+
+for label in MODELES_VERSIONNES:
+    modele = apps.get_model(label)
+    post_save.connect(invalider_reponses, sender=modele)
+    post_delete.connect(invalider_reponses, sender=modele)
+
+post_save.connect(planifier_miniatures, sender=Document)
+post_delete.connect(liberer_document, sender=Document)
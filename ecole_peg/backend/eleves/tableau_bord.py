@@ -0,0 +1,341 @@
+import asyncio
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    Sum,
+    F,
+    Value,
+    DecimalField,
+    ExpressionWrapper,
+    Count,
+    Q,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CompteurTableauBord, Eleve, InstantaneTableauBord
+from cours.models import CoursPrive, Session, Inscription
+from cours.presences import taux_presence
+from factures.models import Facture, Paiement
+
+SECTION_FACTURES = "factures"
+SECTION_COURS = "cours"
+SECTION_ELEVES = "eleves"
+
+# Sections du tableau de bord à recalculer lorsqu'un modèle est modifié.
+SECTIONS_PAR_MODELE = {
+    "eleves.Eleve": (SECTION_FACTURES, SECTION_COURS, SECTION_ELEVES),
+    "eleves.Pays": (SECTION_ELEVES,),
+    "cours.Cours": (SECTION_COURS,),
+    "cours.Enseignant": (SECTION_COURS,),
+    "cours.Session": (SECTION_COURS, SECTION_ELEVES),
+    "cours.Inscription": (SECTION_COURS, SECTION_ELEVES),
+    "cours.CoursPrive": (SECTION_COURS,),
+    "cours.Presence": (SECTION_ELEVES,),
+    "factures.Facture": (SECTION_FACTURES,),
+    "factures.DetailFacture": (SECTION_FACTURES,),
+    "factures.Paiement": (SECTION_FACTURES,),
+}
+
+# Effectifs tenus à jour par les signaux (+1 à la création, -1 à la
+# suppression) plutôt que recomptés à chaque calcul de section.
+MODELES_COMPTES = ("eleves.Eleve", "cours.Cours", "cours.Enseignant")
+
+
+# ------------------- COMPTEURS -------------------
+
+
+def lire_compteur(label):
+    """Effectif du modèle `label`, initialisé par un COUNT au premier accès."""
+    valeur = (
+        CompteurTableauBord.objects.filter(modele=label)
+        .values_list("valeur", flat=True)
+        .first()
+    )
+    if valeur is None:
+        valeur = apps.get_model(label).objects.count()
+        CompteurTableauBord.objects.get_or_create(
+            modele=label, defaults={"valeur": valeur}
+        )
+    return valeur
+
+
+def ajuster_compteur(label, delta):
+    """Ajoute `delta` au compteur une fois la transaction validée (UPDATE atomique)."""
+    transaction.on_commit(
+        lambda: CompteurTableauBord.objects.filter(modele=label).update(
+            valeur=F("valeur") + delta
+        )
+    )
+
+
+def recompter_compteurs():
+    """Recale tous les compteurs sur un COUNT (rafraîchissement forcé, chargements en masse)."""
+    for label in MODELES_COMPTES:
+        CompteurTableauBord.objects.update_or_create(
+            modele=label, defaults={"valeur": apps.get_model(label).objects.count()}
+        )
+
+
+# ------------------- CALCUL DES SECTIONS -------------------
+
+
+def calculer_section_factures(today):
+    first_day_month = today.replace(day=1)
+    five_days_ago = today - timedelta(days=5)
+
+    # --- Montant total de toutes les factures impayées du mois ---
+    montant_total_factures_impayees_mois = Facture.objects.filter(
+        date_emission__gte=first_day_month, montant_restant__gt=0
+    ).aggregate(
+        total_restant=Coalesce(
+            Sum("montant_restant"), Value(0), output_field=DecimalField()
+        )
+    )["total_restant"]
+
+    # --- Montant total des paiements du mois ---
+    montant_total_paiements_mois = Paiement.objects.filter(
+        date_paiement__gte=first_day_month
+    ).aggregate(total=Coalesce(Sum("montant"), Value(0), output_field=DecimalField()))[
+        "total"
+    ]
+
+    # --- Détail des factures impayées depuis ≥5 jours ---
+    factures_5j = (
+        Facture.objects.filter(date_emission__lte=five_days_ago, montant_restant__gt=0)
+        .annotate(
+            eleve_nom=F("eleve__nom"),
+            eleve_prenom=F("eleve__prenom"),
+        )
+        .values(
+            "id",
+            "date_emission",
+            "montant_total",
+            "montant_restant",
+            "eleve_nom",
+            "eleve_prenom",
+        )
+    )
+
+    factures_impayees_plus_5j = [
+        {
+            "id": f["id"],
+            "date_emission": f["date_emission"],
+            "montant_total": float(f["montant_total"]),
+            "montant_restant": float(f["montant_restant"]),
+            "eleve_nom": f["eleve_nom"],
+            "eleve_prenom": f["eleve_prenom"],
+        }
+        for f in factures_5j
+    ]
+
+    return {
+        "montant_total_paiements_mois": float(montant_total_paiements_mois),
+        "montant_total_factures_impayees": float(montant_total_factures_impayees_mois),
+        "factures_impayees_plus_5j": factures_impayees_plus_5j,
+    }
+
+
+def calculer_section_cours(today):
+    first_day_month = today.replace(day=1)
+
+    # --- Répartition par cours-type-niveau des élèves actifs ---
+    repartition_cours = list(
+        Eleve.objects.filter(inscriptions__statut="A")
+        .values(
+            "inscriptions__session__cours__nom",
+            "inscriptions__session__cours__type_cours",
+            "inscriptions__session__cours__niveau",
+        )
+        .annotate(total=Count("id"))
+        .order_by("inscriptions__session__cours__nom")
+    )
+
+    total_cours = lire_compteur("cours.Cours")
+    sessions_actives = Session.objects.filter(statut="O").count()
+    cours_prives_programmes = CoursPrive.objects.filter(
+        date_cours_prive__gte=first_day_month
+    ).count()
+    sessions_ouvertes = list(
+        Session.objects.filter(statut="O")
+        .annotate(
+            eleves_restants=ExpressionWrapper(
+                F("capacite_max")
+                - Count("inscriptions", filter=Q(inscriptions__statut="A")),
+                output_field=DecimalField(),
+            )
+        )
+        .values("date_debut", "eleves_restants")
+        .order_by("date_debut")
+    )
+    nombre_enseignants = lire_compteur("cours.Enseignant")
+
+    return {
+        "total_cours": total_cours,
+        "sessions_actives": sessions_actives,
+        "cours_prives_programmes_mois": cours_prives_programmes,
+        "sessions_ouvertes": sessions_ouvertes,
+        "nombre_enseignants": nombre_enseignants,
+        "repartition_eleves_actifs": repartition_cours,
+    }
+
+
+def calculer_section_eleves(today):
+    # --- Présence < 80% lors des 7 derniers jours de session ---
+    inscriptions_fin_session = Inscription.objects.filter(
+        session__date_fin__gte=today,
+        session__date_fin__lte=today + timedelta(days=7),
+    )
+    eleves_presence_inferieur_80 = [
+        {
+            "nom": t["nom"],
+            "prenom": t["prenom"],
+            "date_naissance": t["date_naissance"],
+            "taux_presence": t["taux_presence"],
+        }
+        for t in taux_presence(inscriptions_fin_session, seuil=80)
+    ]
+
+    # --- Élèves en préinscription depuis >3 jours ---
+    date_limite = today - timedelta(days=3)
+    eleves_preinscrits = list(
+        Eleve.objects.filter(
+            inscriptions__preinscription=True,
+            inscriptions__date_inscription__lte=date_limite,
+        )
+        .values("nom", "prenom", "date_naissance")
+        .distinct()
+    )
+
+    total_eleves = lire_compteur("eleves.Eleve")
+    eleves_actifs = Eleve.objects.filter(inscriptions__statut="A").distinct().count()
+    # Annoter le nombre d'élèves par pays
+    pays_counts = (
+        Eleve.objects.values("pays__nom")
+        .annotate(total=Count("id"))
+        .order_by("-total")
+    )
+    # Trouver le maximum
+    max_total = pays_counts.first()["total"] if pays_counts else None
+    # Retourner tous les pays ayant ce maximum
+    pays_plus_eleves = [
+        p["pays__nom"] for p in pays_counts if p["total"] == max_total
+    ] if max_total else []
+
+    return {
+        "total_eleves": total_eleves,
+        "eleves_actifs": eleves_actifs,
+        "pays_plus_eleves": pays_plus_eleves,
+        "eleves_presence_inferieur_80": eleves_presence_inferieur_80,
+        "eleves_preinscription_plus_3j": eleves_preinscrits,
+    }
+
+
+CALCULS_SECTIONS = {
+    SECTION_FACTURES: calculer_section_factures,
+    SECTION_COURS: calculer_section_cours,
+    SECTION_ELEVES: calculer_section_eleves,
+}
+
+
+# ------------------- INSTANTANÉ -------------------
+
+
+def _est_a_jour(instantane, maintenant):
+    return (
+        not instantane.perime
+        and instantane.date_calcul.date() == maintenant.date()
+        and maintenant - instantane.date_calcul <= settings.TABLEAU_BORD_VALIDITE
+    )
+
+
+def _separer_sections(instantanes, maintenant, rafraichir):
+    """({section: données à jour}, [sections à recalculer])."""
+    a_jour = {}
+    a_calculer = []
+    for section in CALCULS_SECTIONS:
+        instantane = instantanes.get(section)
+        if not rafraichir and instantane and _est_a_jour(instantane, maintenant):
+            a_jour[section] = instantane.donnees
+        else:
+            a_calculer.append(section)
+    return a_jour, a_calculer
+
+
+def _calculer_isole(calculer, today):
+    # Exécuté dans un thread du pool : sa connexion ne doit pas lui survivre.
+    try:
+        return calculer(today)
+    finally:
+        connections.close_all()
+
+
+async def _lire_instantanes(maintenant):
+    """
+    Instantanés par section. Les sections absentes sont d'abord créées
+    périmées : une invalidation survenant pendant leur premier calcul doit
+    déjà trouver une ligne à incrémenter.
+    """
+    qs = InstantaneTableauBord.objects.filter(section__in=CALCULS_SECTIONS)
+    instantanes = {i.section: i async for i in qs}
+    manquantes = [s for s in CALCULS_SECTIONS if s not in instantanes]
+    if manquantes:
+        await InstantaneTableauBord.objects.abulk_create(
+            [
+                InstantaneTableauBord(
+                    section=section, donnees={}, date_calcul=maintenant, perime=True
+                )
+                for section in manquantes
+            ],
+            ignore_conflicts=True,
+        )
+        instantanes.update(
+            {i.section: i async for i in qs.filter(section__in=manquantes)}
+        )
+    return instantanes
+
+
+async def aobtenir_tableau_bord(rafraichir=False):
+    """
+    Retourne le tableau de bord en une lecture de l'instantané ; seules les
+    sections périmées (signal, changement de jour ou fenêtre de validité
+    dépassée) sont recalculées, en parallèle, chacune dans son thread et sur
+    sa connexion. `rafraichir` recalcule toutes les sections et recale les
+    compteurs.
+    """
+    maintenant = timezone.now()
+    today = maintenant.date()
+    instantanes = await _lire_instantanes(maintenant)
+
+    resultat, a_calculer = _separer_sections(instantanes, maintenant, rafraichir)
+    if rafraichir:
+        await sync_to_async(recompter_compteurs)()
+    calculs = await asyncio.gather(
+        *(
+            sync_to_async(_calculer_isole, thread_sensitive=False)(
+                CALCULS_SECTIONS[section], today
+            )
+            for section in a_calculer
+        )
+    )
+    for section, donnees in zip(a_calculer, calculs):
+        # UPDATE conditionnel : si la section a été invalidée pendant le calcul
+        # (version changée), elle reste périmée et sera recalculée.
+        await InstantaneTableauBord.objects.filter(
+            section=section, version=instantanes[section].version
+        ).aupdate(donnees=donnees, date_calcul=maintenant, perime=False)
+        resultat[section] = donnees
+
+    return {section: resultat[section] for section in CALCULS_SECTIONS}
+
+
+def invalider_sections(sections):
+    """Marque les sections comme périmées une fois la transaction validée."""
+    transaction.on_commit(
+        lambda: InstantaneTableauBord.objects.filter(section__in=sections).update(
+            perime=True, version=F("version") + 1
+        )
+    )
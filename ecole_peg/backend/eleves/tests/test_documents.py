@@ -0,0 +1,127 @@
+import tempfile
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+from ..documents import chemin_contenu, stocker, valider_televersement
+from ..models import ContenuDocument, Document
+
+
+class TeleversementTests(SimpleTestCase):
+    def test_pdf_valide(self):
+        contenu = b"%PDF-1.4\n..."
+        empreinte, extension = valider_televersement(SimpleUploadedFile("a.PDF", contenu))
+        self.assertEqual(extension, "pdf")
+        self.assertEqual(len(empreinte), 64)
+
+    def test_jpeg_normalise_en_jpg(self):
+        fichier = SimpleUploadedFile("photo.jpeg", b"\xff\xd8\xff\xe0" + b"0" * 20)
+        self.assertEqual(valider_televersement(fichier)[1], "jpg")
+
+    def test_contenu_ne_correspondant_pas_a_l_extension(self):
+        with self.assertRaises(ValidationError):
+            valider_televersement(SimpleUploadedFile("faux.png", b"%PDF-1.4"))
+
+    def test_extension_refusee(self):
+        with self.assertRaises(ValidationError):
+            valider_televersement(SimpleUploadedFile("script.exe", b"MZ"))
+
+    def test_taille_maximale(self):
+        with self.settings(MAX_UPLOAD_SIZE=10):
+            with self.assertRaises(ValidationError):
+                valider_televersement(SimpleUploadedFile("a.pdf", b"%PDF-" + b"0" * 20))
+
+
+class StockageDocumentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = creer_eleve(creer_pays())
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = self.settings(MEDIA_ROOT=dossier.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.fichier = SimpleUploadedFile("a.pdf", b"%PDF-1.4\n...")
+        self.empreinte, self.extension = valider_televersement(self.fichier)
+        derives = mock.patch("eleves.miniatures.generer_derives")
+        derives.start()
+        self.addCleanup(derives.stop)
+
+    def _document(self, eleve=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(
+                eleve=eleve or self.eleve,
+                nom="Permis",
+                empreinte=self.empreinte,
+                fichier=stocker(self.fichier, self.empreinte, self.extension),
+            )
+
+    def _references(self):
+        contenu = ContenuDocument.objects.filter(chemin=self.chemin).first()
+        return contenu.references if contenu else None
+
+    @property
+    def chemin(self):
+        return chemin_contenu(self.empreinte, self.extension)
+
+    def test_ecrit_a_la_validation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            chemin = stocker(self.fichier, self.empreinte, self.extension)
+            self.assertFalse(default_storage.exists(chemin))
+        self.assertEqual(chemin, chemin_contenu(self.empreinte, "pdf"))
+        self.assertTrue(default_storage.exists(chemin))
+
+    def test_rien_ecrit_si_la_transaction_est_annulee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    chemin = stocker(self.fichier, self.empreinte, self.extension)
+                    raise ValueError
+        self.assertFalse(default_storage.exists(chemin))
+
+    def test_contenu_partage_compte_et_libere_au_dernier_document(self):
+        premier, second = self._document(), self._document()
+        self.assertEqual(self._references(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            premier.delete()
+        self.assertEqual(self._references(), 1)
+        self.assertTrue(default_storage.exists(self.chemin))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self._references())
+        self.assertFalse(default_storage.exists(self.chemin))
+
+    def test_suppression_en_cascade(self):
+        eleve = creer_eleve(self.eleve.pays, email="autre@exemple.ch")
+        self._document(eleve)
+        with self.captureOnCommitCallbacks(execute=True):
+            eleve.delete()
+        self.assertIsNone(self._references())
+        self.assertFalse(default_storage.exists(self.chemin))
+
+    def test_televersement_concurrent_conserve_le_fichier(self):
+        document = self._document()
+        with self.captureOnCommitCallbacks() as rappels:
+            document.delete()
+        self.assertEqual(self._references(), 0)
+        # Même contenu téléversé avant l'exécution de la suppression différée.
+        self._document()
+        for rappel in rappels:
+            rappel()
+        self.assertEqual(self._references(), 1)
+        self.assertTrue(default_storage.exists(self.chemin))
+
+    def test_transaction_annulee_ne_compte_pas(self):
+        self._document()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                stocker(self.fichier, self.empreinte, self.extension)
+                raise ValueError
+        self.assertEqual(self._references(), 1)
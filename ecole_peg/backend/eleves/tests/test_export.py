@@ -0,0 +1,18 @@
+from django.test import TransactionTestCase
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+
+
+class ExportElevesTests(TransactionTestCase):
+    # TransactionTestCase : le flux lit la base depuis un autre thread, qui ne
+    # verrait pas les données d'une transaction de test non validée.
+    def setUp(self):
+        creer_eleve(creer_pays())
+
+    async def test_export_asgi_diffuse_un_iterateur_async(self):
+        self.async_client.cookies["access_token"] = generer_token()
+        reponse = await self.async_client.get("/api/eleves/eleves/export/")
+        self.assertEqual(reponse.status_code, 200)
+        self.assertTrue(reponse.is_async)
+        contenu = b"".join([m async for m in reponse.streaming_content]).decode()
+        self.assertIn("helene@exemple.ch", contenu)
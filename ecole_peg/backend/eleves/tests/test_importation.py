@@ -0,0 +1,95 @@
+from unittest import mock
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+from ..importation import importer_eleves, lire_fichier
+from ..models import Eleve
+
+
+class ImportationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.suisse = creer_pays()
+
+    def _ligne(self, **valeurs):
+        ligne = {
+            "nom": "Rossi",
+            "prenom": "Marco",
+            "date_naissance": "1995-02-03",
+            "lieu_naissance": "Lugano",
+            "sexe": "H",
+            "telephone": "+41 79 000 00 00",
+            "email": "marco@exemple.ch",
+            "type_permis": "P",
+            "pays": "Suisse",
+        }
+        ligne.update(valeurs)
+        return ligne
+
+    def test_lecture_csv_point_virgule(self):
+        contenu = "nom;prenom;email\nRossi;Marco;marco@exemple.ch\n".encode("utf-8-sig")
+        self.assertEqual(
+            lire_fichier(contenu, "eleves.csv"),
+            [{"nom": "Rossi", "prenom": "Marco", "email": "marco@exemple.ch"}],
+        )
+
+    def test_lecture_json_non_liste(self):
+        with self.assertRaises(ValueError):
+            lire_fichier(b'{"nom": "Rossi"}', "eleves.json")
+
+    def test_import_cree_et_indexe(self):
+        rapport = importer_eleves(
+            [self._ligne(), self._ligne(email="anna@exemple.ch", prenom="Anna")]
+        )
+        self.assertEqual(rapport, {"crees": 2, "erreurs": []})
+        self.assertEqual(
+            list(Eleve.objects.rechercher("ros ann").values_list("prenom", flat=True)),
+            ["Anna"],
+        )
+
+    def test_lignes_invalides_signalees_sans_bloquer(self):
+        creer_eleve(self.suisse, email="pris@exemple.ch")
+        rapport = importer_eleves(
+            [
+                self._ligne(),
+                self._ligne(email="pris@exemple.ch"),
+                self._ligne(email="autre@exemple.ch", pays="Atlantide"),
+                self._ligne(email="marco@exemple.ch", nom="Doublon"),
+                self._ligne(email="date@exemple.ch", date_naissance="pas une date"),
+            ]
+        )
+        self.assertEqual(rapport["crees"], 1)
+        self.assertEqual([e["ligne"] for e in rapport["erreurs"]], [2, 3, 4, 5])
+        self.assertIn("email", rapport["erreurs"][0]["erreurs"])
+        self.assertIn("pays_id", rapport["erreurs"][1]["erreurs"])
+
+    def test_element_json_non_objet_signale(self):
+        rapport = importer_eleves(
+            lire_fichier(b'[["Rossi", "Marco"], "texte", null]', "eleves.json")
+            + [self._ligne()]
+        )
+        self.assertEqual(rapport["crees"], 1)
+        self.assertEqual([e["ligne"] for e in rapport["erreurs"]], [1, 2, 3])
+
+    def test_email_existant_quelle_que_soit_la_casse(self):
+        creer_eleve(self.suisse, email="Marco@Exemple.ch")
+        rapport = importer_eleves([self._ligne(email="marco@exemple.CH")])
+        self.assertEqual(rapport["crees"], 0)
+        self.assertIn("email", rapport["erreurs"][0]["erreurs"])
+
+    def test_lot_en_echec_repris_ligne_par_ligne(self):
+        creer_eleve(self.suisse, email="pris@exemple.ch")
+        # Email créé par une autre requête après la vérification en mémoire.
+        with mock.patch("eleves.importation._emails_existants", return_value=set()):
+            rapport = importer_eleves(
+                [
+                    self._ligne(),
+                    self._ligne(email="pris@exemple.ch"),
+                    self._ligne(email="anna@exemple.ch", prenom="Anna"),
+                ]
+            )
+        self.assertEqual(rapport["crees"], 2)
+        self.assertEqual([e["ligne"] for e in rapport["erreurs"]], [2])
+        self.assertEqual(
+            set(Eleve.objects.values_list("email", flat=True)),
+            {"pris@exemple.ch", "marco@exemple.ch", "anna@exemple.ch"},
+        )
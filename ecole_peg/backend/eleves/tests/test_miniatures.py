@@ -0,0 +1,100 @@
+import io
+import tempfile
+from unittest import mock, skipIf
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+from .. import miniatures
+from ..documents import stocker, valider_televersement
+from ..miniatures import generer_derives
+from ..models import Document
+
+try:
+    from PIL import Image
+except ImportError:  # dépendance optionnelle
+    Image = None
+
+
+def _png(largeur, hauteur):
+    sortie = io.BytesIO()
+    Image.new("RGB", (largeur, hauteur), "navy").save(sortie, "PNG")
+    return sortie.getvalue()
+
+
+@skipIf(Image is None, "Pillow n'est pas installé")
+class MiniaturesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = creer_eleve(creer_pays())
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = self.settings(
+            MEDIA_ROOT=dossier.name, APERCU_DIMENSION_MAX=400, MINIATURE_DIMENSION=64
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        # Traitement appelé directement par les tests, pas par le pool.
+        pool = mock.patch("eleves.miniatures._obtenir_pool")
+        self.pool = pool.start()
+        self.addCleanup(pool.stop)
+
+    def _document(self, nom_fichier, contenu):
+        fichier = SimpleUploadedFile(nom_fichier, contenu)
+        empreinte, extension = valider_televersement(fichier)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(
+                eleve=self.eleve,
+                nom="Pièce",
+                empreinte=empreinte,
+                fichier=stocker(fichier, empreinte, extension),
+            )
+
+    def _dimensions(self, nom):
+        with default_storage.open(nom, "rb") as f:
+            image = Image.open(f)
+            return image.format, image.size
+
+    def test_miniature_et_apercu_d_une_grande_image(self):
+        document = self._document("scan.png", _png(1200, 600))
+        generer_derives(document.id)
+        document.refresh_from_db()
+
+        self.assertEqual(self._dimensions(document.miniature.name), ("JPEG", (64, 32)))
+        self.assertEqual(self._dimensions(document.apercu.name), ("JPEG", (400, 200)))
+
+    def test_petite_image_sans_apercu(self):
+        document = self._document("photo.png", _png(120, 80))
+        generer_derives(document.id)
+        document.refresh_from_db()
+        self.assertTrue(document.miniature.name)
+        self.assertEqual(document.apercu.name, "")
+
+    def test_derives_partages_par_les_documents_de_meme_contenu(self):
+        contenu = _png(200, 200)
+        premier = self._document("a.png", contenu)
+        second = self._document("b.png", contenu)
+        generer_derives(premier.id)
+        second.refresh_from_db()
+        premier.refresh_from_db()
+        self.assertTrue(premier.miniature.name)
+        self.assertEqual(second.miniature.name, premier.miniature.name)
+
+    def test_pdf_sans_moteur_de_rendu(self):
+        document = self._document("contrat.pdf", b"%PDF-1.4\n...")
+        with mock.patch.object(miniatures, "fitz", None), mock.patch(
+            "eleves.miniatures.shutil.which", return_value=None
+        ):
+            generer_derives(document.id)
+        document.refresh_from_db()
+        self.assertEqual((document.miniature.name, document.apercu.name), ("", ""))
+
+    def test_planifie_a_la_creation_seulement(self):
+        document = self._document("a.png", _png(10, 10))
+        self.assertEqual(self.pool.return_value.submit.call_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.nom = "Renommé"
+            document.save()
+        self.assertEqual(self.pool.return_value.submit.call_count, 1)
@@ -0,0 +1,42 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import TestCase
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.cache_reponses import ALIAS_CACHE
+from backend_ecole_peg.fabriques_test import creer_pays
+from ..cache_pays import pays_existe
+from ..models import Pays
+
+
+class PaysTests(TestCase):
+    def setUp(self):
+        caches[ALIAS_CACHE].clear()
+        self.client.cookies["access_token"] = generer_token()
+        self.suisse = creer_pays()
+
+    def _noms(self):
+        return [p["nom"] for p in self.client.get("/api/eleves/pays/").json()]
+
+    def test_fixture_rechargee_ailleurs_invalide_la_reponse(self):
+        self.assertEqual(self._noms(), ["Suisse"])
+        # bulk_create n'émet aucun signal, comme un loaddata d'un autre processus.
+        Pays.objects.bulk_create([Pays(nom="Italie", indicatif="+39")])
+        self.assertEqual(self._noms(), ["Suisse"])
+        with mock.patch("eleves.cache_pays.mtime_fixture", return_value=1.0):
+            self.assertEqual(self._noms(), ["Italie", "Suisse"])
+
+    def test_validation_suit_la_meme_entree_que_la_liste(self):
+        self.assertTrue(pays_existe(self.suisse.id))
+        italie = Pays.objects.bulk_create([Pays(nom="Italie", indicatif="+39")])[0]
+        self.assertFalse(pays_existe(italie.id))
+        with mock.patch("eleves.cache_pays.mtime_fixture", return_value=1.0):
+            self.assertTrue(pays_existe(italie.id))
+            self.assertEqual(self._noms(), ["Italie", "Suisse"])
+
+    def test_validation_invalidee_par_les_signaux(self):
+        pays_id = self.suisse.id
+        self.assertTrue(pays_existe(pays_id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.suisse.delete()
+        self.assertFalse(pays_existe(pays_id))
+        self.assertEqual(self._noms(), [])
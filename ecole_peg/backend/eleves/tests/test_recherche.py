@@ -0,0 +1,26 @@
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+from ..models import Eleve
+
+
+class RechercheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        pays = creer_pays()
+        cls.helene = creer_eleve(pays)
+        cls.joel = creer_eleve(pays, nom="Müller", prenom="Joël", email="joel@exemple.ch")
+
+    def test_prefixes_sans_accents(self):
+        self.assertEqual(list(Eleve.objects.rechercher("HEL dup")), [self.helene])
+        self.assertEqual(list(Eleve.objects.rechercher("mul")), [self.joel])
+
+    def test_texte_sans_jeton_ne_trouve_rien(self):
+        for texte in ("", "   ", "-- !"):
+            with self.subTest(texte=texte):
+                self.assertFalse(Eleve.objects.rechercher(texte).exists())
+
+    def test_index_mis_a_jour_a_la_modification(self):
+        self.joel.nom = "Favre"
+        self.joel.save()
+        self.assertFalse(Eleve.objects.rechercher("muller").exists())
+        self.assertEqual(list(Eleve.objects.rechercher("favre")), [self.joel])
@@ -0,0 +1,89 @@
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin, creer_eleve
+from cours.fiches import generer_fiches
+from cours.models import StatutPresenceChoices
+from ..importation import importer_eleves
+from ..models import CompteurTableauBord, InstantaneTableauBord, Pays
+from ..tableau_bord import (
+    CALCULS_SECTIONS,
+    SECTION_COURS,
+    SECTION_ELEVES,
+    aobtenir_tableau_bord,
+    invalider_sections,
+    recompter_compteurs,
+)
+
+
+class TableauBordTests(TransactionTestCase):
+    # TransactionTestCase : les on_commit doivent s'exécuter, et les sections
+    # sont calculées dans d'autres threads.
+    def setUp(self):
+        self.pays = Pays.objects.create(nom="Suisse", indicatif="+41")
+        # Compteurs créés d'avance : SQLite verrouille la table si deux threads
+        # de calcul les initialisent en même temps.
+        recompter_compteurs()
+
+    async def test_invalidation_pendant_le_calcul_non_perdue(self):
+        await aobtenir_tableau_bord()
+        calculer = CALCULS_SECTIONS[SECTION_COURS]
+
+        def calculer_puis_invalider(today):
+            donnees = calculer(today)
+            invalider_sections([SECTION_COURS])
+            return donnees
+
+        with mock.patch.dict(CALCULS_SECTIONS, {SECTION_COURS: calculer_puis_invalider}):
+            await aobtenir_tableau_bord(rafraichir=True)
+        instantane = await InstantaneTableauBord.objects.aget(section=SECTION_COURS)
+        self.assertTrue(instantane.perime)
+
+    async def test_section_recalculee_apres_modification(self):
+        self.assertEqual((await aobtenir_tableau_bord())["eleves"]["total_eleves"], 0)
+        eleve = await sync_to_async(creer_eleve)(self.pays)
+        self.assertEqual((await aobtenir_tableau_bord())["eleves"]["total_eleves"], 1)
+        await eleve.adelete()
+        self.assertEqual((await aobtenir_tableau_bord())["eleves"]["total_eleves"], 0)
+
+    def test_compteur_ajuste_par_l_import(self):
+        creer_eleve(self.pays)
+        self.assertEqual(CompteurTableauBord.objects.get(modele="eleves.Eleve").valeur, 1)
+        importer_eleves(
+            [
+                {
+                    "nom": "Rossi",
+                    "prenom": "Marco",
+                    "date_naissance": "1995-02-03",
+                    "lieu_naissance": "Lugano",
+                    "sexe": "H",
+                    "telephone": "+41 79 000 00 00",
+                    "email": "marco@exemple.ch",
+                    "type_permis": "P",
+                    "pays": "Suisse",
+                }
+            ]
+        )
+        self.assertEqual(CompteurTableauBord.objects.get(modele="eleves.Eleve").valeur, 2)
+
+
+class InvalidationPresencesTests(DonneesSessionMixin, TestCase):
+    def test_saisie_des_presences_perime_la_section(self):
+        fiche, _ = generer_fiches([self.session], 2026, 1)[self.session.id]
+        instantane = InstantaneTableauBord.objects.create(
+            section=SECTION_ELEVES, donnees={}, date_calcul=timezone.now()
+        )
+        presence = fiche.presences.first()
+
+        self.client.cookies["access_token"] = generer_token()
+        with self.captureOnCommitCallbacks(execute=True):
+            reponse = self.client.put(
+                f"/api/cours/fiche_presences/{fiche.id}/",
+                [{"id": presence.id, "statut": StatutPresenceChoices.PRESENT}],
+                content_type="application/json",
+            )
+        self.assertEqual(reponse.status_code, 200)
+        instantane.refresh_from_db()
+        self.assertTrue(instantane.perime)
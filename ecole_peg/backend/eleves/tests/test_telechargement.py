@@ -0,0 +1,141 @@
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils.http import http_date
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.fabriques_test import creer_eleve, creer_pays
+from ..documents import stocker, valider_televersement
+from ..models import Document
+
+CONTENU = b"%PDF-1.4\n" + bytes(range(91))
+
+
+class TelechargementDocumentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = creer_eleve(creer_pays())
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = self.settings(MEDIA_ROOT=dossier.name, MEDIA_ACCEL_PREFIXE="")
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        derives = mock.patch("eleves.miniatures.generer_derives")
+        derives.start()
+        self.addCleanup(derives.stop)
+
+        fichier = SimpleUploadedFile("contrat.pdf", CONTENU)
+        empreinte, extension = valider_televersement(fichier)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document = Document.objects.create(
+                eleve=self.eleve,
+                nom="Contrat",
+                empreinte=empreinte,
+                fichier=stocker(fichier, empreinte, extension),
+            )
+        self.etag = f'"{empreinte}-original"'
+        self.url = (
+            f"/api/eleves/eleves/{self.eleve.id}/documents/{self.document.id}/fichier/"
+        )
+        self.client.cookies["access_token"] = generer_token()
+
+    def _get(self, **entetes):
+        return self.client.get(self.url, headers=entetes)
+
+    def _corps(self, reponse):
+        return b"".join(reponse.streaming_content)
+
+    def test_fichier_entier(self):
+        reponse = self._get()
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self._corps(reponse), CONTENU)
+        self.assertEqual(reponse["ETag"], self.etag)
+        self.assertEqual(reponse["Accept-Ranges"], "bytes")
+        self.assertEqual(reponse["Content-Type"], "application/pdf")
+        self.assertIn('filename="Contrat.pdf"', reponse["Content-Disposition"])
+
+    def test_plages(self):
+        taille = len(CONTENU)
+        for plage, debut, fin in (
+            ("bytes=0-9", 0, 9),
+            ("bytes=90-", 90, taille - 1),
+            ("bytes=-5", taille - 5, taille - 1),
+            ("bytes=95-1000", 95, taille - 1),
+        ):
+            with self.subTest(plage=plage):
+                reponse = self._get(Range=plage)
+                self.assertEqual(reponse.status_code, 206)
+                self.assertEqual(
+                    reponse["Content-Range"], f"bytes {debut}-{fin}/{taille}"
+                )
+                self.assertEqual(reponse["Content-Length"], str(fin - debut + 1))
+                self.assertEqual(self._corps(reponse), CONTENU[debut : fin + 1])
+
+    async def test_plage_diffusee_en_asynchrone(self):
+        self.async_client.cookies["access_token"] = generer_token()
+        reponse = await self.async_client.get(self.url, headers={"Range": "bytes=10-19"})
+        self.assertEqual(reponse.status_code, 206)
+        self.assertTrue(reponse.is_async)
+        corps = b"".join([m async for m in reponse.streaming_content])
+        self.assertEqual(corps, CONTENU[10:20])
+
+    def test_plage_hors_du_fichier(self):
+        for plage in ("bytes=100-", "bytes=20-10", "bytes=-0"):
+            with self.subTest(plage=plage):
+                reponse = self._get(Range=plage)
+                self.assertEqual(reponse.status_code, 416)
+                self.assertEqual(reponse["Content-Range"], f"bytes */{len(CONTENU)}")
+
+    def test_plage_ignoree_si_non_reconnue(self):
+        reponse = self._get(Range="bytes=0-1,5-6")
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self._corps(reponse), CONTENU)
+
+    def test_if_range(self):
+        reponse = self._get(Range="bytes=0-9", **{"If-Range": self.etag})
+        self.assertEqual(reponse.status_code, 206)
+
+        # Version périmée côté client : fichier entier.
+        reponse = self._get(Range="bytes=0-9", **{"If-Range": '"ancien-original"'})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self._corps(reponse), CONTENU)
+
+        reponse = self._get(Range="bytes=0-9", **{"If-Range": http_date(0)})
+        self.assertEqual(reponse.status_code, 200)
+
+    def test_requetes_conditionnelles(self):
+        reponse = self._get(**{"If-None-Match": self.etag})
+        self.assertEqual(reponse.status_code, 304)
+        self.assertEqual(reponse["ETag"], self.etag)
+
+        derniere_modification = self._get()["Last-Modified"]
+        reponse = self._get(**{"If-Modified-Since": derniere_modification})
+        self.assertEqual(reponse.status_code, 304)
+
+        reponse = self._get(**{"If-None-Match": '"autre"'})
+        self.assertEqual(reponse.status_code, 200)
+
+    def test_transfert_confie_au_serveur_frontal(self):
+        with self.settings(MEDIA_ACCEL_PREFIXE="/protege/"):
+            reponse = self._get()
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(
+            reponse["X-Accel-Redirect"], f"/protege/{self.document.fichier.name}"
+        )
+        self.assertEqual(reponse.content, b"")
+
+    def test_variantes(self):
+        self.assertEqual(
+            self.client.get(self.url, {"variante": "vignette"}).status_code, 400
+        )
+        # Miniature pas encore générée.
+        self.assertEqual(
+            self.client.get(self.url, {"variante": "miniature"}).status_code, 404
+        )
+
+    def test_document_d_un_autre_eleve(self):
+        autre = creer_eleve(self.eleve.pays, email="autre@exemple.ch")
+        url = f"/api/eleves/eleves/{autre.id}/documents/{self.document.id}/fichier/"
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,11 +1,18 @@
+import csv
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
 from django.shortcuts import get_object_or_404
 from django.db import transaction, models
 from django.core.exceptions import ValidationError
-from ninja import Router
-from .models import Facture, DetailFacture, Paiement
-from cours.models import Inscription, CoursPrive
+from ninja import Router, File, Query
+from ninja.errors import HttpError
+from ninja.files import UploadedFile
+from .models import Facture, DetailFacture, MethodePaiementChoices, Paiement
+from cours.models import Inscription, CoursPrive, Session
 from eleves.models import Eleve
 from .schemas import (
+    FacturationSessionIn,
     FactureIn,
     FacturesOut,
     FactureOut,
@@ -14,6 +21,18 @@ from .schemas import (
     DetailFactureOut,
 )
 from django.core.paginator import Paginator
+from typing import List, Optional
+from backend_ecole_peg.pagination import (
+    apaginer_par_curseur,
+    apaginer_par_page,
+    paginer_par_curseur,
+    verifier_taille,
+)
+from backend_ecole_peg.export import iterer_par_lots, reponse_export
+from django.db.models.functions import Coalesce
+from . import pdf
+from .facturation import facturer_session
+from .rapprochement import lire_releve, methode_paiement, rapprocher_releve
 
 router = Router()
 
@@ -21,40 +40,61 @@ router = Router()
 # ------------------- FACTURES -------------------
 
 
+def _facture_out(f):
+    return FactureOut(
+        id=f.id,
+        date_emission=f.date_emission,
+        montant_total=float(f.montant_total),
+        montant_restant=float(f.montant_restant),
+        eleve_nom=f.eleve.nom if f.eleve else f.inscription.eleve.nom,
+        eleve_prenom=f.eleve.prenom if f.eleve else f.inscription.eleve.prenom,
+    )
+
+
+def _factures_out(qs):
+    return [
+        FacturesOut(
+            id=f.id,
+            date_emission=f.date_emission,
+            montant_total=float(f.montant_total),
+            montant_restant=float(f.montant_restant),
+        )
+        for f in qs
+    ]
+
+
 @router.get("/factures/", response=dict)
-def factures(
+async def factures(
     request,
     page: int = 1,
     taille: int = 10,
+    curseur: Optional[str] = None,
 ):
     """
-    Liste toutes les factures, paginées.
+    Liste toutes les factures, paginées (par page ou par curseur).
     """
-    qs = Facture.objects.select_related("eleve", "inscription__eleve").prefetch_related(
-        "details", "paiements"
-    )
+    qs = Facture.objects.select_related("eleve", "inscription__eleve")
 
-    paginator = Paginator(qs, taille)
-    page_obj = paginator.get_page(page)
+    if curseur is not None:
+        objets, suivant, precedent = await apaginer_par_curseur(
+            qs, ["date_emission", "id"], curseur, taille
+        )
+        return {
+            "factures": [_facture_out(f) for f in objets],
+            "curseur_suivant": suivant,
+            "curseur_precedent": precedent,
+        }
+
+    objets, total = await apaginer_par_page(qs, page, taille)
 
     return {
-        "factures": [
-            FactureOut(
-                id=f.id,
-                date_emission=f.date_emission,
-                montant_total=float(f.montant_total),
-                montant_restant=float(f.montant_restant),
-                eleve_nom=f.eleve.nom if f.eleve else f.inscription.eleve.nom,
-                eleve_prenom=f.eleve.prenom if f.eleve else f.inscription.eleve.prenom,
-            )
-            for f in page_obj.object_list
-        ],
-        "nombre_total": paginator.count,
+        "factures": [_facture_out(f) for f in objets],
+        "nombre_total": total,
     }
 
 
 @router.get("/factures/payees/", response=dict)
-def get_factures_payees(
+async def get_factures_payees(
     request,
     page: int = 1,
     taille: int = 10,
@@ -62,14 +102,11 @@ def get_factures_payees(
     """
     Liste les factures entièrement payées (montant_restant = 0).
     """
-    qs = Facture.objects.select_related("eleve", "inscription__eleve").prefetch_related(
-        "details", "paiements"
+    qs = Facture.objects.filter(montant_restant=0).select_related(
+        "eleve", "inscription__eleve"
     )
 
-    factures_soldees = [f for f in qs if f.montant_restant == 0]
-
-    paginator = Paginator(factures_soldees, taille)
-    page_obj = paginator.get_page(page)
+    objets, total = await apaginer_par_page(qs, page, taille)
 
     result = [
         FactureOut(
@@ -80,14 +117,14 @@ def get_factures_payees(
             eleve_nom=f.eleve.nom if f.eleve else f.inscription.eleve.nom,
             eleve_prenom=f.eleve.prenom if f.eleve else f.inscription.eleve.prenom,
         )
-        for f in page_obj.object_list
+        for f in objets
     ]
 
-    return {"factures": result, "nombre_total": paginator.count}
+    return {"factures": result, "nombre_total": total}
 
 
 @router.get("/factures/impayees/", response=dict)
-def get_factures_impayees(
+async def get_factures_impayees(
     request,
     page: int = 1,
     taille: int = 10,
@@ -95,14 +132,11 @@ def get_factures_impayees(
     """
     Liste les factures partiellement ou totalement impayées (montant_restant > 0).
     """
-    qs = Facture.objects.select_related("eleve", "inscription__eleve").prefetch_related(
-        "details", "paiements"
+    qs = Facture.objects.filter(montant_restant__gt=0).select_related(
+        "eleve", "inscription__eleve"
     )
 
-    factures_impayees = [f for f in qs if f.montant_restant > 0]
-
-    paginator = Paginator(factures_impayees, taille)
-    page_obj = paginator.get_page(page)
+    objets, total = await apaginer_par_page(qs, page, taille)
 
     result = [
         FactureOut(
@@ -113,10 +147,10 @@ def get_factures_impayees(
             eleve_nom=f.eleve.nom if f.eleve else f.inscription.eleve.nom,
             eleve_prenom=f.eleve.prenom if f.eleve else f.inscription.eleve.prenom,
         )
-        for f in page_obj.object_list
+        for f in objets
     ]
 
-    return {"factures": result, "nombre_total": paginator.count}
+    return {"factures": result, "nombre_total": total}
 
 
 @router.get("/factures/eleve/{eleve_id}/", response=dict)
@@ -125,24 +159,29 @@ def factures_eleve(
     eleve_id: int,
     page: int = 1,
     taille: int = 10,
+    curseur: Optional[str] = None,
 ):
     _ = get_object_or_404(Eleve, id=eleve_id)
     qs = Facture.objects.filter(
         models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id)
-    ).select_related("eleve", "inscription__eleve")
+    )
+
+    if curseur is not None:
+        objets, suivant, precedent = paginer_par_curseur(
+            qs, ["date_emission", "id"], curseur, taille
+        )
+        return {
+            "factures": _factures_out(objets),
+            "curseur_suivant": suivant,
+            "curseur_precedent": precedent,
+        }
+
+    verifier_taille(taille)
     paginator = Paginator(qs, taille)
     page_obj = paginator.get_page(page)
 
     return {
-        "factures": [
-            FacturesOut(
-                id=f.id,
-                date_emission=f.date_emission,
-                montant_total=f.montant_total,
-                montant_restant=f.montant_restant,
-            )
-            for f in page_obj.object_list
-        ],
+        "factures": _factures_out(page_obj.object_list),
         "nombre_total": paginator.count,
     }
 
@@ -154,17 +193,13 @@ def factures_eleve_payees(
     page: int = 1,
     taille: int = 10,
 ):
-    qs = (
-        Facture.objects.filter(
-            models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id)
-        )
-        .select_related("eleve", "inscription__eleve")
-        .prefetch_related("details", "paiements")
+    qs = Facture.objects.filter(
+        models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id),
+        montant_restant=0,
     )
 
-    factures_payees = [f for f in qs if f.montant_restant == 0]
-
-    paginator = Paginator(factures_payees, taille)
+    verifier_taille(taille)
+    paginator = Paginator(qs, taille)
     page_obj = paginator.get_page(page)
 
     return {
@@ -188,17 +223,13 @@ def factures_eleve_impayees(
     page: int = 1,
     taille: int = 10,
 ):
-    qs = (
-        Facture.objects.filter(
-            models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id)
-        )
-        .select_related("eleve", "inscription__eleve")
-        .prefetch_related("details", "paiements")
+    qs = Facture.objects.filter(
+        models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id),
+        montant_restant__gt=0,
     )
 
-    factures_impayees = [f for f in qs if f.montant_restant > 0]
-
-    paginator = Paginator(factures_impayees, taille)
+    verifier_taille(taille)
+    paginator = Paginator(qs, taille)
     page_obj = paginator.get_page(page)
 
     return {
@@ -215,14 +246,113 @@ def factures_eleve_impayees(
     }
 
 
-@router.get("/facture/{facture_id}/", response=FactureOut)
-def get_facture(request, facture_id: int):
-    facture = get_object_or_404(
-        Facture.objects.select_related("eleve", "inscription__eleve").prefetch_related(
-            "details", "paiements"
+def _filtrer_factures(qs, statut=None, eleve_id=None):
+    if statut == "payees":
+        qs = qs.filter(montant_restant=0)
+    elif statut == "impayees":
+        qs = qs.filter(montant_restant__gt=0)
+    if eleve_id is not None:
+        qs = qs.filter(
+            models.Q(eleve_id=eleve_id) | models.Q(inscription__eleve_id=eleve_id)
+        )
+    return qs
+
+
+@router.get("/factures/export/")
+def exporter_factures(
+    request,
+    format: str = "csv",
+    statut: Optional[str] = None,
+    eleve_id: Optional[int] = None,
+):
+    """
+    Export CSV/XLSX en flux du registre des factures. `statut` : "payees" ou
+    "impayees" ; `eleve_id` restreint aux factures d'un élève.
+    """
+    qs = _filtrer_factures(
+        Facture.objects.annotate(
+            nom_eleve=Coalesce("eleve__nom", "inscription__eleve__nom"),
+            prenom_eleve=Coalesce("eleve__prenom", "inscription__eleve__prenom"),
         ),
-        id=facture_id,
+        statut,
+        eleve_id,
+    )
+
+    champs = [
+        "id", "date_emission", "nom_eleve", "prenom_eleve",
+        "montant_total", "montant_paye", "montant_restant",
+    ]
+    entetes = [
+        "ID", "Date d'émission", "Nom", "Prénom",
+        "Montant total", "Montant payé", "Montant restant",
+    ]
+    return reponse_export(
+        format,
+        "factures",
+        entetes,
+        iterer_par_lots(qs, champs),
+        asynchrone=isinstance(request, ASGIRequest),
+    )
+
+
+def _verifier_rendu_pdf():
+    if pdf.rendu_pdf is None:
+        raise HttpError(501, "Rendu PDF indisponible : reportlab n'est pas installé.")
+
+
+@router.get("/factures/pdf/")
+def telecharger_factures_pdf(
+    request,
+    statut: Optional[str] = None,
+    eleve_id: Optional[int] = None,
+    session_id: Optional[int] = None,
+    ids: Optional[List[int]] = Query(None),
+):
+    """
+    Archive ZIP des factures en PDF, rendues en parallèle par un pool de
+    processus et envoyées au fil de l'eau. Filtres : `statut` ("payees" ou
+    "impayees"), `eleve_id`, `session_id`, `ids` (répétable).
+    """
+    _verifier_rendu_pdf()
+    qs = _filtrer_factures(Facture.objects.all(), statut, eleve_id)
+    if session_id is not None:
+        qs = qs.filter(inscription__session_id=session_id)
+    if ids:
+        qs = qs.filter(id__in=ids)
+    if not qs.exists():
+        raise Http404("Aucune facture ne correspond aux filtres.")
+
+    factures = pdf.donnees_factures(qs)
+    if isinstance(request, ASGIRequest):
+        morceaux = pdf.aarchive_zip(factures)
+    else:
+        morceaux = pdf.archive_zip(factures)
+    reponse = StreamingHttpResponse(morceaux, content_type="application/zip")
+    reponse["Content-Disposition"] = 'attachment; filename="factures.zip"'
+    return reponse
+
+
+@router.get("/facture/{facture_id}/pdf/")
+def telecharger_facture_pdf(request, facture_id: int):
+    _verifier_rendu_pdf()
+    facture = next(pdf.donnees_factures(Facture.objects.filter(id=facture_id)), None)
+    if facture is None:
+        raise Http404
+    reponse = HttpResponse(pdf.rendre_facture(facture), content_type="application/pdf")
+    reponse["Content-Disposition"] = content_disposition_header(
+        False, pdf.nom_fichier(facture)
     )
+    return reponse
+
+
+@router.get("/facture/{facture_id}/", response=FactureOut)
+async def get_facture(request, facture_id: int):
+    try:
+        facture = await Facture.objects.select_related(
+            "eleve", "inscription__eleve"
+        ).aget(id=facture_id)
+    except Facture.DoesNotExist:
+        raise Http404
     return FactureOut(
         id=facture.id,
         date_emission=facture.date_emission,
@@ -284,6 +414,8 @@ def create_facture(request, payload: FactureIn):
 
             details = [DetailFacture(facture=facture, **d) for d in details_data]
             DetailFacture.objects.bulk_create(details)
+            # bulk_create n'émet pas post_save : montants recalculés explicitement.
+            facture.recalculer_montants()
 
             return 201, facture.id
 
@@ -291,6 +423,23 @@ def create_facture(request, payload: FactureIn):
         return 400, {"message": "Erreurs de validation.", "erreurs": e.message_dict}
 
 
+@router.post("/session/{id_session}/facturer/", response={200: dict, 400: dict})
+def facturer_inscriptions_session(request, id_session: int, payload: FacturationSessionIn):
+    """
+    Facture en une fois toutes les inscriptions actives (hors préinscription)
+    de la session pour la période donnée (par défaut celle de la session).
+    Les inscriptions déjà facturées pour cette période sont ignorées.
+    """
+    try:
+        return 200, facturer_session(
+            id_session, payload.date_debut_periode, payload.date_fin_periode
+        )
+    except Session.DoesNotExist:
+        raise Http404("Cette session n'existe pas.")
+    except ValidationError as e:
+        return 400, {"message": "Erreurs de validation.", "erreurs": e.message_dict}
+
+
 @router.delete("/facture/{facture_id}/", response={204: None, 404: dict})
 def delete_facture(request, facture_id: int):
     facture = get_object_or_404(Facture, id=facture_id)
@@ -318,6 +467,28 @@ def create_paiement(request, payload: PaiementIn):
         return 400, {"message": "Erreurs de validation.", "erreurs": e.message_dict}
 
 
+@router.post("/paiements/rapprochement/", response={200: dict, 400: dict})
+def rapprocher_releve_paiements(
+    request,
+    fichier: UploadedFile = File(...),
+    methode: str = MethodePaiementChoices.VIREMENT,
+    simuler: bool = False,
+):
+    """
+    Rapproche un relevé CSV (banque, Twint) des factures ouvertes et crée
+    les paiements rapprochés en une fois. Retourne les lignes rapprochées,
+    ambiguës et non rapprochées ; `simuler` n'enregistre rien.
+    """
+    code_methode = methode_paiement(methode)
+    if code_methode is None:
+        return 400, {"message": "Méthode de paiement inconnue.", "erreurs": {"methode": [methode]}}
+    try:
+        lignes = lire_releve(fichier.read())
+    except (ValueError, csv.Error) as e:
+        return 400, {"message": "Relevé illisible.", "erreurs": {"fichier": [str(e)]}}
+    return 200, rapprocher_releve(lignes, methode=code_methode, simuler=simuler)
+
+
 @router.get("/paiement/{paiement_id}/", response=PaiementOut)
 def get_paiement(request, paiement_id: int):
     paiement = get_object_or_404(
@@ -347,9 +518,10 @@ def paiements_eleve(
     eleve_id: int,
     page: int = 1,
     taille: int = 10,
+    curseur: Optional[str] = None,
 ):
     """
-    Liste paginée des paiements pour un élève donné.
+    Liste paginée (par page ou par curseur) des paiements pour un élève donné.
     """
     _ = get_object_or_404(Eleve, id=eleve_id)
     qs = (
@@ -358,8 +530,20 @@ def paiements_eleve(
             | models.Q(facture__inscription__eleve_id=eleve_id)
         )
         .distinct()
-        .order_by("-date_paiement")
+        .order_by("-date_paiement", "-id")
     )
+
+    if curseur is not None:
+        objets, suivant, precedent = paginer_par_curseur(
+            qs, ["-date_paiement", "-id"], curseur, taille
+        )
+        return {
+            "paiements": [PaiementOut.from_orm(p) for p in objets],
+            "curseur_suivant": suivant,
+            "curseur_precedent": precedent,
+        }
+
+    verifier_taille(taille)
     paginator = Paginator(qs, taille)
     page_obj = paginator.get_page(page)
     return {
@@ -368,6 +552,37 @@ def paiements_eleve(
     }
 
 
+@router.get("/paiements/export/")
+def exporter_paiements(
+    request,
+    format: str = "csv",
+    eleve_id: Optional[int] = None,
+):
+    """Export CSV/XLSX en flux du registre des paiements, éventuellement d'un élève."""
+    qs = Paiement.objects.all()
+    if eleve_id is not None:
+        qs = qs.filter(
+            models.Q(facture__eleve_id=eleve_id)
+            | models.Q(facture__inscription__eleve_id=eleve_id)
+        )
+
+    champs = [
+        "id", "date_paiement", "facture_id", "montant",
+        "mode_paiement", "methode_paiement",
+    ]
+    entetes = [
+        "ID", "Date de paiement", "Facture", "Montant",
+        "Mode de paiement", "Méthode de paiement",
+    ]
+    return reponse_export(
+        format,
+        "paiements",
+        entetes,
+        iterer_par_lots(qs, champs),
+        asynchrone=isinstance(request, ASGIRequest),
+    )
+
+
 @router.get("/factures/{facture_id}/paiements/total/")
 def get_total_paiements_facture(request, facture_id: int):
     paiements = Paiement.objects.filter(facture_id=facture_id)
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from cours.models import Inscription, Session, StatutInscriptionChoices
+from eleves.tableau_bord import SECTIONS_PAR_MODELE, invalider_sections
+from .models import DetailFacture, Facture
+
+DESCRIPTION_FRAIS_INSCRIPTION = "Frais d'inscription"
+
+
+def facturer_session(session_id, date_debut_periode=None, date_fin_periode=None):
+    """
+    Crée une facture par inscription active (hors préinscription) de la
+    session pour la période donnée (par défaut, celle de la session) : une
+    ligne pour le tarif du cours et, sur la première facture de l'inscription,
+    une ligne pour ses frais d'inscription. Une transaction, deux bulk_create
+    (les factures une à une si la base ne renvoie pas les ids d'un INSERT multiple).
+
+    Idempotent : une inscription ayant déjà une ligne sur la même période est
+    ignorée. Retourne un résumé de l'opération.
+    """
+    with transaction.atomic():
+        # Verrou sur la session : deux facturations simultanées ne peuvent pas
+        # facturer deux fois la même période.
+        session = (
+            Session.objects.select_for_update()
+            .select_related("cours")
+            .get(pk=session_id)
+        )
+        debut = date_debut_periode or session.date_debut
+        fin = date_fin_periode or session.date_fin
+        if debut > fin:
+            raise ValidationError(
+                {"date_fin_periode": ["La date de début doit être antérieure à la date de fin."]}
+            )
+
+        inscriptions = list(
+            Inscription.objects.filter(
+                session=session,
+                statut=StatutInscriptionChoices.ACTIF,
+                preinscription=False,
+            )
+            .order_by("id")
+            .values_list("id", "frais_inscription")
+        )
+        ids_inscriptions = [id_inscription for id_inscription, _ in inscriptions]
+
+        deja_facturees = set(
+            DetailFacture.objects.filter(
+                facture__inscription_id__in=ids_inscriptions,
+                date_debut_periode=debut,
+                date_fin_periode=fin,
+            ).values_list("facture__inscription_id", flat=True)
+        )
+        avec_facture = set(
+            Facture.objects.filter(inscription_id__in=ids_inscriptions).values_list(
+                "inscription_id", flat=True
+            )
+        )
+
+        tarif = session.cours.tarif
+        description_cours = f"Cours {session.cours.nom}"[:100]
+        lignes = {}
+        sans_montant = 0
+        for id_inscription, frais_inscription in inscriptions:
+            if id_inscription in deja_facturees:
+                continue
+            details = []
+            if tarif > 0:
+                details.append(
+                    DetailFacture(
+                        description=description_cours,
+                        date_debut_periode=debut,
+                        date_fin_periode=fin,
+                        montant=tarif,
+                    )
+                )
+            if frais_inscription > 0 and id_inscription not in avec_facture:
+                details.append(
+                    DetailFacture(
+                        description=DESCRIPTION_FRAIS_INSCRIPTION,
+                        montant=frais_inscription,
+                    )
+                )
+            if details:
+                lignes[id_inscription] = details
+            else:
+                sans_montant += 1
+
+        ids_factures = []
+        if lignes:
+            factures = [Facture(inscription_id=i) for i in lignes]
+            if connection.features.can_return_rows_from_bulk_insert:
+                Facture.objects.bulk_create(factures)
+            else:
+                # MySQL ne renvoie pas les ids d'un INSERT multiple, et une
+                # relecture par inscription attraperait aussi des factures
+                # créées en parallèle : un INSERT par facture, dont l'id est
+                # lu sur la connexion.
+                for facture in factures:
+                    facture.save(force_insert=True)
+            par_inscription = {f.inscription_id: f.pk for f in factures}
+
+            details = []
+            for id_inscription, details_inscription in lignes.items():
+                for detail in details_inscription:
+                    detail.facture_id = par_inscription[id_inscription]
+                    details.append(detail)
+            DetailFacture.objects.bulk_create(details)
+
+            ids_factures = sorted(par_inscription.values())
+            # bulk_create n'émet pas post_save : montants recalculés explicitement.
+            Facture.objects.filter(id__in=ids_factures).recalculer_montants()
+            invalider_sections(SECTIONS_PAR_MODELE["factures.Facture"])
+
+        montant_total = sum(
+            (d.montant for details in lignes.values() for d in details), Decimal(0)
+        )
+
+    return {
+        "session": session.id,
+        "date_debut_periode": debut,
+        "date_fin_periode": fin,
+        "factures_creees": len(ids_factures),
+        "ids_factures": ids_factures,
+        "montant_total": float(montant_total),
+        "deja_facturees": len(deja_facturees),
+        "sans_montant": sans_montant,
+    }
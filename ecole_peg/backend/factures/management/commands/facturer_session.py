@@ -0,0 +1,38 @@
+from datetime import date
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from cours.models import Session
+from factures.facturation import facturer_session
+
+
+class Command(BaseCommand):
+    help = "Facturer toutes les inscriptions actives d'une session pour une période"
+
+    def add_arguments(self, parser):
+        parser.add_argument("session_id", type=int)
+        parser.add_argument(
+            "--debut", type=date.fromisoformat, help="Début de période (AAAA-MM-JJ)"
+        )
+        parser.add_argument(
+            "--fin", type=date.fromisoformat, help="Fin de période (AAAA-MM-JJ)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            resume = facturer_session(
+                options["session_id"], options["debut"], options["fin"]
+            )
+        except Session.DoesNotExist:
+            raise CommandError(f"La session {options['session_id']} n'existe pas.")
+        except ValidationError as e:
+            raise CommandError("; ".join(e.messages))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{resume['factures_creees']} facture(s) créée(s) pour "
+                f"{resume['date_debut_periode']} – {resume['date_fin_periode']} "
+                f"({resume['montant_total']:.2f} CHF) ; "
+                f"{resume['deja_facturees']} déjà facturée(s), "
+                f"{resume['sans_montant']} sans montant."
+            )
+        )
@@ -0,0 +1,49 @@
+import csv
+import json
+from django.core.management.base import BaseCommand, CommandError
+from factures.models import MethodePaiementChoices
+from factures.rapprochement import lire_releve, rapprocher_releve
+
+
+class Command(BaseCommand):
+    help = "Rapprocher un relevé bancaire ou Twint (CSV) des factures ouvertes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("chemin")
+        parser.add_argument(
+            "--methode",
+            default=MethodePaiementChoices.VIREMENT,
+            choices=MethodePaiementChoices.values,
+        )
+        parser.add_argument("--simuler", action="store_true", help="Ne rien enregistrer")
+        parser.add_argument("--rapport", help="Écrire le rapport complet en JSON dans ce fichier")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["chemin"], "rb") as f:
+                lignes = lire_releve(f.read())
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(f"Relevé illisible : {e}")
+
+        rapport = rapprocher_releve(
+            lignes, methode=options["methode"], simuler=options["simuler"]
+        )
+
+        if options["rapport"]:
+            with open(options["rapport"], "w", encoding="utf-8") as f:
+                json.dump(rapport, f, ensure_ascii=False, indent=2)
+
+        for entree in rapport["ambigues"] + rapport["non_rapprochees"]:
+            self.stdout.write(
+                self.style.WARNING(f"Ligne {entree['ligne']} : {entree['motif']}")
+            )
+        prefixe = "[simulation] " if options["simuler"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefixe}{len(rapport['rapprochees'])} paiement(s) rapproché(s) "
+                f"({rapport['montant_rapproche']:.2f} CHF), "
+                f"{len(rapport['ambigues'])} ambigu(s), "
+                f"{len(rapport['non_rapprochees'])} non rapproché(s), "
+                f"{rapport['ignorees']} ignoré(s) sur {rapport['lignes']} ligne(s)."
+            )
+        )
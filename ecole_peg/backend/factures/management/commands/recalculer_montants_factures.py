@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from factures.models import Facture
+
+
+class Command(BaseCommand):
+    help = "Recalculer les montants stockés (total, payé, restant) de toutes les factures"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            nombre = Facture.objects.all().recalculer_montants()
+        self.stdout.write(
+            self.style.SUCCESS(f"Montants recalculés pour {nombre} facture(s).")
+        )
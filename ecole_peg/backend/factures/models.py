@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from django.db.models import Sum, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce, Greatest
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
 
@@ -22,6 +23,35 @@ class MethodePaiementChoices(models.TextChoices):
     AUTRE = "AUT", "Autre"
 
 
+class FactureQuerySet(models.QuerySet):
+    def recalculer_montants(self):
+        """Recalcule les montants stockés des factures du queryset en un seul UPDATE."""
+        total_sq = (
+            DetailFacture.objects.filter(facture=OuterRef("pk"))
+            .values("facture")
+            .annotate(t=Sum("montant"))
+            .values("t")
+        )
+        paye_sq = (
+            Paiement.objects.filter(facture=OuterRef("pk"))
+            .values("facture")
+            .annotate(p=Sum("montant"))
+            .values("p")
+        )
+        total = Coalesce(Subquery(total_sq), Value(0), output_field=DecimalField())
+        paye = Coalesce(Subquery(paye_sq), Value(0), output_field=DecimalField())
+
+        # montant_restant est recalculé depuis les sous-requêtes : l'ordre
+        # d'évaluation des affectations d'un UPDATE dépend du SGBD.
+        return self.update(
+            montant_total=total,
+            montant_paye=paye,
+            montant_restant=Greatest(
+                total - paye, Value(0), output_field=DecimalField()
+            ),
+        )
+
+
 class Facture(models.Model):
     date_emission = models.DateField(auto_now_add=True)
     inscription = models.ForeignKey(
@@ -46,32 +76,33 @@ class Facture(models.Model):
         related_name="factures",
     )
 
-    _cached_montant_total = None
-    _cached_montant_restant = None
+    # Montants dénormalisés, maintenus par factures.signals à chaque écriture
+    # de DetailFacture / Paiement (voir FactureQuerySet.recalculer_montants).
+    montant_total = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+    montant_paye = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+    montant_restant = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+
+    objects = FactureQuerySet.as_manager()
 
     class Meta:
         ordering = ["date_emission"]
-
-    @property
-    def montant_total(self):
-        if self._cached_montant_total is None:
-            self._cached_montant_total = (
-                self.details.aggregate(total=Sum("montant"))["total"] or 0
-            )
-        return self._cached_montant_total
-
-    @property
-    def montant_restant(self):
-        if self._cached_montant_restant is None:
-            total_paiements = (
-                self.paiements.aggregate(total=Sum("montant"))["total"] or 0
-            )
-            self._cached_montant_restant = max(self.montant_total - total_paiements, 0)
-        return self._cached_montant_restant
-
-    def reset_cache(self):
-        self._cached_montant_total = None
-        self._cached_montant_restant = None
+        indexes = [
+            models.Index(fields=["montant_restant", "date_emission"]),
+            models.Index(fields=["date_emission", "id"]),
+        ]
+
+    def recalculer_montants(self):
+        """Recalcule les montants stockés et les recharge sur l'instance."""
+        Facture.objects.filter(pk=self.pk).recalculer_montants()
+        self.refresh_from_db(
+            fields=["montant_total", "montant_paye", "montant_restant"]
+        )
 
     def clean(self):
         """Validation pour s'assurer que les relations inscription, cours_prive et eleve respectent les contraintes."""
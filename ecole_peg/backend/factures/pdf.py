@@ -0,0 +1,203 @@
+"""
+Factures PDF : données lues par lots, rendu réparti sur un pool de processus
+(factures.rendu_pdf) et archive ZIP produite au fil de l'eau.
+
+Seules quelques factures sont en cours de rendu à la fois et chaque PDF est
+envoyé dès qu'il est ajouté à l'archive : la mémoire reste bornée quel que
+soit le nombre de factures.
+"""
+import threading
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import get_context
+from django.conf import settings
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+from backend_ecole_peg.export import aiterer
+from .models import DetailFacture
+
+try:
+    from . import rendu_pdf
+except ImportError:  # dépendance optionnelle
+    rendu_pdf = None
+
+TAILLE_LOT_PDF = 200
+
+_verrou = threading.Lock()
+_pool = None
+
+
+def _configuration():
+    return tuple(settings.FACTURES_PDF_EMETTEUR), tuple(settings.FACTURES_PDF_PIED)
+
+
+def _annoter(qs):
+    return qs.annotate(
+        nom_eleve=Coalesce("eleve__nom", "inscription__eleve__nom"),
+        prenom_eleve=Coalesce("eleve__prenom", "inscription__eleve__prenom"),
+        rue_eleve=Coalesce("eleve__rue", "inscription__eleve__rue"),
+        numero_eleve=Coalesce("eleve__numero", "inscription__eleve__numero"),
+        npa_eleve=Coalesce("eleve__npa", "inscription__eleve__npa"),
+        localite_eleve=Coalesce("eleve__localite", "inscription__eleve__localite"),
+    )
+
+
+CHAMPS = (
+    "id", "date_emission", "montant_total", "montant_paye", "montant_restant",
+    "nom_eleve", "prenom_eleve", "rue_eleve", "numero_eleve", "npa_eleve",
+    "localite_eleve", "inscription__session__cours__nom", "cours_prive__date_cours_prive",
+)
+
+
+def _facture(ligne, details):
+    rue = " ".join(filter(None, (ligne["rue_eleve"], ligne["numero_eleve"])))
+    localite = " ".join(filter(None, (ligne["npa_eleve"], ligne["localite_eleve"])))
+    if ligne["inscription__session__cours__nom"]:
+        objet = f"Cours {ligne['inscription__session__cours__nom']}"
+    elif ligne["cours_prive__date_cours_prive"]:
+        objet = f"Cours privé du {ligne['cours_prive__date_cours_prive']:%d.%m.%Y}"
+    else:
+        objet = ""
+    return {
+        "id": ligne["id"],
+        "date_emission": ligne["date_emission"],
+        "nom": ligne["nom_eleve"] or "",
+        "prenom": ligne["prenom_eleve"] or "",
+        "destinataire": [
+            f"{ligne['prenom_eleve'] or ''} {ligne['nom_eleve'] or ''}".strip(),
+            rue,
+            localite,
+        ],
+        "objet": objet,
+        "details": details,
+        "montant_total": ligne["montant_total"],
+        "montant_paye": ligne["montant_paye"],
+        "montant_restant": ligne["montant_restant"],
+    }
+
+
+def donnees_factures(qs, taille_lot=TAILLE_LOT_PDF):
+    """
+    Données de rendu (dicts sérialisables) des factures de `qs`, lues par lots
+    sur la clé primaire : deux requêtes par lot, factures puis lignes.
+    """
+    qs = _annoter(qs).order_by("pk")
+    dernier_id = 0
+    while True:
+        lot = list(qs.filter(pk__gt=dernier_id).values(*CHAMPS)[:taille_lot])
+        if not lot:
+            return
+        details = defaultdict(list)
+        for id_facture, *detail in (
+            DetailFacture.objects.filter(facture_id__in=[f["id"] for f in lot])
+            .order_by("facture_id", "id")
+            .values_list(
+                "facture_id", "description", "date_debut_periode",
+                "date_fin_periode", "montant",
+            )
+        ):
+            details[id_facture].append(tuple(detail))
+        for ligne in lot:
+            yield _facture(ligne, details[ligne["id"]])
+        dernier_id = lot[-1]["id"]
+
+
+def nom_fichier(facture):
+    eleve = slugify(f"{facture['nom']} {facture['prenom']}")
+    return f"facture-{facture['id']}" + (f"-{eleve}" if eleve else "") + ".pdf"
+
+
+def rendre_facture(facture):
+    """PDF d'une seule facture, rendu dans le processus courant."""
+    return rendu_pdf.rendre_facture(facture, *_configuration())
+
+
+def _obtenir_pool():
+    global _pool
+    with _verrou:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.FACTURES_PDF_PROCESSUS,
+                # spawn : forker un worker web (threads, connexions ouvertes) n'est
+                # pas sûr ; les processus fils n'importent que factures.rendu_pdf.
+                mp_context=get_context("spawn"),
+                initializer=rendu_pdf.charger_gabarit,
+                initargs=_configuration(),
+            )
+        return _pool
+
+
+def _abandonner_pool(pool):
+    """Un processus fils tué rend le pool inutilisable : le suivant en recrée un."""
+    global _pool
+    with _verrou:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _rendus(factures):
+    """(facture, pdf) dans l'ordre, avec au plus quelques rendus en attente."""
+    pool = _obtenir_pool()
+    emetteur, pied = _configuration()
+    rendre = partial(rendu_pdf.rendre_facture, emetteur=emetteur, pied=pied)
+    fenetre = settings.FACTURES_PDF_PROCESSUS * 4
+    en_cours = deque()
+    try:
+        for facture in factures:
+            en_cours.append((facture, pool.submit(rendre, facture)))
+            if len(en_cours) >= fenetre:
+                facture_prete, futur = en_cours.popleft()
+                yield facture_prete, futur.result()
+        while en_cours:
+            facture_prete, futur = en_cours.popleft()
+            yield facture_prete, futur.result()
+    except BrokenProcessPool:
+        _abandonner_pool(pool)
+        raise
+    finally:
+        # Client déconnecté : les rendus non commencés sont annulés.
+        for _, futur in en_cours:
+            futur.cancel()
+
+
+class _Flux:
+    """Pseudo-fichier non positionnable : zipfile y écrit, le générateur le vide."""
+
+    def __init__(self):
+        self._morceaux = []
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        contenu = b"".join(self._morceaux)
+        self._morceaux.clear()
+        return contenu
+
+
+def archive_zip(factures):
+    """Morceaux successifs d'une archive ZIP des PDF des `factures` (itérable de données)."""
+    flux = _Flux()
+    # Sans seek(), zipfile écrit la taille de chaque entrée après ses données.
+    # ZIP_STORED : les PDF sont déjà compressés.
+    with zipfile.ZipFile(flux, "w", zipfile.ZIP_STORED) as archive:
+        for facture, pdf in _rendus(factures):
+            date = facture["date_emission"]
+            info = zipfile.ZipInfo(nom_fichier(facture), (date.year, date.month, date.day, 0, 0, 0))
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, pdf)
+            yield flux.vider()
+    yield flux.vider()
+
+
+def aarchive_zip(factures):
+    """archive_zip pour ASGI, où un itérateur synchrone serait lu entièrement en mémoire."""
+    return aiterer(archive_zip(factures))
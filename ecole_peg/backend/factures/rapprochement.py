@@ -0,0 +1,284 @@
+"""
+Rapprochement d'un relevé bancaire ou Twint (CSV) avec les factures ouvertes.
+
+Les factures ouvertes sont chargées en une requête et indexées en mémoire
+par id, par montant restant et par nom d'élève ; chaque ligne du relevé est
+rapprochée sans requête. Les factures retenues sont ensuite verrouillées et
+leur solde relu avant que tous les paiements ne soient créés par bulk_create.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from eleves.recherche import jetons, normaliser
+from eleves.tableau_bord import SECTIONS_PAR_MODELE, invalider_sections
+from .models import Facture, MethodePaiementChoices, ModePaiementChoices, Paiement
+
+# En-têtes reconnus (normalisés sans accents ni casse) pour chaque colonne.
+COLONNES = {
+    "montant": ("montant", "credit", "amount", "betrag"),
+    "reference": ("reference", "communication", "message", "motif", "referenz"),
+    "nom": ("nom", "debiteur", "payeur", "expediteur", "name", "auftraggeber"),
+    "methode": ("methode", "methode paiement"),
+}
+
+# « F-123 », « Facture 123 », « fact. no 123 ». Une référence purement
+# numérique (année, montant, référence bancaire...) n'est qu'une présomption,
+# retenue si le montant ou le nom de l'élève la confirme.
+MOTIF_REFERENCE = re.compile(r"\b(?:f|fact|facture)\W*(?:n[o°]?\W*)?(\d+)\b")
+MOTIF_NUMERIQUE = re.compile(r"^\s*(\d+)\s*$")
+
+# Méthodes de paiement reconnues par code (« TWI ») ou libellé (« Twint »).
+METHODES = {
+    normaliser(texte): valeur
+    for valeur, libelle in MethodePaiementChoices.choices
+    for texte in (valeur, libelle)
+}
+
+
+def methode_paiement(texte):
+    """Code de la méthode de paiement désignée par `texte`, ou None."""
+    return METHODES.get(normaliser(texte).strip())
+
+
+def lire_releve(contenu):
+    """Lit un relevé CSV (séparateur , ou ;, UTF-8 ou Latin-1) en liste de dicts normalisés."""
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texte = contenu.decode("latin-1")
+
+    try:
+        dialecte = csv.Sniffer().sniff(texte[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecte = csv.excel
+    lecteur = csv.DictReader(io.StringIO(texte), dialect=dialecte)
+
+    correspondances = {}
+    for entete in lecteur.fieldnames or []:
+        cle = normaliser(entete).strip()
+        for colonne, alias in COLONNES.items():
+            if cle in alias and colonne not in correspondances:
+                correspondances[colonne] = entete
+    if "montant" not in correspondances:
+        raise ValueError("Colonne du montant introuvable dans le relevé.")
+
+    return [
+        {
+            colonne: (ligne.get(entete) or "").strip()
+            for colonne, entete in correspondances.items()
+        }
+        for ligne in lecteur
+    ]
+
+
+def _montant(texte):
+    """« 1'234.50 », « 1 234,50 », « CHF 90.- » -> Decimal."""
+    texte = re.sub(r"[^\d,.\-]", "", texte.replace(".-", ""))
+    if "," in texte and "." in texte:
+        # Le dernier séparateur est celui des décimales.
+        milliers = "," if texte.rfind(",") < texte.rfind(".") else "."
+        texte = texte.replace(milliers, "")
+    texte = texte.replace(",", ".")
+    return Decimal(texte).quantize(Decimal("0.01"))
+
+
+def _ids_reference(reference):
+    """(ids cités explicitement, id présumé d'une référence purement numérique ou None)."""
+    reference = normaliser(reference)
+    numerique = MOTIF_NUMERIQUE.match(reference)
+    if numerique:
+        return set(), int(numerique.group(1))
+    return {int(n) for n in MOTIF_REFERENCE.findall(reference)}, None
+
+
+class _IndexFactures:
+    """Factures ouvertes en mémoire, indexées par id, montant restant et nom d'élève."""
+
+    def __init__(self):
+        self.restant = {}
+        self.par_montant = defaultdict(set)
+        self.par_jeton = defaultdict(set)
+        self.jetons_facture = {}
+
+        for f in Facture.objects.filter(montant_restant__gt=0).values(
+            "id",
+            "montant_restant",
+            "eleve__nom",
+            "eleve__prenom",
+            "inscription__eleve__nom",
+            "inscription__eleve__prenom",
+        ):
+            nom = f["eleve__nom"] or f["inscription__eleve__nom"] or ""
+            prenom = f["eleve__prenom"] or f["inscription__eleve__prenom"] or ""
+            self.restant[f["id"]] = f["montant_restant"]
+            self.par_montant[f["montant_restant"]].add(f["id"])
+            jetons_facture = frozenset(jetons(f"{nom} {prenom}"))
+            self.jetons_facture[f["id"]] = jetons_facture
+            for jeton in jetons_facture:
+                self.par_jeton[jeton].add(f["id"])
+
+    def par_nom(self, nom):
+        """Factures dont tous les jetons du nom de l'élève figurent dans `nom`."""
+        jetons_ligne = set(jetons(nom))
+        candidates = set()
+        for jeton in jetons_ligne:
+            candidates |= self.par_jeton.get(jeton, set())
+        return {i for i in candidates if self.jetons_facture[i] <= jetons_ligne}
+
+    def payables(self, ids, montant):
+        return {i for i in ids if self.restant.get(i, 0) >= montant}
+
+
+def _rapprocher_ligne(index, montant, reference, nom):
+    """Retourne (id de facture, None) ou (None, (motif, factures candidates))."""
+    explicites, presume = _ids_reference(reference)
+    par_reference = {i for i in explicites if i in index.restant}
+    if presume in index.restant and (
+        index.restant[presume] == montant or presume in index.par_nom(nom)
+    ):
+        par_reference = {presume}
+    if par_reference:
+        payables = index.payables(par_reference, montant)
+        if len(payables) == 1:
+            return payables.pop(), None
+        if not payables:
+            return None, ("Montant supérieur au solde de la facture.", sorted(par_reference))
+        return None, ("Plusieurs factures citées en référence.", sorted(payables))
+
+    par_nom = index.payables(index.par_nom(nom), montant) if nom else set()
+    exactes = par_nom & index.par_montant.get(montant, set())
+    if len(exactes) == 1:
+        return exactes.pop(), None
+    if len(exactes) > 1:
+        return None, ("Plusieurs factures du même élève pour ce montant.", sorted(exactes))
+    if len(par_nom) == 1:
+        return par_nom.pop(), None
+    if len(par_nom) > 1:
+        return None, ("Plusieurs factures ouvertes pour cet élève.", sorted(par_nom))
+
+    par_montant = index.payables(index.par_montant.get(montant, set()), montant)
+    if par_montant:
+        return None, ("Montant seul : élève non identifié.", sorted(par_montant))
+    return None, ("Aucune facture ouverte correspondante.", [])
+
+
+def _verifier_soldes(rapprochements):
+    """
+    Verrouille les factures rapprochées (SELECT ... FOR UPDATE) et relit leur
+    solde : un paiement enregistré entre-temps a pu le réduire depuis le
+    chargement de l'index. Retourne (rapprochements retenus, refusés).
+    """
+    restant = dict(
+        Facture.objects.select_for_update()
+        .filter(id__in={p.facture_id for p, _ in rapprochements})
+        .order_by("id")
+        .values_list("id", "montant_restant")
+    )
+    retenus, refuses = [], []
+    for paiement, entree in rapprochements:
+        if restant.get(paiement.facture_id, 0) >= paiement.montant:
+            restant[paiement.facture_id] -= paiement.montant
+            retenus.append((paiement, entree))
+        else:
+            refuses.append((paiement, entree))
+    return retenus, refuses
+
+
+def _signalement(numero, ligne, montant, motif):
+    return {
+        "ligne": numero,
+        "montant": montant,
+        "reference": ligne.get("reference", ""),
+        "nom": ligne.get("nom", ""),
+        "motif": motif,
+    }
+
+
+def rapprocher_releve(lignes, methode=MethodePaiementChoices.VIREMENT, simuler=False):
+    """
+    Rapproche les lignes du relevé (voir lire_releve) des factures ouvertes :
+    par référence de facture, sinon par nom d'élève et montant. Les lignes
+    sans rapprochement sûr sont signalées (non rapprochées ou ambiguës), pas
+    comptabilisées. Avec `simuler`, rien n'est enregistré.
+    """
+    rapport = {
+        "lignes": len(lignes),
+        "rapprochees": [],
+        "ambigues": [],
+        "non_rapprochees": [],
+        "ignorees": 0,
+        "montant_rapproche": 0.0,
+        "simulation": simuler,
+    }
+
+    with transaction.atomic():
+        index = _IndexFactures()
+        rapprochements = []
+
+        # La ligne 1 du fichier est l'en-tête.
+        for numero, ligne in enumerate(lignes, start=2):
+            if not ligne.get("montant"):
+                # Débits (colonne crédit vide) et lignes vides du relevé.
+                rapport["ignorees"] += 1
+                continue
+            try:
+                montant = _montant(ligne["montant"])
+            except InvalidOperation:
+                rapport["non_rapprochees"].append(
+                    _signalement(
+                        numero, ligne, None, f"Montant illisible : {ligne['montant']}."
+                    )
+                )
+                continue
+            if montant <= 0:
+                rapport["ignorees"] += 1
+                continue
+
+            id_facture, echec = _rapprocher_ligne(
+                index, montant, ligne.get("reference", ""), ligne.get("nom", "")
+            )
+            if echec:
+                motif, candidates = echec
+                entree = _signalement(numero, ligne, float(montant), motif)
+                if len(candidates) > 1:
+                    rapport["ambigues"].append({**entree, "factures": candidates})
+                else:
+                    rapport["non_rapprochees"].append(entree)
+                continue
+
+            index.restant[id_facture] -= montant
+            paiement = Paiement(
+                facture_id=id_facture,
+                montant=montant,
+                mode_paiement=ModePaiementChoices.PERSONNEL,
+                methode_paiement=methode_paiement(ligne.get("methode", "")) or methode,
+            )
+            rapprochements.append((paiement, _signalement(numero, ligne, float(montant), "")))
+
+        if rapprochements and not simuler:
+            rapprochements, refuses = _verifier_soldes(rapprochements)
+            rapport["non_rapprochees"].extend(
+                {**entree, "motif": "Solde de la facture modifié pendant le rapprochement."}
+                for _, entree in refuses
+            )
+            rapport["non_rapprochees"].sort(key=lambda e: e["ligne"])
+
+        paiements = [p for p, _ in rapprochements]
+        rapport["rapprochees"] = [
+            {"ligne": entree["ligne"], "facture": p.facture_id, "montant": entree["montant"]}
+            for p, entree in rapprochements
+        ]
+        rapport["montant_rapproche"] = float(sum((p.montant for p in paiements), Decimal(0)))
+
+        if paiements and not simuler:
+            Paiement.objects.bulk_create(paiements, batch_size=1000)
+            # bulk_create n'émet pas post_save : montants recalculés explicitement.
+            Facture.objects.filter(
+                id__in={p.facture_id for p in paiements}
+            ).recalculer_montants()
+            invalider_sections(SECTIONS_PAR_MODELE["factures.Paiement"])
+
+    return rapport
@@ -0,0 +1,164 @@
+"""
+Rendu PDF d'une facture avec reportlab.
+
+Ce module n'importe pas Django : les processus du pool de factures.pdf le
+chargent sans initialiser l'application et ne reçoivent que des données
+simples (dicts, dates, Decimal). Le gabarit (styles, styles de tableaux,
+en-tête de l'émetteur) est construit une fois par processus.
+"""
+import io
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+MARGE = 20 * mm
+LARGEUR_UTILE = A4[0] - 2 * MARGE
+
+
+def _montant(valeur):
+    """1234.5 -> « 1'234.50 » (usage suisse)."""
+    return f"{valeur:,.2f}".replace(",", "'")
+
+
+def _date(valeur):
+    return valeur.strftime("%d.%m.%Y") if valeur else ""
+
+
+class Gabarit:
+    """Styles et parties fixes de la mise en page, partagés par toutes les factures."""
+
+    def __init__(self, emetteur, pied):
+        styles = getSampleStyleSheet()
+        self.normal = ParagraphStyle(
+            "FactureNormal", parent=styles["Normal"], fontSize=9.5, leading=12
+        )
+        self.gras = ParagraphStyle("FactureGras", parent=self.normal, fontName="Helvetica-Bold")
+        self.droite = ParagraphStyle("FactureDroite", parent=self.normal, alignment=TA_RIGHT)
+        self.titre = ParagraphStyle(
+            "FactureTitre", parent=styles["Heading1"], fontSize=16, spaceAfter=3 * mm
+        )
+
+        # Markup échappé une fois : seuls les Paragraph sont recréés par facture,
+        # reportlab les modifiant pendant la mise en page.
+        self.emetteur = [escape(ligne) for ligne in emetteur]
+        self.pied = " · ".join(pied)
+
+        self.largeurs_entete = [LARGEUR_UTILE * 0.55, LARGEUR_UTILE * 0.45]
+        self.largeurs_details = [LARGEUR_UTILE * 0.55, LARGEUR_UTILE * 0.27, LARGEUR_UTILE * 0.18]
+        self.largeurs_totaux = [LARGEUR_UTILE * 0.82, LARGEUR_UTILE * 0.18]
+        self.style_entete = TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ])
+        self.style_details = TableStyle([
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 9.5),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8ecf1")),
+            ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.HexColor("#b0b8c4")),
+            ("ALIGN", (-1, 0), (-1, -1), "RIGHT"),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ])
+        self.style_totaux = TableStyle([
+            ("FONTSIZE", (0, 0), (-1, -1), 9.5),
+            ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+            ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+            ("LINEABOVE", (0, -1), (-1, -1), 0.75, colors.black),
+        ])
+
+    def _paragraphes(self, lignes, style):
+        return [Paragraph(ligne, style) for ligne in lignes]
+
+    def elements(self, facture):
+        destinataire = [
+            escape(ligne) for ligne in facture["destinataire"] if ligne
+        ]
+        entete = Table(
+            [[
+                self._paragraphes(self.emetteur, self.normal),
+                self._paragraphes(destinataire, self.normal),
+            ]],
+            colWidths=self.largeurs_entete,
+            style=self.style_entete,
+        )
+
+        informations = [f"Date d'émission : {_date(facture['date_emission'])}"]
+        if facture["objet"]:
+            informations.append(escape(facture["objet"]))
+
+        lignes = [["Description", "Période", "Montant (CHF)"]]
+        for description, debut, fin, montant in facture["details"]:
+            periode = f"{_date(debut)} – {_date(fin)}" if debut and fin else ""
+            lignes.append([
+                Paragraph(escape(description), self.normal), periode, _montant(montant)
+            ])
+        details = Table(
+            lignes, colWidths=self.largeurs_details, style=self.style_details, repeatRows=1
+        )
+
+        totaux = Table(
+            [
+                ["Total", _montant(facture["montant_total"])],
+                ["Déjà payé", _montant(facture["montant_paye"])],
+                ["Solde à payer (CHF)", _montant(facture["montant_restant"])],
+            ],
+            colWidths=self.largeurs_totaux,
+            style=self.style_totaux,
+        )
+
+        return [
+            entete,
+            Spacer(0, 15 * mm),
+            Paragraph(f"Facture n° {facture['id']}", self.titre),
+            *self._paragraphes(informations, self.normal),
+            Spacer(0, 6 * mm),
+            details,
+            Spacer(0, 4 * mm),
+            totaux,
+        ]
+
+    def pied_de_page(self, canvas, document):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.grey)
+        if self.pied:
+            canvas.drawString(MARGE, 12 * mm, self.pied)
+        canvas.drawRightString(A4[0] - MARGE, 12 * mm, f"Page {document.page}")
+        canvas.restoreState()
+
+
+@lru_cache(maxsize=None)
+def gabarit(emetteur=(), pied=()):
+    """Gabarit compilé pour cet émetteur, mis en cache pour la durée du processus."""
+    return Gabarit(emetteur, pied)
+
+
+def charger_gabarit(emetteur=(), pied=()):
+    """Initialiseur des processus du pool : compile le gabarit avant la première facture."""
+    gabarit(tuple(emetteur), tuple(pied))
+
+
+def rendre_facture(facture, emetteur=(), pied=()):
+    """Contenu PDF (bytes) d'une facture décrite par factures.pdf.donnees_factures."""
+    mise_en_page = gabarit(tuple(emetteur), tuple(pied))
+    sortie = io.BytesIO()
+    document = SimpleDocTemplate(
+        sortie,
+        pagesize=A4,
+        leftMargin=MARGE,
+        rightMargin=MARGE,
+        topMargin=MARGE,
+        bottomMargin=MARGE + 5 * mm,
+        title=f"Facture {facture['id']}",
+        author=emetteur[0] if emetteur else "",
+    )
+    document.build(
+        mise_en_page.elements(facture),
+        onFirstPage=mise_en_page.pied_de_page,
+        onLaterPages=mise_en_page.pied_de_page,
+    )
+    return sortie.getvalue()
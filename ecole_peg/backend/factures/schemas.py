@@ -25,6 +25,10 @@ class FactureIn(Schema):
     id_eleve: Optional[int] = None
     details_facture: List[DetailFactureIn]
 
+class FacturationSessionIn(Schema):
+    date_debut_periode: Optional[date] = None
+    date_fin_periode: Optional[date] = None
+
 class FacturesOut(Schema):
     id: int
     date_emission: date
@@ -0,0 +1,54 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..facturation import DESCRIPTION_FRAIS_INSCRIPTION, facturer_session
+from ..models import DetailFacture, Facture
+
+
+class FacturationSessionTests(DonneesSessionMixin, TestCase):
+    def test_premiere_facturation_avec_frais_d_inscription(self):
+        resultat = facturer_session(self.session.id)
+        self.assertEqual(resultat["factures_creees"], 2)
+        self.assertEqual(resultat["montant_total"], 1300.0)
+        facture = Facture.objects.get(inscription=self.inscriptions[0])
+        self.assertEqual(facture.montant_total, Decimal("650.00"))
+        self.assertEqual(facture.montant_restant, Decimal("650.00"))
+        self.assertTrue(
+            facture.details.filter(description=DESCRIPTION_FRAIS_INSCRIPTION).exists()
+        )
+
+    def test_idempotente_pour_une_meme_periode(self):
+        facturer_session(self.session.id)
+        resultat = facturer_session(self.session.id)
+        self.assertEqual(resultat["factures_creees"], 0)
+        self.assertEqual(resultat["deja_facturees"], 2)
+        self.assertEqual(Facture.objects.count(), 2)
+
+    def test_periode_suivante_sans_frais_d_inscription(self):
+        facturer_session(self.session.id, date(2026, 1, 5), date(2026, 1, 31))
+        resultat = facturer_session(self.session.id, date(2026, 2, 1), date(2026, 2, 28))
+        self.assertEqual(resultat["factures_creees"], 2)
+        self.assertEqual(resultat["montant_total"], 1200.0)
+        self.assertEqual(
+            DetailFacture.objects.filter(
+                description=DESCRIPTION_FRAIS_INSCRIPTION
+            ).count(),
+            2,
+        )
+
+    def test_sans_ids_renvoyes_par_l_insert_multiple(self):
+        # Comme MySQL : factures insérées une à une, ids lus sur la connexion.
+        with mock.patch.object(
+            type(connection.features),
+            "can_return_rows_from_bulk_insert",
+            new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            resultat = facturer_session(self.session.id)
+        factures = Facture.objects.filter(inscription__in=self.inscriptions)
+        self.assertEqual(resultat["ids_factures"], sorted(f.id for f in factures))
+        for facture in factures:
+            self.assertEqual(facture.montant_total, Decimal("650.00"))
@@ -0,0 +1,59 @@
+from django.test import TestCase
+from backend_ecole_peg.auth_api import generer_token
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..facturation import facturer_session
+from ..models import Facture, MethodePaiementChoices, ModePaiementChoices, Paiement
+
+
+class FiltresPayeesImpayeesTests(DonneesSessionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        facturer_session(cls.session.id)
+        cls.payee = Facture.objects.get(inscription=cls.inscriptions[0])
+        cls.impayee = Facture.objects.get(inscription=cls.inscriptions[1])
+        Paiement.objects.create(
+            facture=cls.payee,
+            montant=cls.payee.montant_restant,
+            mode_paiement=ModePaiementChoices.PERSONNEL,
+            methode_paiement=MethodePaiementChoices.VIREMENT,
+        )
+        # Paiement partiel : la facture reste impayée.
+        Paiement.objects.create(
+            facture=cls.impayee,
+            montant=100,
+            mode_paiement=ModePaiementChoices.PERSONNEL,
+            methode_paiement=MethodePaiementChoices.VIREMENT,
+        )
+
+    def setUp(self):
+        self.client.cookies["access_token"] = generer_token()
+
+    def _ids(self, url, **parametres):
+        reponse = self.client.get(url, parametres)
+        self.assertEqual(reponse.status_code, 200)
+        donnees = reponse.json()
+        return [f["id"] for f in donnees["factures"]], donnees["nombre_total"]
+
+    def test_listes_globales(self):
+        self.assertEqual(
+            self._ids("/api/factures/factures/payees/"), ([self.payee.id], 1)
+        )
+        self.assertEqual(
+            self._ids("/api/factures/factures/impayees/"), ([self.impayee.id], 1)
+        )
+
+    def test_listes_par_eleve(self):
+        for eleve, payees, impayees in (
+            (self.eleves[0], [self.payee.id], []),
+            (self.eleves[1], [], [self.impayee.id]),
+        ):
+            with self.subTest(eleve=eleve.nom):
+                base = f"/api/factures/factures/eleve/{eleve.id}"
+                self.assertEqual(self._ids(f"{base}/payees/")[0], payees)
+                self.assertEqual(self._ids(f"{base}/impayees/")[0], impayees)
+
+    def test_pagination_en_base(self):
+        ids, total = self._ids("/api/factures/factures/", taille=1, page=2)
+        self.assertEqual(total, 2)
+        self.assertEqual(len(ids), 1)
@@ -0,0 +1,83 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from ..models import (
+    DetailFacture,
+    Facture,
+    MethodePaiementChoices,
+    ModePaiementChoices,
+    Paiement,
+)
+
+
+class MontantsFactureTests(DonneesSessionMixin, TestCase):
+    def setUp(self):
+        self.facture = Facture.objects.create(inscription=self.inscriptions[0])
+
+    def _detail(self, montant):
+        return DetailFacture.objects.create(
+            facture=self.facture, description="Cours", montant=montant
+        )
+
+    def _paiement(self, montant):
+        return Paiement.objects.create(
+            facture=self.facture,
+            montant=montant,
+            mode_paiement=ModePaiementChoices.PERSONNEL,
+            methode_paiement=MethodePaiementChoices.ESPECE,
+        )
+
+    def assertMontants(self, total, paye, restant):
+        self.facture.refresh_from_db()
+        self.assertEqual(
+            (
+                self.facture.montant_total,
+                self.facture.montant_paye,
+                self.facture.montant_restant,
+            ),
+            (Decimal(total), Decimal(paye), Decimal(restant)),
+        )
+
+    def test_details_crees_modifies_supprimes(self):
+        detail = self._detail(600)
+        self._detail(50)
+        self.assertMontants(650, 0, 650)
+
+        detail.montant = 450
+        detail.save()
+        self.assertMontants(500, 0, 500)
+
+        detail.delete()
+        self.assertMontants(50, 0, 50)
+
+    def test_paiements_crees_modifies_supprimes(self):
+        self._detail(600)
+        paiement = self._paiement(200)
+        self.assertMontants(600, 200, 400)
+
+        paiement.montant = 600
+        paiement.save()
+        self.assertMontants(600, 600, 0)
+
+        paiement.delete()
+        self.assertMontants(600, 0, 600)
+
+    def test_restant_jamais_negatif(self):
+        detail = self._detail(600)
+        self._paiement(600)
+        detail.montant = 100
+        detail.save()
+        self.assertMontants(100, 600, 0)
+
+    def test_commande_de_recalcul(self):
+        self._detail(600)
+        self._paiement(100)
+        # update() contourne les signaux : montants stockés désynchronisés.
+        Facture.objects.update(montant_total=0, montant_paye=0, montant_restant=0)
+
+        sortie = StringIO()
+        call_command("recalculer_montants_factures", stdout=sortie)
+        self.assertIn("1 facture(s)", sortie.getvalue())
+        self.assertMontants(600, 100, 500)
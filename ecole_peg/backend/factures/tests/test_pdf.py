@@ -0,0 +1,27 @@
+import io
+import zipfile
+from unittest import skipIf
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from .. import pdf
+from ..facturation import facturer_session
+from ..models import Facture
+
+
+@skipIf(pdf.rendu_pdf is None, "reportlab n'est pas installé")
+class ArchivePdfTests(DonneesSessionMixin, TestCase):
+    def test_archive_zip_produite_au_fil_de_l_eau(self):
+        facturer_session(self.session.id)
+        factures = pdf.donnees_factures(Facture.objects.all(), taille_lot=1)
+        morceaux = [m for m in pdf.archive_zip(factures) if m]
+
+        # Un morceau par PDF, puis le répertoire central de l'archive.
+        self.assertEqual(len(morceaux), 3)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(morceaux)))
+        self.assertIsNone(archive.testzip())
+        noms = archive.namelist()
+        self.assertEqual(len(noms), 2)
+        self.assertTrue(
+            all(n.startswith("facture-") and n.endswith(".pdf") for n in noms)
+        )
+        self.assertTrue(archive.read(noms[0]).startswith(b"%PDF-"))
@@ -0,0 +1,140 @@
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase
+from backend_ecole_peg.fabriques_test import DonneesSessionMixin
+from .. import rapprochement
+from ..facturation import facturer_session
+from ..models import (
+    Facture,
+    MethodePaiementChoices,
+    ModePaiementChoices,
+    Paiement,
+)
+from ..rapprochement import lire_releve, rapprocher_releve
+
+
+class RapprochementTests(DonneesSessionMixin, TestCase):
+    def setUp(self):
+        facturer_session(self.session.id)
+        self.f_dupont = Facture.objects.get(inscription=self.inscriptions[0])
+        self.f_rossi = Facture.objects.get(inscription=self.inscriptions[1])
+
+    def _releve(self, *lignes):
+        texte = "Date;Crédit;Communication;Débiteur\n" + "\n".join(lignes)
+        return lire_releve(texte.encode("utf-8"))
+
+    def test_par_reference_puis_par_nom(self):
+        rapport = rapprocher_releve(
+            self._releve(
+                f"01.02.2026;650.00;Facture {self.f_dupont.id};H. Dupont",
+                "02.02.2026;100,00;Cours de français;Marco Rossi",
+                "03.02.2026;;Débit carte;",
+            )
+        )
+        self.assertEqual(
+            [r["facture"] for r in rapport["rapprochees"]],
+            [self.f_dupont.id, self.f_rossi.id],
+        )
+        self.assertEqual(rapport["ignorees"], 1)
+        self.f_dupont.refresh_from_db()
+        self.f_rossi.refresh_from_db()
+        self.assertEqual(self.f_dupont.montant_restant, 0)
+        self.assertEqual(self.f_rossi.montant_restant, Decimal("550.00"))
+
+    def test_montant_seul_ambigu(self):
+        rapport = rapprocher_releve(self._releve("01.02.2026;650.00;Merci;Inconnu"))
+        self.assertEqual(rapport["rapprochees"], [])
+        self.assertEqual(
+            sorted(rapport["ambigues"][0]["factures"]),
+            sorted([self.f_dupont.id, self.f_rossi.id]),
+        )
+
+    def test_depassement_du_solde_non_rapproche(self):
+        rapport = rapprocher_releve(self._releve(f"01.02.2026;900;F-{self.f_dupont.id};"))
+        self.assertEqual(len(rapport["non_rapprochees"]), 1)
+        self.assertFalse(Paiement.objects.exists())
+
+    def test_methode_par_code_ou_libelle(self):
+        texte = (
+            "Crédit;Communication;Méthode\n"
+            f"10;F-{self.f_dupont.id};Twint\n"
+            f"10;F-{self.f_dupont.id};ESP\n"
+            f"10;F-{self.f_dupont.id};Chèque\n"
+        )
+        rapprocher_releve(lire_releve(texte.encode("utf-8")))
+        self.assertEqual(
+            list(
+                Paiement.objects.order_by("id").values_list("methode_paiement", flat=True)
+            ),
+            [
+                MethodePaiementChoices.TWINT,
+                MethodePaiementChoices.ESPECE,
+                MethodePaiementChoices.VIREMENT,
+            ],
+        )
+
+    def test_montant_illisible(self):
+        rapport = rapprocher_releve(self._releve("01.02.2026;abc;Facture 1;"))
+        self.assertIsNone(rapport["non_rapprochees"][0]["montant"])
+
+    def test_solde_relu_sous_verrou_avant_insertion(self):
+        construire = rapprochement._IndexFactures
+
+        def index_puis_paiement_concurrent():
+            index = construire()
+            Paiement.objects.create(
+                facture=self.f_dupont,
+                montant=600,
+                mode_paiement=ModePaiementChoices.PERSONNEL,
+                methode_paiement=MethodePaiementChoices.ESPECE,
+            )
+            return index
+
+        with mock.patch.object(
+            rapprochement, "_IndexFactures", side_effect=index_puis_paiement_concurrent
+        ):
+            rapport = rapprocher_releve(
+                self._releve(f"01.02.2026;650;Facture {self.f_dupont.id};")
+            )
+        self.assertEqual(rapport["rapprochees"], [])
+        self.assertEqual(rapport["montant_rapproche"], 0)
+        self.assertEqual(len(rapport["non_rapprochees"]), 1)
+        self.assertEqual(Paiement.objects.count(), 1)
+
+    def test_simulation_sans_ecriture(self):
+        rapport = rapprocher_releve(
+            self._releve(f"01.02.2026;650;{self.f_dupont.id};"),
+            methode=MethodePaiementChoices.TWINT,
+            simuler=True,
+        )
+        self.assertEqual(len(rapport["rapprochees"]), 1)
+        self.assertFalse(Paiement.objects.exists())
+
+    def test_reference_numerique_confirmee_par_le_montant_ou_le_nom(self):
+        rapport = rapprocher_releve(
+            self._releve(
+                f"01.02.2026;650.00;{self.f_rossi.id};Virement",
+                f"02.02.2026;100.00;{self.f_dupont.id};Hélène Dupont",
+            ),
+            simuler=True,
+        )
+        self.assertEqual(
+            [r["facture"] for r in rapport["rapprochees"]],
+            [self.f_rossi.id, self.f_dupont.id],
+        )
+
+    def test_reference_numerique_non_confirmee_ignoree(self):
+        # Le numéro désigne la facture de Rossi, mais ni le montant ni le nom ne
+        # la confirment : rapprochement par le nom du débiteur.
+        rapport = rapprocher_releve(
+            self._releve(f"01.02.2026;100.00;{self.f_rossi.id};Hélène Dupont"),
+            simuler=True,
+        )
+        self.assertEqual(
+            [r["facture"] for r in rapport["rapprochees"]], [self.f_dupont.id]
+        )
+
+        rapport = rapprocher_releve(
+            self._releve(f"01.02.2026;100.00;{self.f_rossi.id};Inconnu"), simuler=True
+        )
+        self.assertEqual(rapport["rapprochees"], [])